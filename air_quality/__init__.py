@@ -0,0 +1,5 @@
+"""Data pipeline building blocks for the Air Quality Dashboard.
+
+The modules in this package are importable without Streamlit so they can be
+reused by the dashboard (`app.py`) as well as scripts and services.
+"""
@@ -0,0 +1,5 @@
+import sys
+
+from air_quality.cli import main
+
+sys.exit(main())
@@ -0,0 +1,388 @@
+"""Headless HTTP API over the observation pipeline.
+
+Serves the same data as the dashboard to machine consumers, without
+Streamlit's script reruns:
+
+    python -m air_quality.api --port 8600
+
+Endpoints (GET; `location` may be repeated and defaults to the default
+locations, `standard` defaults to US EPA, times are ISO 8601 and `end` is
+exclusive):
+
+    /health                                      liveness and loaded datasets
+    /locations                                   default and loaded locations
+    /current?location=...                        latest observation per location
+    /history?location=...&start=...&end=...      observations in a time range
+    /rollups?grain=hourly&location=...&start=... hourly/daily/weekly aggregates
+    /metrics                                     Prometheus metrics of this process
+
+Data endpoints answer JSON (`{"standard", "count", "data": [rows]}`) or, with
+`format=arrow`, `format=parquet` or `format=csv`, an export streamed with
+chunked transfer encoding. Observations go through the same pipeline,
+observation store, geocode cache and HTTP client as the dashboard; embedded in
+the dashboard, the API also shares its store and cached fetchers. Each
+(locations, standard) dataset is loaded once and then sliced in memory until
+`refresh_interval` passes, so repeat queries take milliseconds; the least
+recently used datasets are dropped beyond `max_datasets`.
+"""
+import argparse
+import itertools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from air_quality.aqi import DEFAULT_STANDARD, STANDARDS
+from air_quality.export import FORMATS as EXPORT_FORMATS, export_mime, iter_export
+from air_quality.geocoding import get_geocode_cache, lookup as geocode_lookup
+from air_quality.history import DEFAULT_HISTORY_DAYS
+from air_quality.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, render as render_metrics
+from air_quality.pipeline import DEFAULT_LOCATIONS, load_observations, load_sample, prepare
+from air_quality.rollups import GRAINS, Rollups
+from air_quality.store import DEFAULT_STORE_PATH, ObservationStore
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8600
+DEFAULT_REFRESH_INTERVAL = 3600  # Seconds a loaded dataset is served before reloading
+DEFAULT_MAX_DATASETS = 32
+
+
+class ApiError(Exception):
+    """A request error reported to the client with an HTTP status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class AirQualityService:
+    """Loads, caches and slices observation datasets for the API, optionally sharing a store and fetchers."""
+
+    def __init__(self, api_key=None, store_path=DEFAULT_STORE_PATH, history_days=DEFAULT_HISTORY_DAYS,
+                 max_workers=None, refresh_interval=DEFAULT_REFRESH_INTERVAL, sample_span='7D', sample_freq='D',
+                 store=None, fetchers=None, max_datasets=DEFAULT_MAX_DATASETS):
+        self.api_key = api_key
+        self.store_path = store_path
+        self.fetchers = fetchers  # Endpoint name -> fetcher(lat, lon, api_key); None for the pipeline's
+        self.max_datasets = max_datasets
+        self.history_days = history_days
+        self.max_workers = max_workers
+        self.refresh_interval = refresh_interval
+        self.sample_span = sample_span
+        self.sample_freq = sample_freq
+
+        self._lock = threading.Lock()
+        self._store = store  # Opened at store_path on first use unless shared
+        self._geocode_cache = None
+        self._datasets = OrderedDict()  # (locations, standard) -> (expires, ObservationIndex, Rollups), oldest use first
+        self._loading = {}              # (locations, standard) -> lock held while loading it
+        self._rollups = {}    # standard -> Rollups of the store; sample rollups live only in their dataset
+        self._messages = []   # Recent pipeline warnings and errors
+
+    @property
+    def store(self):
+        if self._store is None:
+            with self._lock:
+                if self._store is None:
+                    self._store = ObservationStore(self.store_path)
+        return self._store
+
+    @property
+    def geocode_cache(self):
+        """The shared geocode cache, seeded with the default locations."""
+        if self._geocode_cache is None:
+            with self._lock:
+                if self._geocode_cache is None:
+                    cache = get_geocode_cache()
+                    cache.seed(DEFAULT_LOCATIONS)
+                    self._geocode_cache = cache
+        return self._geocode_cache
+
+    def resolve(self, location):
+        """Get coordinates for a location, geocoding it if it isn't cached."""
+        return geocode_lookup(location, cache=self.geocode_cache)
+
+    def _report(self, level, message):
+        with self._lock:
+            self._messages = (self._messages + [{'level': level, 'message': message, 'time': time.time()}])[-50:]
+
+    def dataset(self, locations, standard=DEFAULT_STANDARD):
+        """
+        Get the indexed observations and rollups of some locations.
+
+        Loaded on first use (from the store and OpenWeatherMap, or sample data
+        without an API key) and then reused until `refresh_interval` passes.
+        Concurrent requests for the same dataset wait on one load.
+
+        Returns:
+            tuple: (ObservationIndex, Rollups), or (None, None) if there is no data
+        """
+        if standard not in STANDARDS:
+            raise ApiError(400, f"Unknown standard {standard!r}; expected one of {', '.join(STANDARDS)}")
+        key = (tuple(locations), standard)
+
+        entry = self._cached(key)
+        if entry is not None:
+            return entry
+
+        with self._lock:
+            loading = self._loading.setdefault(key, threading.Lock())
+        with loading:
+            try:
+                # Another request may have loaded it while we waited
+                entry = self._cached(key)
+                if entry is not None:
+                    return entry
+                return self._load(key)
+            finally:
+                # Drop the lock once loaded; later requests find the dataset instead
+                with self._lock:
+                    if self._loading.get(key) is loading:
+                        del self._loading[key]
+
+    def _cached(self, key):
+        with self._lock:
+            entry = self._datasets.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                return None
+            self._datasets.move_to_end(key)
+            return entry[1:]
+
+    def _load(self, key):
+        locations, standard = key
+        df = None
+        if self.api_key:
+            df = load_observations(
+                list(locations), self.api_key, self.store, self.resolve, fetchers=self.fetchers,
+                history_days=self.history_days, max_workers=self.max_workers, report=self._report
+            )
+        if df is None:
+            df = load_sample(list(locations), span=self.sample_span, freq=self.sample_freq)
+
+        # Sample data is regenerated on each load, so its rollups are evicted along with the dataset
+        if df.attrs.get('source', 'store') == 'store':
+            with self._lock:
+                rollups = self._rollups.setdefault(standard, Rollups())
+        else:
+            rollups = Rollups()
+        observations, rollups = prepare(df, standard, rollups)
+
+        with self._lock:
+            self._datasets[key] = (time.monotonic() + self.refresh_interval, observations, rollups)
+            self._datasets.move_to_end(key)
+            while len(self._datasets) > self.max_datasets:
+                self._datasets.popitem(last=False)
+        return observations, rollups
+
+    def current(self, locations, standard=DEFAULT_STANDARD):
+        """Get the latest observation at or before now of each location."""
+        observations, _ = self.dataset(locations, standard)
+        if observations is None:
+            return pd.DataFrame()
+        now = pd.Timestamp.now()
+        rows = []
+        for location in locations:
+            lo, hi = observations.bounds(location, end=now)
+            if hi > lo:
+                rows.append(hi - 1)
+        return observations.frame.take(rows)
+
+    def history(self, locations, standard=DEFAULT_STANDARD, start=None, end=None):
+        """Get the observations of some locations within [start, end)."""
+        observations, _ = self.dataset(locations, standard)
+        if observations is None:
+            return pd.DataFrame()
+        return observations.slice(locations, start, end)
+
+    def rollup(self, grain, locations, standard=DEFAULT_STANDARD, start=None, end=None):
+        """Get hourly, daily or weekly aggregates of some locations within [start, end)."""
+        if grain not in GRAINS:
+            raise ApiError(400, f"Unknown grain {grain!r}; expected one of {', '.join(GRAINS)}")
+        _, rollups = self.dataset(locations, standard)
+        if rollups is None:
+            return pd.DataFrame()
+        return rollups.view(grain, locations, start, end)
+
+    def status(self):
+        with self._lock:
+            return {
+                'datasets': [{'locations': list(locations), 'standard': standard}
+                             for locations, standard in self._datasets],
+                'messages': list(self._messages)
+            }
+
+    def known_locations(self):
+        """Get the default locations plus every location of a loaded dataset."""
+        names = dict.fromkeys(DEFAULT_LOCATIONS)
+        with self._lock:
+            keys = list(self._datasets)
+        for locations, _ in keys:
+            names.update(dict.fromkeys(locations))
+        return list(names)
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    """Routes GET requests to the server's AirQualityService."""
+
+    protocol_version = 'HTTP/1.1'
+    routes = {
+        '/health': 'health',
+        '/locations': 'locations',
+        '/current': 'current',
+        '/history': 'history',
+        '/rollups': 'rollups',
+        '/metrics': 'metrics'
+    }
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        route = self.routes.get(url.path.rstrip('/') or '/')
+        try:
+            if route is None:
+                raise ApiError(404, f"No such endpoint: {url.path}")
+            getattr(self, route)(query)
+        except ApiError as e:
+            self._send_json(e.status, {'error': str(e)})
+        except (ValueError, TypeError) as e:
+            self._send_json(400, {'error': str(e)})
+        except Exception as e:
+            self._send_json(500, {'error': f"{type(e).__name__}: {e}"})
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def health(self, query):
+        self._send_json(200, {'status': 'ok', **self.service.status()})
+
+    def locations(self, query):
+        self._send_json(200, {'locations': self.service.known_locations()})
+
+    def metrics(self, query):
+        self._send(200, render_metrics().encode('utf-8'), METRICS_CONTENT_TYPE)
+
+    def current(self, query):
+        locations, standard = self._selection(query)
+        self._send_frame(query, standard, self.service.current(locations, standard))
+
+    def history(self, query):
+        locations, standard = self._selection(query)
+        start, end = self._time_range(query)
+        self._send_frame(query, standard, self.service.history(locations, standard, start, end))
+
+    def rollups(self, query):
+        locations, standard = self._selection(query)
+        start, end = self._time_range(query)
+        grain = query.get('grain', ['hourly'])[0]
+        self._send_frame(query, standard, self.service.rollup(grain, locations, standard, start, end))
+
+    @staticmethod
+    def _selection(query):
+        locations = list(dict.fromkeys(query.get('location') or DEFAULT_LOCATIONS))
+        return locations, query.get('standard', [DEFAULT_STANDARD])[0]
+
+    @staticmethod
+    def _time_range(query):
+        start = query.get('start', [None])[0]
+        end = query.get('end', [None])[0]
+        return (pd.Timestamp(start) if start else None), (pd.Timestamp(end) if end else None)
+
+    def _send_frame(self, query, standard, frame):
+        fmt = query.get('format', ['json'])[0]
+        if fmt in EXPORT_FORMATS:
+            self._send_stream(200, iter_export(frame, fmt), export_mime(fmt))
+        elif fmt == 'json':
+            rows = frame.to_json(orient='records', date_format='iso') if len(frame.columns) else '[]'
+            body = f'{{"standard": {json.dumps(standard)}, "count": {len(frame)}, "data": {rows}}}'
+            self._send(200, body.encode('utf-8'), 'application/json')
+        else:
+            raise ApiError(400, f"Unknown format {fmt!r}; expected json, {', '.join(EXPORT_FORMATS)}")
+
+    def _send_json(self, status, payload):
+        self._send(status, json.dumps(payload, default=str).encode('utf-8'), 'application/json')
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, status, pieces, content_type):
+        # Pull the first piece before the headers, so serialization errors still get a JSON error response
+        pieces = iter(pieces)
+        first = next(pieces, b'')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for piece in itertools.chain([first], pieces):
+            if piece:
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(piece), piece))
+        self.wfile.write(b'0\r\n\r\n')
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def make_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT, quiet=False):
+    """Create a threaded HTTP server answering API requests from `service`."""
+    server = ThreadingHTTPServer((host, port), ApiHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.quiet = quiet
+    return server
+
+
+def serve_in_background(service, host=DEFAULT_HOST, port=DEFAULT_PORT, quiet=True):
+    """
+    Serve the API from a daemon thread, e.g. inside the dashboard's process.
+
+    Returns:
+        ThreadingHTTPServer: The running server; call `shutdown()` to stop it
+    """
+    server = make_server(service, host, port, quiet=quiet)
+    threading.Thread(target=server.serve_forever, name='aq-api', daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve air quality data over HTTP as JSON or Arrow.")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--refresh', type=int, default=DEFAULT_REFRESH_INTERVAL,
+                        help="Seconds to serve a loaded dataset before reloading it")
+    parser.add_argument('--quiet', action='store_true', help="Don't log requests")
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    service = AirQualityService(
+        api_key=os.getenv('OPENWEATHER_API_KEY'),
+        store_path=os.getenv('AQ_STORE_PATH', DEFAULT_STORE_PATH),
+        history_days=int(os.getenv('HISTORY_DAYS', DEFAULT_HISTORY_DAYS)),
+        max_workers=int(os.getenv('FETCH_CONCURRENCY', 8)),
+        refresh_interval=args.refresh,
+        sample_span=os.getenv('SAMPLE_SPAN', '7D'),
+        sample_freq=os.getenv('SAMPLE_FREQ', 'D')
+    )
+    server = make_server(service, args.host, args.port, quiet=args.quiet)
+    print(f"Serving air quality API on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+"""Vectorized, table-driven AQI engine.
+
+Sub-indices are computed for whole pollutant columns at once by locating each
+concentration in its breakpoint table with `np.searchsorted` and evaluating
+that segment's line. The overall AQI is the maximum sub-index, and its
+category and color come from one more `searchsorted` over the category bounds.
+
+Several national standards are supported. Their breakpoint tables are compiled
+into per-segment slopes and intercepts once at import, so switching standards
+is just another vectorized pass over the stored concentrations.
+"""
+import numpy as np
+import pandas as pd
+
+POLLUTANTS = ('pm25', 'pm10', 'no2', 'o3')
+
+# Observations store PM in µg/m³ and NO₂/O₃ in ppb; these convert ppb back to µg/m³
+PPB_TO_UGM3 = {'no2': 1.88, 'o3': 2.0}
+
+# Added before flooring so a sub-index that is exactly whole (e.g. 220.99999999999997
+# from float rounding of 221) isn't truncated to the integer below
+_EPSILON = 1e-9
+
+
+class AQIStandard:
+    """An AQI standard: breakpoint tables per pollutant plus its category scale."""
+
+    def __init__(self, key, name, breakpoints, category_bounds, categories, colors, unit_factors=None):
+        """
+        Args:
+            key (str): Short identifier, e.g. 'us_epa'
+            name (str): Display name
+            breakpoints (dict): Pollutant -> [(concentration, index), ...] ascending
+            category_bounds (list): Upper index bound of each category but the last
+            categories (list): Category labels, one more than `category_bounds`
+            colors (list): Category colors, aligned with `categories`
+            unit_factors (dict): Pollutant -> factor converting stored units to the
+                table's units (defaults to 1)
+        """
+        self.key = key
+        self.name = name
+        self.breakpoints = {p: np.asarray(table, dtype=np.float64) for p, table in breakpoints.items()}
+        self.category_bounds = np.asarray(category_bounds, dtype=np.float64)
+        self.categories = list(categories)
+        self.colors = list(colors)
+        self.unit_factors = unit_factors or {}
+        self.max_index = max(table[-1, 1] for table in self.breakpoints.values())
+
+        # Precompile each table into segment lines: index = index_lo + slope * (c - conc_lo)
+        self._segments = {}
+        for pollutant, table in self.breakpoints.items():
+            conc_bp, index_bp = table[:, 0], table[:, 1]
+            slopes = np.diff(index_bp) / np.diff(conc_bp)
+            self._segments[pollutant] = (conc_bp[0], conc_bp[-1], conc_bp[1:-1], conc_bp[:-1], index_bp[:-1], slopes)
+
+    def __repr__(self):
+        return f"AQIStandard({self.key!r})"
+
+    def sub_index(self, pollutant, concentrations):
+        """
+        Compute the sub-index for an array of concentrations in stored units.
+
+        Concentrations above the table are capped at its top index and negative
+        ones are treated as zero. NaN stays NaN.
+
+        Returns:
+            np.ndarray: Sub-indices as floats, truncated to whole numbers
+        """
+        low, high, inner, conc_lo, index_lo, slopes = self._segments[pollutant]
+        c = np.asarray(concentrations, dtype=np.float64) * self.unit_factors.get(pollutant, 1.0)
+        c = np.clip(c, low, high)
+
+        # Segment i covers (bp[i], bp[i + 1]]; a value on a boundary uses the lower segment
+        i = np.searchsorted(inner, c, side='left')
+        # Interpolating from the segment's low end (rather than slope * c + intercept)
+        # keeps the rounding error far below the epsilon
+        return np.floor(index_lo[i] + slopes[i] * (c - conc_lo[i]) + _EPSILON)
+
+    def categorize(self, aqi):
+        """
+        Get the category and color for an array of index values.
+
+        Returns:
+            tuple: (categories, colors) as pd.Categorical arrays; NaN gives NaN
+        """
+        aqi = np.asarray(aqi, dtype=np.float64)
+        codes = np.searchsorted(self.category_bounds, aqi, side='left')
+        codes[np.isnan(aqi)] = -1
+        return (pd.Categorical.from_codes(codes, self.categories),
+                pd.Categorical.from_codes(codes, self.colors))
+
+
+US_EPA = AQIStandard(
+    'us_epa', "US EPA AQI",
+    # PM in µg/m³, NO₂ and O₃ in ppb
+    breakpoints={
+        'pm25': [(0, 0), (12.0, 50), (35.4, 100), (55.4, 150), (150.4, 200), (250.4, 300), (350.4, 400), (500.4, 500)],
+        'pm10': [(0, 0), (54, 50), (154, 100), (254, 150), (354, 200), (424, 300), (504, 400), (604, 500)],
+        'no2': [(0, 0), (53, 50), (100, 100), (360, 150), (649, 200), (1249, 300), (1649, 400), (2049, 500)],
+        'o3': [(0, 0), (54, 50), (70, 100), (85, 150), (105, 200), (200, 300), (300, 400), (500, 500)]
+    },
+    category_bounds=[50, 100, 150, 200, 300],
+    categories=["Good", "Moderate", "Unhealthy for Sensitive Groups", "Unhealthy", "Very Unhealthy", "Hazardous"],
+    colors=["#00E400", "#FFFF00", "#FF7E00", "#FF0000", "#8F3F97", "#7E0023"]
+)
+
+EU_CAQI = AQIStandard(
+    'eu_caqi', "EU CAQI (hourly)",
+    # All in µg/m³; the last segment extends past 100 so "Very high" is reachable
+    breakpoints={
+        'pm25': [(0, 0), (15, 25), (30, 50), (55, 75), (110, 100), (220, 150)],
+        'pm10': [(0, 0), (25, 25), (50, 50), (90, 75), (180, 100), (360, 150)],
+        'no2': [(0, 0), (50, 25), (100, 50), (200, 75), (400, 100), (800, 150)],
+        'o3': [(0, 0), (60, 25), (120, 50), (180, 75), (240, 100), (480, 150)]
+    },
+    category_bounds=[25, 50, 75, 100],
+    categories=["Very Low", "Low", "Medium", "High", "Very High"],
+    colors=["#79BC6A", "#BBCF4C", "#EEC20B", "#F29305", "#E8416F"],
+    unit_factors=PPB_TO_UGM3
+)
+
+IN_NAQI = AQIStandard(
+    'in_naqi', "India NAQI",
+    # All in µg/m³
+    breakpoints={
+        'pm25': [(0, 0), (30, 50), (60, 100), (90, 200), (120, 300), (250, 400), (500, 500)],
+        'pm10': [(0, 0), (50, 50), (100, 100), (250, 200), (350, 300), (430, 400), (600, 500)],
+        'no2': [(0, 0), (40, 50), (80, 100), (180, 200), (280, 300), (400, 400), (800, 500)],
+        'o3': [(0, 0), (50, 50), (100, 100), (168, 200), (208, 300), (748, 400), (1000, 500)]
+    },
+    category_bounds=[50, 100, 200, 300, 400],
+    categories=["Good", "Satisfactory", "Moderate", "Poor", "Very Poor", "Severe"],
+    colors=["#00B050", "#92D050", "#FFFF00", "#FF9900", "#FF0000", "#C00000"],
+    unit_factors=PPB_TO_UGM3
+)
+
+STANDARDS = {standard.key: standard for standard in (US_EPA, EU_CAQI, IN_NAQI)}
+DEFAULT_STANDARD = US_EPA.key
+
+
+def get_standard(standard=DEFAULT_STANDARD):
+    """Get an AQIStandard from its key (or pass one through)."""
+    return standard if isinstance(standard, AQIStandard) else STANDARDS[standard]
+
+
+def categorize(aqi, standard=DEFAULT_STANDARD):
+    """
+    Get the category and color for an array of AQI values.
+
+    Args:
+        aqi (array-like): AQI values
+        standard (str or AQIStandard): Standard whose scale to use
+
+    Returns:
+        tuple: (categories, colors) as pd.Categorical arrays; NaN AQI gives NaN
+    """
+    return get_standard(standard).categorize(aqi)
+
+
+def compute_aqi(pollutants, standard=DEFAULT_STANDARD):
+    """
+    Score whole pollutant columns in one vectorized pass.
+
+    Args:
+        pollutants (pd.DataFrame or dict): Columns named as in POLLUTANTS, in
+            stored units; missing pollutants are ignored
+        standard (str or AQIStandard): Standard to score against
+
+    Returns:
+        pd.DataFrame: `aqi_<pollutant>` sub-indices, `aqi`, `dominant_pollutant`,
+            `aqi_category` and `aqi_color`, aligned with the input's index
+    """
+    standard = get_standard(standard)
+    index = pollutants.index if isinstance(pollutants, pd.DataFrame) else None
+    present = [p for p in POLLUTANTS if p in pollutants and p in standard.breakpoints]
+
+    result = {f'aqi_{p}': standard.sub_index(p, pollutants[p]) for p in present}
+    if present:
+        stacked = np.column_stack([result[f'aqi_{p}'] for p in present])
+        valid = ~np.isnan(stacked).all(axis=1)
+        filled = np.where(np.isnan(stacked), -np.inf, stacked)
+        overall = np.where(valid, filled.max(axis=1), np.nan)
+        dominant_codes = np.where(valid, filled.argmax(axis=1), -1)
+    else:
+        n = len(index) if index is not None else 0
+        overall = np.full(n, np.nan)
+        dominant_codes = np.full(n, -1)
+
+    category, color = standard.categorize(overall)
+    result['aqi'] = overall
+    result['dominant_pollutant'] = pd.Categorical.from_codes(dominant_codes, present)
+    result['aqi_category'] = category
+    result['aqi_color'] = color
+    return pd.DataFrame(result, index=index)
+
+
+def rescore(frame, standard=DEFAULT_STANDARD):
+    """
+    Recompute `aqi`, `aqi_category` and `aqi_color` of an observation frame.
+
+    Uses the stored concentrations, so changing the standard needs no re-fetch.
+
+    Returns:
+        pd.DataFrame: A copy of `frame` with the AQI columns replaced
+    """
+    scores = compute_aqi(frame, standard)
+    return frame.assign(aqi=scores['aqi'], aqi_category=scores['aqi_category'], aqi_color=scores['aqi_color'])
+
+
+def calculate_aqi(pm25, pm10, no2, o3, standard=DEFAULT_STANDARD):
+    """Calculate the AQI for a single reading (scalar convenience wrapper)."""
+    standard = get_standard(standard)
+    subs = [standard.sub_index(p, [value])[0] for p, value in zip(POLLUTANTS, (pm25, pm10, no2, o3))]
+    return int(max(subs))
+
+
+def get_aqi_category(aqi, standard=DEFAULT_STANDARD):
+    """Get the (category, color) for a single AQI value."""
+    standard = get_standard(standard)
+    i = int(np.searchsorted(standard.category_bounds, aqi, side='left'))
+    return standard.categories[i], standard.colors[i]
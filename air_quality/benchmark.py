@@ -0,0 +1,147 @@
+"""Startup-time benchmark for the dashboard.
+
+Every measurement runs in a fresh interpreter, as a container cold start
+would, and is repeated to report the median:
+
+- import cost of each heavy dependency and of the package's modules
+- the dashboard's own module-level imports, i.e. what every cold start pays
+  before the script can send its first element
+- the dashboard's first render (a cold script run with sample data, which
+  pays for every import and for building the data and figures) and a second,
+  warm rerun in the same process
+
+    python -m air_quality benchmark --repeat 5
+    python -m air_quality benchmark --json > startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+DEFAULT_MODULES = [
+    'streamlit', 'pandas', 'numpy', 'plotly.express', 'requests', 'geopy', 'pyarrow',
+    'air_quality.pipeline', 'air_quality.charts', 'air_quality.api'
+]
+
+_IMPORT_SCRIPT = """
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+_APP_IMPORTS_SCRIPT = """
+import ast, time
+with open({app!r}, encoding='utf-8') as f:
+    tree = ast.parse(f.read())
+imports = ast.Module([node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))], [])
+code = compile(imports, {app!r}, 'exec')
+start = time.perf_counter()
+exec(code, {{}})
+print(time.perf_counter() - start)
+"""
+
+_RENDER_SCRIPT = """
+import os, time
+os.environ.pop('OPENWEATHER_API_KEY', None)
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+harness = time.perf_counter() - start
+at = AppTest.from_file({app!r}, default_timeout=600)
+start = time.perf_counter()
+at.run()
+first = time.perf_counter() - start
+start = time.perf_counter()
+at.run()
+second = time.perf_counter() - start
+print(harness, first, second, len(at.exception))
+"""
+
+
+def _run(script, cwd):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [cwd, os.environ.get('PYTHONPATH')])))
+    result = subprocess.run([sys.executable, '-c', script], cwd=cwd, env=env, capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "benchmark failed")
+    return [float(value) for value in result.stdout.split()]
+
+
+def measure_imports(modules, repeat=3, cwd='.'):
+    """
+    Time a cold import of each module.
+
+    Returns:
+        dict: Module -> median seconds
+    """
+    return {
+        module: statistics.median(_run(_IMPORT_SCRIPT.format(module=module), cwd)[0] for _ in range(repeat))
+        for module in modules
+    }
+
+
+def measure_app_imports(app='app.py', repeat=3, cwd='.'):
+    """
+    Time running the dashboard's top-level import statements in a fresh process.
+
+    Returns:
+        float: Median seconds
+    """
+    return statistics.median(_run(_APP_IMPORTS_SCRIPT.format(app=app), cwd)[0] for _ in range(repeat))
+
+
+def measure_render(app='app.py', repeat=3, cwd='.'):
+    """
+    Time the dashboard's first (cold) and second (warm) script runs.
+
+    Returns:
+        dict: Median seconds for `harness_import` (Streamlit's test harness),
+            `first_render` and `rerun`, plus the exception count of the last run
+    """
+    runs = [_run(_RENDER_SCRIPT.format(app=app), cwd) for _ in range(repeat)]
+    return {
+        'harness_import': statistics.median(run[0] for run in runs),
+        'first_render': statistics.median(run[1] for run in runs),
+        'rerun': statistics.median(run[2] for run in runs),
+        'exceptions': int(runs[-1][3])
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure dashboard import and first-render cost in fresh processes.")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per measurement (median is reported)")
+    parser.add_argument('--app', default='app.py', help="Dashboard script")
+    parser.add_argument('--modules', nargs='*', default=DEFAULT_MODULES, help="Modules to time importing")
+    parser.add_argument('--skip-render', action='store_true', help="Only time imports")
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    cwd = os.path.dirname(os.path.abspath(args.app))
+    app = os.path.basename(args.app)
+    results = {
+        'imports': measure_imports(args.modules, args.repeat, cwd),
+        'app_imports': measure_app_imports(app, args.repeat, cwd)
+    }
+    if not args.skip_render:
+        results['render'] = measure_render(app, args.repeat, cwd)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"Cold import (median of {args.repeat}):")
+    for module, seconds in results['imports'].items():
+        print(f"  {module:<24} {seconds * 1000:8.0f} ms")
+    print(f"Dashboard ({args.app}):")
+    print(f"  {'module imports':<24} {results['app_imports'] * 1000:8.0f} ms")
+    if 'render' in results:
+        render = results['render']
+        print(f"  {'first render (sample)':<24} {render['first_render'] * 1000:8.0f} ms")
+        print(f"  {'rerun (sample)':<24} {render['rerun'] * 1000:8.0f} ms")
+        if render['exceptions']:
+            print(f"  {render['exceptions']} exception(s) raised while rendering")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,483 @@
+"""HTML rendering of the Overview AQI cards.
+
+The card stylesheet is static: theme colors come from the `--aq-*` CSS custom
+properties emitted by `theme_css`, and each card's category color from custom
+properties set inline on the card. The stylesheet is therefore injected once
+per page, and all cards are rendered as one HTML grid whose size grows with
+the number of cards only. Card fields are formatted column-wise over the
+whole frame.
+"""
+import html
+
+import numpy as np
+import pandas as pd
+
+from air_quality.aqi import DEFAULT_STANDARD, categorize
+
+NO_DATA_COLOR = '#666666'
+
+CARD_STYLESHEET = """
+<style>
+/* Card grid */
+.aqi-grid {
+    display: grid;
+    gap: 16px;
+    margin-bottom: 8px;
+}
+
+@media (max-width: 640px) {
+    .aqi-grid {
+        grid-template-columns: 1fr !important;
+    }
+}
+
+/* Base styles for all devices */
+.aqi-card {
+    background: var(--aq-card-bg);
+    border-radius: 12px;
+    padding: 16px;
+    margin-bottom: 20px;
+    box-shadow: 0 2px 4px var(--aq-shadow);
+    border-left: 4px solid var(--aq-color);
+    transition: all 0.3s ease;
+    width: 100%;
+    box-sizing: border-box;
+    color: var(--aq-text);
+}
+
+.aqi-header {
+    border-bottom: 1px solid var(--aq-border);
+    padding-bottom: 10px;
+    margin-bottom: 12px;
+    display: flex;
+    flex-direction: column;
+    gap: 8px;
+}
+
+.location-name {
+    font-size: 1.25rem;
+    font-weight: 700;
+    color: var(--aq-text);
+    margin: 0;
+    line-height: 1.2;
+}
+
+.aqi-category {
+    display: inline-block;
+    background: var(--aq-color-soft);
+    color: var(--aq-color);
+    padding: 4px 10px;
+    border-radius: 12px;
+    font-size: 0.75rem;
+    font-weight: 600;
+    text-align: center;
+    width: fit-content;
+}
+
+.aqi-value {
+    font-size: 2.5rem;
+    font-weight: 800;
+    color: var(--aq-color);
+    text-align: center;
+    margin: 12px 0;
+    line-height: 1;
+    text-shadow: 0 2px 4px var(--aq-color-glow);
+}
+
+.weather-section {
+    background: var(--aq-weather-bg);
+    border-radius: 8px;
+    padding: 12px;
+    margin: 16px 0;
+    border: 1px solid var(--aq-border);
+}
+
+.weather-content {
+    display: flex;
+    flex-direction: column;
+    gap: 8px;
+}
+
+.weather-row {
+    display: flex;
+    justify-content: space-between;
+    align-items: center;
+}
+
+.weather-info {
+    display: flex;
+    align-items: center;
+    gap: 10px;
+}
+
+.weather-emoji {
+    font-size: 1.8rem;
+    line-height: 1;
+}
+
+.weather-text {
+    font-size: 1rem;
+    font-weight: 600;
+    color: var(--aq-text);
+}
+
+.weather-label {
+    font-size: 0.8rem;
+    color: var(--aq-text-secondary);
+    margin-top: 2px;
+}
+
+.temp-display {
+    text-align: center;
+    min-width: 80px;
+}
+
+.temp-label {
+    font-size: 0.8rem;
+    color: var(--aq-text-secondary);
+    margin-bottom: 2px;
+}
+
+.temp-value {
+    font-size: 1.4rem;
+    font-weight: 700;
+    color: var(--aq-text);
+}
+
+.metrics-container {
+    display: grid;
+    grid-template-columns: 1fr 1fr;
+    gap: 10px;
+    margin: 16px 0;
+}
+
+.metric-card {
+    background: var(--aq-metric-bg);
+    border-radius: 8px;
+    padding: 10px;
+    box-shadow: 0 1px 3px var(--aq-shadow);
+    border: 1px solid var(--aq-border);
+    min-height: 60px;
+    display: flex;
+    align-items: center;
+    transition: all 0.2s ease;
+}
+
+.metric-icon {
+    background: var(--aq-icon-bg);
+    width: 32px;
+    height: 32px;
+    border-radius: 50%;
+    display: flex;
+    align-items: center;
+    justify-content: center;
+    margin-right: 10px;
+    flex-shrink: 0;
+}
+
+.wind-icon {
+    background: var(--aq-wind-icon-bg) !important;
+}
+
+.metric-icon span {
+    font-size: 1.1rem;
+}
+
+.metric-value {
+    font-size: 1.1rem;
+    font-weight: 600;
+    color: var(--aq-text);
+    line-height: 1.2;
+}
+
+.metric-label {
+    font-size: 0.75rem;
+    color: var(--aq-text-secondary);
+    margin-top: 2px;
+}
+
+.last-updated {
+    display: flex;
+    justify-content: flex-end;
+    align-items: center;
+    gap: 6px;
+    font-size: 0.75rem;
+    color: var(--aq-text-secondary);
+    margin-top: 12px;
+}
+
+/* Tablet and larger */
+@media (min-width: 640px) {
+    .aqi-card {
+        padding: 20px;
+        margin-bottom: 24px;
+    }
+
+    .aqi-header {
+        flex-direction: row;
+        justify-content: space-between;
+        align-items: center;
+        gap: 16px;
+    }
+
+    .location-name {
+        font-size: 1.4rem;
+    }
+
+    .weather-content {
+        flex-direction: row;
+        justify-content: space-between;
+        align-items: center;
+    }
+
+    .metrics-container {
+        grid-template-columns: 1fr 1fr;
+        gap: 12px;
+    }
+}
+
+/* Desktop */
+@media (min-width: 1024px) {
+    .aqi-value {
+        font-size: 2.8rem;
+        margin: 16px 0;
+    }
+
+    .weather-emoji {
+        font-size: 2rem;
+    }
+
+    .weather-text {
+        font-size: 1.1rem;
+    }
+
+    .temp-value {
+        font-size: 1.6rem;
+    }
+
+    .metric-card {
+        padding: 12px;
+        min-height: 70px;
+    }
+
+    .metric-icon {
+        width: 36px;
+        height: 36px;
+    }
+
+    .metric-icon span {
+        font-size: 1.2rem;
+    }
+
+    .metric-value {
+        font-size: 1.2rem;
+    }
+}
+
+/* Hover effects for devices that support hover */
+@media (hover: hover) {
+    .aqi-card:hover {
+        transform: translateY(-2px);
+        box-shadow: 0 4px 12px var(--aq-shadow);
+        background: var(--aq-hover-bg);
+    }
+
+    .metric-card:hover {
+        transform: translateY(-1px);
+        box-shadow: 0 2px 8px var(--aq-shadow);
+        background: var(--aq-hover-bg);
+    }
+}
+
+/* System preference for dark mode */
+@media (prefers-color-scheme: dark) {
+    .stApp {
+        background-color: #121212 !important;
+        color: #f0f0f0 !important;
+    }
+
+    .stSidebar {
+        background-color: #1e1e1e !important;
+    }
+
+    .stTextInput > div > div > input,
+    .stTextInput > div > div > input:focus {
+        background-color: #2d2d2d;
+        color: #f0f0f0;
+        border-color: #444;
+    }
+
+    .stButton > button {
+        background-color: #3a3a3a;
+        color: #f0f0f0;
+        border-color: #444;
+    }
+
+    .stButton > button:hover {
+        background-color: #4a4a4a;
+        border-color: #666;
+    }
+}
+
+/* Dark mode overrides */
+.stApp[data-theme="dark"] {
+    background-color: #121212 !important;
+    color: #f0f0f0 !important;
+}
+
+.stApp[data-theme="dark"] .stSidebar {
+    background-color: #1e1e1e !important;
+}
+
+.stApp[data-theme="dark"] .stTextInput > div > div > input,
+.stApp[data-theme="dark"] .stTextInput > div > div > input:focus {
+    background-color: #2d2d2d;
+    color: #f0f0f0;
+    border-color: #444;
+}
+
+.stApp[data-theme="dark"] .stButton > button {
+    background-color: #3a3a3a;
+    color: #f0f0f0;
+    border-color: #444;
+}
+
+.stApp[data-theme="dark"] .stButton > button:hover {
+    background-color: #4a4a4a;
+    border-color: #666;
+}
+</style>
+"""
+
+# Keywords (checked in order) -> weather emoji
+_WEATHER_EMOJI = [
+    (('rain', 'drizzle', 'shower'), '🌧️'),
+    (('thunder', 'storm', 'lightning'), '⛈️'),
+    (('snow', 'sleet', 'blizzard'), '❄️'),
+    (('fog', 'mist', 'haze'), '🌫️'),
+    (('cloud', 'overcast'), '☁️'),
+    (('clear', 'sunny', 'fair'), '☀️'),
+]
+_DEFAULT_WEATHER_EMOJI = '🌡️'
+
+_CARD_TEMPLATE = (
+    "<div class='aqi-card' style='--aq-color: {color}; --aq-color-soft: {color}15; --aq-color-glow: {color}20;'>"
+    "<div class='aqi-header'>"
+    "<div class='location-name'>{location}</div>"
+    "<div class='aqi-category'>{category}</div>"
+    "</div>"
+    "<div class='aqi-value'>{aqi}</div>"
+    "<div class='weather-section'>"
+    "<div class='weather-content'>"
+    "<div class='weather-row'>"
+    "<div class='weather-info'>"
+    "<span class='weather-emoji'>{emoji}</span>"
+    "<div>"
+    "<div class='weather-text'>{weather}</div>"
+    "<div class='weather-label'>Weather Condition</div>"
+    "</div>"
+    "</div>"
+    "<div class='temp-display'>"
+    "<div class='temp-label'>Temperature</div>"
+    "<div class='temp-value'>{temp}</div>"
+    "</div>"
+    "</div>"
+    "</div>"
+    "</div>"
+    "<div class='metrics-container'>"
+    "<div class='metric-card'>"
+    "<div class='metric-icon'><span>💧</span></div>"
+    "<div>"
+    "<div class='metric-value'>{humidity}</div>"
+    "<div class='metric-label'>Humidity</div>"
+    "</div>"
+    "</div>"
+    "<div class='metric-card'>"
+    "<div class='metric-icon wind-icon'><span>💨</span></div>"
+    "<div>"
+    "<div class='metric-value'>{wind_speed}</div>"
+    "<div class='metric-label'>Wind Speed</div>"
+    "</div>"
+    "</div>"
+    "</div>"
+    "<div class='last-updated'>"
+    "<span>🕒</span>"
+    "<span>Updated: {updated}</span>"
+    "</div>"
+    "</div>"
+)
+
+
+def theme_css(colors):
+    """
+    Get a stylesheet defining the theme colors as `--aq-*` custom properties.
+
+    Args:
+        colors (dict): Theme color name -> CSS color, e.g. {'card_bg': '#fff'}
+
+    Returns:
+        str: A `<style>` block for st.markdown
+    """
+    variables = ' '.join(f"--aq-{key.replace('_', '-')}: {value};" for key, value in colors.items())
+    return f"<style>:root {{ {variables} }}</style>"
+
+
+def weather_emoji(conditions):
+    """Map weather descriptions to emoji in one pass; missing ones get a thermometer."""
+    text = pd.Series(conditions, dtype=object).fillna('').astype(str).str.lower()
+    choices = [text.str.contains('|'.join(terms), regex=True).to_numpy() for terms, _ in _WEATHER_EMOJI]
+    return np.select(choices, [emoji for _, emoji in _WEATHER_EMOJI], default=_DEFAULT_WEATHER_EMOJI)
+
+
+def render_cards(frame, standard=DEFAULT_STANDARD, max_columns=4):
+    """
+    Render one AQI card per row as a single HTML grid.
+
+    Args:
+        frame (pd.DataFrame): One row per location with `location`, `date`,
+            `aqi`, `temp_c`, `humidity`, `wind_speed` and `weather`; missing
+            values are shown as placeholders
+        standard (str or AQIStandard): Standard whose categories and colors to use
+        max_columns (int): Maximum cards per row
+
+    Returns:
+        str: HTML for st.markdown (requires CARD_STYLESHEET on the page)
+    """
+    if frame.empty:
+        return ""
+
+    # Cards show whole AQI values, so categorize the rounded value
+    aqi = np.round(pd.to_numeric(frame['aqi'], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan))
+    has_aqi = ~np.isnan(aqi)
+    category, color = categorize(aqi, standard)
+    category = np.where(has_aqi, np.asarray(category, dtype=object), 'No data')
+    color = np.where(has_aqi, np.asarray(color, dtype=object), NO_DATA_COLOR)
+    aqi_text = np.where(has_aqi, np.char.mod('%d', np.nan_to_num(aqi).astype(np.int64)), '--')
+
+    weather = frame['weather'].astype(object) if 'weather' in frame else pd.Series(None, index=frame.index, dtype=object)
+    dates = pd.to_datetime(frame['date'])
+
+    columns = {
+        'color': color,
+        'location': frame['location'].astype(str).map(html.escape).to_numpy(),
+        'category': category,
+        'aqi': aqi_text,
+        'emoji': weather_emoji(weather),
+        'weather': weather.where(weather.notna(), 'No data').astype(str).map(html.escape).to_numpy(),
+        'temp': _format(frame['temp_c'], '%.1f°C', '--°C'),
+        'humidity': _format(frame['humidity'], '%.1f%%', '--%'),
+        'wind_speed': _format(frame['wind_speed'], '%.1f m/s', '-- m/s'),
+        'updated': dates.dt.strftime('%b %d, %I:%M %p').fillna('--:--').to_numpy(),
+    }
+    cards = ''.join(
+        _CARD_TEMPLATE.format(**dict(zip(columns, values)))
+        for values in zip(*columns.values())
+    )
+    num_columns = max(1, min(max_columns, len(frame)))
+    return f"<div class='aqi-grid' style='grid-template-columns: repeat({num_columns}, minmax(0, 1fr));'>{cards}</div>"
+
+
+def _format(values, pattern, missing):
+    """Format a numeric column with a printf-style pattern, using `missing` for NaN."""
+    numbers = pd.to_numeric(values, errors='coerce').to_numpy(dtype=np.float64)
+    return np.where(np.isnan(numbers), missing, np.char.mod(pattern, np.nan_to_num(numbers)))
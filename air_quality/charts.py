@@ -0,0 +1,321 @@
+"""Plotly figures for the dashboard.
+
+Each function builds one chart from the frames the dashboard already holds
+and returns a `go.Figure`. Plotly is imported on first use rather than with
+this module, so processes that never draw a chart (the API, the CLI) don't pay
+for it, and the dashboard's first elements render before it loads.
+"""
+import pandas as pd
+
+from air_quality.aqi import DEFAULT_STANDARD, get_standard
+from air_quality.downsample import downsample
+from air_quality.mapbins import bin_stations, map_center
+
+DEFAULT_TREND_POINTS = 1000     # Max points drawn per trend series
+DEFAULT_WEBGL_THRESHOLD = 5000  # Draw trend charts with WebGL above this many points
+
+
+def weather_scatter(daily_avg):
+    """
+    Temperature vs AQI bubble chart, one color per location and bubbles sized by humidity.
+
+    Args:
+        daily_avg (pd.DataFrame): Daily rollups with `temp_c`, `aqi`, `humidity`,
+            `weather` and `wind_speed`
+
+    Returns:
+        plotly.graph_objects.Figure: The chart
+    """
+    import plotly.express as px
+
+    # Create a copy of the data and handle NaN values
+    plot_data = daily_avg.copy()
+
+    # Fill NaN values in humidity with the mean, or 50 if all values are NaN
+    if 'humidity' in plot_data.columns:
+        mean_humidity = plot_data['humidity'].mean()
+        plot_data['humidity'] = plot_data['humidity'].fillna(mean_humidity if not pd.isna(mean_humidity) else 50)
+
+    fig_scatter = px.scatter(
+        plot_data,
+        x='temp_c',
+        y='aqi',
+        color='location',
+        size='humidity',
+        hover_data={
+            'location': True,
+            'date': '|%Y-%m-%d %H:%M',
+            'weather': True,
+            'temp_c': ':.1f°C',
+            'humidity': ':.0f%',
+            'aqi': ':.0f',
+            'wind_speed': ':.1f m/s'
+        },
+        labels={
+            'temp_c': 'Temperature (°C)',
+            'aqi': 'Air Quality Index (AQI)',
+            'humidity': 'Humidity',
+            'location': 'Location'
+        },
+        title='Temperature vs Air Quality Index',
+        size_max=30,  # Limit the maximum bubble size
+        template='plotly_white'
+    )
+
+    # Customize the plot appearance
+    fig_scatter.update_layout(
+        plot_bgcolor='rgba(0,0,0,0.02)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        xaxis=dict(
+            title='Temperature (°C)',
+            showgrid=True,
+            gridcolor='rgba(0,0,0,0.05)',
+            showline=True,
+            linewidth=1,
+            linecolor='lightgray'
+        ),
+        yaxis=dict(
+            title='Air Quality Index (AQI)',
+            showgrid=True,
+            gridcolor='rgba(0,0,0,0.05)',
+            showline=True,
+            linewidth=1,
+            linecolor='lightgray'
+        ),
+        legend=dict(
+            title='',
+            orientation='h',
+            yanchor='bottom',
+            y=1.02,
+            xanchor='right',
+            x=1
+        ),
+        hovermode='closest',
+        margin=dict(l=0, r=0, t=40, b=20),
+        height=500
+    )
+
+    # Customize hover template
+    fig_scatter.update_traces(
+        hovertemplate="""
+        <b>%{customdata[0]}</b><br>
+        Date: %{customdata[1]}<br>
+        Weather: %{customdata[2]}<br>
+        Temp: %{customdata[3]}<br>
+        AQI: %{y:.0f}<br>
+        Humidity: %{customdata[4]}<br>
+        Wind: %{customdata[5]}<br>
+        <extra></extra>
+        """
+    )
+    return fig_scatter
+
+
+def trend_figure(hourly_avg, metric, compare_metrics=(), max_points=DEFAULT_TREND_POINTS,
+                 webgl_threshold=DEFAULT_WEBGL_THRESHOLD):
+    """
+    Time series of a metric per location, with optional all-location averages on a secondary axis.
+
+    Args:
+        hourly_avg (pd.DataFrame): Hourly rollups of the selected locations
+        metric (str): Primary metric, one line per location
+        compare_metrics (iterable): Metrics averaged over all locations (weighted
+            by observation count) on the right axis
+        max_points (int): Series longer than this are downsampled with LTTB
+        webgl_threshold (int): Draw with WebGL traces above this many points in total
+
+    Returns:
+        plotly.graph_objects.Figure: The chart
+    """
+    import plotly.graph_objects as go
+
+    compare_metrics = list(compare_metrics)
+    # Downsample every series to the point budget, and draw with WebGL when still heavy
+    series = [
+        (location, *downsample(location_data['date'], location_data[metric], max_points))
+        for location, location_data in hourly_avg.groupby('location', observed=True, sort=False)
+    ]
+
+    # Average secondary metrics over all locations at once, weighted by each hour's observation count
+    totals = hourly_avg.groupby('date')[
+        [f'{m}_{stat}' for m in compare_metrics for stat in ('sum', 'count')]
+    ].sum()
+    secondary = [
+        (comp_metric, *downsample(totals.index, totals[f'{comp_metric}_sum'] / totals[f'{comp_metric}_count'], max_points))
+        for comp_metric in compare_metrics
+    ]
+
+    n_points = sum(len(x) for _, x, _ in series + secondary)
+    Scatter = go.Scattergl if n_points > webgl_threshold else go.Scatter
+
+    # Create figure with secondary y-axis
+    fig = go.Figure()
+
+    # Add primary metric
+    for location, x, y in series:
+        fig.add_trace(Scatter(
+            x=x,
+            y=y,
+            name=f"{location} - {metric.upper()}",
+            mode='lines+markers',
+            line=dict(width=2)
+        ))
+
+    # Add secondary metrics
+    for i, (comp_metric, x, y) in enumerate(secondary):
+        if i == 0:  # Only show legend for first secondary metric to avoid duplicates
+            show_legend = True
+            name = f"{comp_metric.upper()} (right axis)"
+        else:
+            show_legend = False
+            name = f"{comp_metric.upper()}"
+
+        fig.add_trace(Scatter(
+            x=x,
+            y=y,
+            name=name,
+            yaxis='y2',
+            line=dict(dash='dot', width=1, color=f'rgb({200 - i*30}, {100 - i*20}, {i*50})'),
+            showlegend=show_legend
+        ))
+
+    # Update layout with rangeslider and buttons
+    fig.update_layout(
+        xaxis=dict(
+            rangeselector=dict(
+                buttons=list([
+                    dict(count=1, label="1m", step="month", stepmode="backward"),
+                    dict(count=3, label="3m", step="month", stepmode="backward"),
+                    dict(count=6, label="6m", step="month", stepmode="backward"),
+                    dict(count=1, label="YTD", step="year", stepmode="todate"),
+                    dict(step="all")
+                ])
+            ),
+            rangeslider=dict(visible=True),
+            type="date"
+        ),
+        yaxis=dict(title=metric.upper()),
+        yaxis2=dict(
+            title="Secondary Metrics",
+            overlaying="y",
+            side="right",
+            showgrid=False
+        ) if compare_metrics else {},
+        hovermode="x unified",
+        height=500
+    )
+    return fig
+
+
+def aqi_heatmap(weekly_avg, standard=DEFAULT_STANDARD):
+    """
+    Weekly AQI per location as a heatmap, annotated with the standard's category bands.
+
+    Args:
+        weekly_avg (pd.DataFrame): Weekly rollups
+        standard (str): AQI standard whose bands are annotated
+
+    Returns:
+        plotly.graph_objects.Figure: The chart
+    """
+    import plotly.express as px
+
+    heatmap_df = weekly_avg.pivot(index='location', columns='date', values='aqi')
+
+    fig_heatmap = px.imshow(
+        heatmap_df,
+        labels=dict(x="Week", y="Location", color="AQI"),
+        color_continuous_scale='RdYlGn_r',  # Red-Yellow-Green (reversed)
+        aspect="auto"
+    )
+
+    # Add AQI color scale annotations for the selected standard
+    standard = get_standard(standard)
+    aqi_breaks = [0] + [int(b) for b in standard.category_bounds] + [int(standard.max_index)]
+    aqi_colors = standard.colors
+
+    for i in range(len(aqi_breaks) - 1):
+        fig_heatmap.add_annotation(
+            x=1.02,
+            y=1 - (i * 0.15),
+            xref="paper",
+            yref="paper",
+            text=f"{aqi_breaks[i]}-{aqi_breaks[i+1]}",
+            showarrow=False,
+            bgcolor=aqi_colors[i],
+            bordercolor='#333',
+            borderwidth=1,
+            borderpad=2,
+            opacity=0.8,
+            font=dict(color='black' if i < 3 else 'white')
+        )
+
+    fig_heatmap.update_layout(
+        coloraxis_colorbar=dict(
+            title="AQI",
+            thicknessmode="pixels", thickness=20,
+            lenmode="pixels", len=300,
+            yanchor="top", y=1,
+            xanchor="left", x=1.02
+        ),
+        margin=dict(l=100, r=150)  # Add margin for annotations
+    )
+    return fig_heatmap
+
+
+def aqi_map(map_data, zoom):
+    """
+    Map of stations binned on a grid sized for a zoom level.
+
+    Args:
+        map_data (pd.DataFrame): One row per station with `location`, `latitude`,
+            `longitude`, `aqi`, `pm25`, `pm10`, `temp_c` and `weather`
+        zoom (int): Map zoom level, which also sets the bin size
+
+    Returns:
+        plotly.graph_objects.Figure: The chart
+    """
+    import plotly.express as px
+
+    bins = bin_stations(map_data, zoom, metrics=['aqi', 'pm25', 'pm10', 'temp_c'])
+
+    # Create map
+    fig_map = px.scatter_mapbox(
+        bins,
+        lat='latitude',
+        lon='longitude',
+        color='aqi',
+        color_continuous_scale='RdYlGn_r',
+        size='aqi',
+        size_max=30,
+        hover_name='label',
+        hover_data={
+            'aqi': ':.0f',
+            'aqi_max': ':.0f',
+            'pm25': ':.1f',
+            'pm10': ':.1f',
+            'temp_c': ':.1f',
+            'weather': True,
+            'stations': True,
+            'latitude': False,
+            'longitude': False
+        },
+        labels={'aqi_max': 'worst aqi'},
+        zoom=zoom,
+        center=map_center(map_data['latitude'], map_data['longitude']),
+        height=600
+    )
+
+    # Update map layout
+    fig_map.update_layout(
+        mapbox_style="open-street-map",
+        margin={"r": 0, "t": 0, "l": 0, "b": 0},
+        coloraxis_colorbar=dict(
+            title="AQI",
+            thicknessmode="pixels", thickness=20,
+            lenmode="pixels", len=300,
+            yanchor="top", y=1,
+            xanchor="left", x=1.02
+        )
+    )
+    return fig_map
@@ -0,0 +1,267 @@
+"""Command-line entry point for bulk AQI reports and the package's services.
+
+    python -m air_quality report cities.txt -o report.csv --concurrency 16 --rate 20
+    python -m air_quality serve --port 8600
+    python -m air_quality sample --locations 1000 --span 30D --freq h -o sample.parquet
+    python -m air_quality geocode places.csv
+    python -m air_quality benchmark
+
+`report` reads location names (one per line, or a CSV with a `name` or
+`location` column) and/or coordinates (`lat, lon` lines, or `latitude` and
+`longitude` CSV columns), fetches current air quality and weather for all of
+them concurrently through the same pipeline as the dashboard, scores them with
+the chosen AQI standard and writes one row per location as CSV, Parquet or
+JSON. Locations that fail get a row with `status` "error" and the reason, and
+locations given only as coordinates are labelled with the nearest known place
+from the offline gazetteer.
+Nothing here imports Streamlit.
+"""
+import argparse
+import csv
+import importlib
+import os
+import re
+import sys
+import threading
+import time
+
+import pandas as pd
+
+from air_quality.aqi import DEFAULT_STANDARD, STANDARDS, rescore
+from air_quality.fetch import DEFAULT_MAX_WORKERS, fetch_locations
+from air_quality.gazetteer import get_gazetteer
+from air_quality.geocoding import get_geocode_cache, lookup as geocode_lookup
+from air_quality.pipeline import DEFAULT_LOCATIONS, fetch_air_quality, fetch_weather, load_sample, process_air_quality_data
+from air_quality.schema import COLUMNS, conform
+
+REPORT_FORMATS = ('csv', 'parquet', 'json')
+
+# The package's other tools, run with their own arguments: command -> (module, summary)
+TOOLS = {
+    'serve': ('air_quality.api', "Serve the headless JSON/Arrow API"),
+    'sample': ('air_quality.sample', "Generate a synthetic dataset"),
+    'geocode': ('air_quality.geocoding', "Pre-warm the geocode cache from a CSV"),
+    'benchmark': ('air_quality.benchmark', "Measure dashboard import and first-render time"),
+}
+
+_COORDINATES = re.compile(r'^\s*(-?\d+(?:\.\d+)?)\s*[,;\s]\s*(-?\d+(?:\.\d+)?)\s*$')
+
+
+class RateLimiter:
+    """Spaces calls evenly to at most `rate` per second across threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+    def wrap(self, fetch):
+        def limited(*args, **kwargs):
+            self.wait()
+            return fetch(*args, **kwargs)
+        return limited
+
+
+def read_locations(path):
+    """
+    Read locations from a text or CSV file ('-' for stdin).
+
+    Returns:
+        dict: Location label -> (lat, lon), or None when it has to be geocoded
+    """
+    stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+    try:
+        if path.endswith('.csv'):
+            rows = list(csv.DictReader(stream))
+            return {_csv_label(row): _csv_coordinates(row) for row in rows if _csv_label(row)}
+
+        locations = {}
+        for line in stream:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            match = _COORDINATES.match(line)
+            locations[line] = (float(match.group(1)), float(match.group(2))) if match else None
+        return locations
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def _csv_value(row, *names):
+    for name in names:
+        value = (row.get(name) or '').strip()
+        if value:
+            return value
+    return None
+
+
+def _csv_coordinates(row):
+    lat = _csv_value(row, 'latitude', 'lat')
+    lon = _csv_value(row, 'longitude', 'lon', 'lng')
+    return (float(lat), float(lon)) if lat is not None and lon is not None else None
+
+
+def _csv_label(row):
+    label = _csv_value(row, 'name', 'location')
+    if label is None and _csv_coordinates(row) is not None:
+        label = '{:.4f}, {:.4f}'.format(*_csv_coordinates(row))
+    return label
+
+
+def build_report(locations, api_key=None, standard=DEFAULT_STANDARD, concurrency=DEFAULT_MAX_WORKERS,
+                 rate=None, progress=None):
+    """
+    Fetch and score the current air quality of many locations.
+
+    Args:
+        locations (dict): Location label -> (lat, lon), or None to geocode it
+        api_key (str): OpenWeatherMap API key; sample data is used without one
+        standard (str): AQI standard to score with
+        concurrency (int): Maximum number of upstream calls in flight
+        rate (float): Maximum upstream calls per second (unlimited if None)
+        progress (callable): Called with (done, total) as locations complete
+
+    Returns:
+        pd.DataFrame: One row per location with the observation columns plus
+            `status` ("ok" or "error"), `error`, and for locations given only
+            as coordinates `nearest_place` and its distance `nearest_km`
+    """
+    labels = list(locations)
+    if not api_key:
+        coordinates = {**DEFAULT_LOCATIONS, **{k: v for k, v in locations.items() if v is not None}}
+        df = load_sample(labels, span='1D', freq='h', coordinates=coordinates)
+        report = conform(rescore(df, standard)).groupby('location', observed=True, sort=False).tail(1).reset_index(drop=True)
+        report['location'] = report['location'].astype(str)
+        return _with_nearest_places(_with_status(report, labels, {}), locations)
+
+    cache = get_geocode_cache()
+    limiter = RateLimiter(rate)
+
+    def resolve(label):
+        coords = locations.get(label)
+        return coords if coords is not None else geocode_lookup(label, cache=cache)
+
+    endpoints = {
+        'air quality': limiter.wrap(lambda lat, lon: fetch_air_quality(lat, lon, api_key)),
+        'weather': limiter.wrap(lambda lat, lon: fetch_weather(lat, lon, api_key))
+    }
+
+    rows, errors = [], {}
+    for done, result in enumerate(fetch_locations(labels, resolve, endpoints, max_workers=concurrency), 1):
+        if result.coords is None:
+            errors[result.location] = result.errors.get('coordinates', "Could not find coordinates")
+        elif result.errors:
+            errors[result.location] = '; '.join(f"{endpoint}: {error}" for endpoint, error in result.errors.items())
+        else:
+            row = process_air_quality_data(result.data['air quality'], result.data['weather'], result.location)
+            if row is None:
+                errors[result.location] = "No air quality data"
+            else:
+                # Report the requested point, not OpenWeatherMap's rounded one
+                row['latitude'], row['longitude'] = result.coords
+                rows.append(row)
+        if progress is not None:
+            progress(done, len(labels))
+
+    report = conform(rescore(pd.DataFrame(rows, columns=COLUMNS), standard)).reset_index(drop=True)
+    report['location'] = report['location'].astype(str)
+    return _with_nearest_places(_with_status(report, labels, errors), locations)
+
+
+def _with_status(report, labels, errors):
+    """Add status columns and a row for every failed location, in input order."""
+    report = report.assign(status='ok', error=None)
+    failed = pd.DataFrame({'location': list(errors), 'status': 'error', 'error': list(errors.values())})
+    report = pd.concat([report, failed], ignore_index=True) if len(failed) else report
+    order = {label: i for i, label in enumerate(labels)}
+    return report.sort_values('location', key=lambda s: s.map(order), kind='stable').reset_index(drop=True)
+
+
+def _with_nearest_places(report, locations):
+    """Label locations given only as coordinates with the nearest gazetteer place."""
+    places, distances = [], []
+    for label in report['location']:
+        coords = locations.get(label)
+        nearest = get_gazetteer().nearest(*coords) if coords is not None and _COORDINATES.match(label) else None
+        places.append(nearest[0] if nearest else None)
+        distances.append(round(nearest[1], 1) if nearest else float('nan'))
+    return report.assign(nearest_place=places, nearest_km=distances)
+
+
+def write_report(report, path, fmt=None):
+    """Write a report as CSV, Parquet or JSON records ('-' writes CSV or JSON to stdout)."""
+    fmt = fmt or (os.path.splitext(path)[1].lstrip('.').lower() if path != '-' else 'csv')
+    if fmt not in REPORT_FORMATS:
+        raise ValueError(f"Unknown report format {fmt!r}; expected one of {', '.join(REPORT_FORMATS)}")
+    target = sys.stdout if path == '-' else path
+    if fmt == 'csv':
+        report.to_csv(target, index=False)
+    elif fmt == 'json':
+        report.to_json(target, orient='records', date_format='iso', indent=2 if path == '-' else None)
+    elif path == '-':
+        raise ValueError("Parquet can't be written to stdout")
+    else:
+        report.to_parquet(target, index=False)
+
+
+def report_command(args):
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    locations = read_locations(args.input)
+    api_key = None if args.sample else os.getenv('OPENWEATHER_API_KEY')
+    if not api_key:
+        print("No OpenWeatherMap API key (or --sample given): reporting sample data.", file=sys.stderr)
+
+    def progress(done, total):
+        if not args.quiet and (done == total or done % 50 == 0):
+            print(f"\r{done}/{total} locations", end='\n' if done == total else '', file=sys.stderr, flush=True)
+
+    start = time.perf_counter()
+    report = build_report(locations, api_key, args.standard, args.concurrency, args.rate, progress)
+    elapsed = time.perf_counter() - start
+    write_report(report, args.output, args.format)
+
+    failed = int((report['status'] == 'error').sum())
+    print(f"Reported {len(report) - failed:,} locations ({failed:,} failed) in {elapsed:.1f}s "
+          f"({len(report) / max(elapsed, 1e-9):,.1f} locations/s)", file=sys.stderr)
+    return 1 if failed and failed == len(report) else 0
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in TOOLS:
+        return importlib.import_module(TOOLS[argv[0]][0]).main(argv[1:]) or 0
+
+    parser = argparse.ArgumentParser(prog='python -m air_quality', description="Air quality data tools.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    report = commands.add_parser('report', help="Write a current AQI report for many locations")
+    report.add_argument('input', help="Text file of names or 'lat, lon' lines, or a CSV; '-' reads stdin")
+    report.add_argument('-o', '--output', default='-', help="Output .csv, .parquet or .json file (default: CSV to stdout)")
+    report.add_argument('--format', choices=REPORT_FORMATS, help="Output format (default: from the file extension)")
+    report.add_argument('--standard', choices=list(STANDARDS), default=DEFAULT_STANDARD, help="AQI standard")
+    report.add_argument('--concurrency', type=int, default=int(os.getenv('FETCH_CONCURRENCY', DEFAULT_MAX_WORKERS)),
+                        help="Maximum upstream calls in flight")
+    report.add_argument('--rate', type=float, help="Maximum upstream calls per second")
+    report.add_argument('--sample', action='store_true', help="Use sample data instead of OpenWeatherMap")
+    report.add_argument('--quiet', action='store_true', help="Don't show progress")
+    report.set_defaults(run=report_command)
+
+    # Listed for --help; their arguments are parsed by the tools themselves
+    for name, (_, summary) in TOOLS.items():
+        commands.add_parser(name, help=summary)
+
+    args = parser.parse_args(argv)
+    return args.run(args) or 0
@@ -0,0 +1,159 @@
+"""Shared HTTP client for upstream API calls.
+
+All OpenWeatherMap requests go through one process-wide `requests.Session` so
+TCP/TLS connections are pooled and kept alive between calls. Every request has
+a timeout, and 429/5xx responses or dropped connections are retried with
+jittered exponential backoff. Each call is timed as an `http` span when a
+trace is being recorded, and every attempt is counted in the upstream metrics
+by URL path and status (`timeout` or `error` for requests that got no response).
+"""
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from air_quality.metrics import UPSTREAM_LATENCY, UPSTREAM_REQUESTS
+from air_quality.tracing import span
+
+DEFAULT_POOL_SIZE = 16
+DEFAULT_CONNECT_TIMEOUT = 3.05
+DEFAULT_READ_TIMEOUT = 10
+DEFAULT_MAX_RETRIES = 3
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class HttpClient:
+    """A pooled, keep-alive HTTP client with timeouts and retries."""
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE,
+                 timeout=(DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT),
+                 max_retries=DEFAULT_MAX_RETRIES, backoff_factor=0.5, backoff_max=8.0):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+
+        # Retries are handled here rather than by urllib3 so they can be counted and jittered
+        self._adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount('http://', self._adapter)
+        self.session.mount('https://', self._adapter)
+
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._retries = 0
+
+    def get(self, url, params=None, timeout=None):
+        """
+        Send a GET request, retrying on 429/5xx responses and connection errors.
+
+        Read timeouts are not retried, so a stalled upstream costs at most one
+        read timeout per call.
+
+        Args:
+            url (str): URL to fetch
+            params (dict): Query string parameters
+            timeout (float or tuple): Overrides the client's (connect, read) timeout
+
+        Returns:
+            requests.Response: The first non-retryable response, or the last one
+                once retries are exhausted
+        """
+        # Only the path is recorded; the query string carries the API key
+        path = urlsplit(url).path
+        with span('http', path=path) as call:
+            for attempt in range(self.max_retries + 1):
+                retry_after = None
+                with self._lock:
+                    self._requests += 1
+                started = time.perf_counter()
+                try:
+                    response = self.session.get(url, params=params, timeout=timeout or self.timeout)
+                except requests.RequestException as e:
+                    status = 'timeout' if isinstance(e, requests.Timeout) else 'error'
+                    _observe(path, status, started)
+                    # Only connection failures (including connect timeouts) are retried
+                    if not isinstance(e, requests.ConnectionError) or attempt == self.max_retries:
+                        call.set(status=status, attempts=attempt + 1)
+                        raise
+                else:
+                    _observe(path, response.status_code, started)
+                    if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                        call.set(status=response.status_code, attempts=attempt + 1)
+                        return response
+                    retry_after = _retry_after_seconds(response)
+                    response.close()
+
+                with self._lock:
+                    self._retries += 1
+                time.sleep(self._backoff(attempt, retry_after))
+
+    def _backoff(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff, honouring Retry-After when the server sends it."""
+        if retry_after is not None:
+            return min(self.backoff_max, retry_after)
+        return random.uniform(0, min(self.backoff_max, self.backoff_factor * (2 ** attempt)))
+
+    def stats(self):
+        """
+        Get request and connection counters for this client.
+
+        Returns:
+            dict: requests sent, retries, connections opened and requests that
+                reused an existing keep-alive connection
+        """
+        connections = 0
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                connections += pool.num_connections
+
+        with self._lock:
+            sent, retries = self._requests, self._retries
+        return {
+            'requests': sent,
+            'retries': retries,
+            'connections': connections,
+            'reused': max(0, sent - connections)
+        }
+
+
+def _observe(path, status, started):
+    UPSTREAM_REQUESTS.inc(endpoint=path, status=status)
+    UPSTREAM_LATENCY.observe(time.perf_counter() - started, endpoint=path)
+
+
+def _retry_after_seconds(response):
+    value = response.headers.get('Retry-After')
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Get the process-wide HTTP client, creating it on first use.
+
+    Pool size, read timeout and retry count can be set with the OWM_POOL_SIZE,
+    OWM_TIMEOUT and OWM_MAX_RETRIES environment variables.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient(
+                    pool_size=int(os.getenv('OWM_POOL_SIZE', DEFAULT_POOL_SIZE)),
+                    timeout=(DEFAULT_CONNECT_TIMEOUT, float(os.getenv('OWM_TIMEOUT', DEFAULT_READ_TIMEOUT))),
+                    max_retries=int(os.getenv('OWM_MAX_RETRIES', DEFAULT_MAX_RETRIES))
+                )
+    return _client
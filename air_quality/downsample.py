@@ -0,0 +1,69 @@
+"""Shape-preserving downsampling of time series for plotting.
+
+Largest-Triangle-Three-Buckets (LTTB, Steinarsson 2013) keeps the first and
+last points and, from each of `n_out - 2` equal buckets in between, the point
+forming the largest triangle with the previously kept point and the average of
+the next bucket. Peaks and troughs survive, unlike plain striding or
+averaging, so a few thousand points draw the same picture as millions.
+"""
+import numpy as np
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Pick the positions of the points LTTB keeps.
+
+    Args:
+        x (np.ndarray): Ascending x values (numeric or datetime64)
+        y (np.ndarray): y values, without NaNs
+        n_out (int): Number of points to keep
+
+    Returns:
+        np.ndarray: Ascending positions into x and y
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x)
+    x = (x.view(np.int64) if np.issubdtype(x.dtype, np.datetime64) else x).astype(np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Bucket i spans [edges[i], edges[i + 1]); the first and last points are their own buckets.
+    # Integer arithmetic, so float rounding can't shift a boundary that falls on a whole number
+    edges = np.r_[np.arange(n_out - 1, dtype=np.int64) * (n - 2) // (n_out - 2) + 1, n]
+    sizes = np.diff(edges)
+    avg_x = np.add.reduceat(x, edges[:-1]) / sizes
+    avg_y = np.add.reduceat(y, edges[:-1]) / sizes
+
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Twice the triangle area between the last kept point, each candidate and the next bucket's average
+        area = np.abs((x[a] - avg_x[i + 1]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y[i + 1] - y[a]))
+        a = lo + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+
+def downsample(x, y, n_out):
+    """
+    Downsample a series to at most `n_out` points with LTTB, dropping NaNs.
+
+    Args:
+        x (array-like): Ascending x values (numeric or datetime64)
+        y (array-like): y values
+        n_out (int): Point budget
+
+    Returns:
+        tuple: (x, y) NumPy arrays of the kept points
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=np.float64)
+    valid = ~np.isnan(y)
+    if not valid.all():
+        x, y = x[valid], y[valid]
+    kept = lttb_indices(x, y, n_out)
+    return x[kept], y[kept]
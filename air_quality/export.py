@@ -0,0 +1,131 @@
+"""Chunked export of observation frames to CSV, Parquet and Arrow IPC.
+
+Frames are serialized a slice of rows at a time, so exporting millions of rows
+never holds more than one chunk's text or record batch on top of the output:
+CSV chunks are encoded and written one after another, Parquet gets one row
+group per chunk, and Arrow IPC one record batch per chunk. Output goes to any
+binary file-like object, or comes back chunk by chunk from `iter_export` for
+streaming responses.
+"""
+import tempfile
+
+CHUNK_ROWS = 100_000
+SPOOL_BYTES = 32 * 2**20  # Exports larger than this are spooled to a temporary file
+
+# Format -> (MIME type, file extension)
+FORMATS = {
+    'csv': ('text/csv', '.csv'),
+    'parquet': ('application/vnd.apache.parquet', '.parquet'),
+    'arrow': ('application/vnd.apache.arrow.file', '.arrow'),
+}
+
+
+def _chunks(frame, chunk_rows):
+    for start in range(0, max(len(frame), 1), chunk_rows):
+        yield frame.iloc[start:start + chunk_rows]
+
+
+def _arrow_schema(frame, chunk_rows):
+    """Infer the Arrow schema of a frame from its first chunk.
+
+    Object columns that are all missing in the first chunk would be typed
+    null, so they're typed from their first value further down instead.
+    """
+    import pyarrow as pa
+
+    schema = pa.Schema.from_pandas(frame.iloc[:chunk_rows], preserve_index=False)
+    for i, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            values = frame[field.name].dropna()
+            if len(values):
+                schema = schema.set(i, field.with_type(pa.array(values.iloc[:1], from_pandas=True).type))
+    return schema
+
+
+def write_export(frame, fmt, target, chunk_rows=CHUNK_ROWS):
+    """
+    Serialize a frame to a binary file-like object, one chunk of rows at a time.
+
+    Args:
+        frame (pd.DataFrame): Rows to export (the index is not written)
+        fmt (str): One of FORMATS
+        target: Writable binary file-like object
+        chunk_rows (int): Rows serialized per chunk
+
+    Returns:
+        int: Number of rows written
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {', '.join(FORMATS)}")
+
+    if fmt == 'csv':
+        for i, chunk in enumerate(_chunks(frame, chunk_rows)):
+            target.write(chunk.to_csv(index=False, header=(i == 0)).encode('utf-8'))
+        return len(frame)
+
+    import pyarrow as pa
+
+    schema = _arrow_schema(frame, chunk_rows)
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(target, schema)
+    else:
+        writer = pa.ipc.new_file(target, schema)
+    with writer:
+        for chunk in _chunks(frame, chunk_rows):
+            table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            if fmt == 'parquet':
+                writer.write_table(table)
+            else:
+                writer.write(table)
+    return len(frame)
+
+
+def export_bytes(frame, fmt, chunk_rows=CHUNK_ROWS):
+    """
+    Serialize a frame and return the encoded bytes.
+
+    The chunks are written to a spooled temporary file rather than joined in
+    memory, so the only full-size buffer is the returned bytes object.
+
+    Returns:
+        bytes: The export
+    """
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES) as spool:
+        write_export(frame, fmt, spool, chunk_rows)
+        spool.seek(0)
+        return spool.read()
+
+
+def iter_export(frame, fmt, chunk_rows=CHUNK_ROWS, read_size=1 << 20):
+    """
+    Serialize a frame as a stream of byte chunks.
+
+    CSV is generated lazily chunk by chunk. Parquet and Arrow files need their
+    footer written last, so they are spooled first and then read back in
+    `read_size` pieces.
+
+    Yields:
+        bytes: Consecutive pieces of the export
+    """
+    if fmt == 'csv':
+        for i, chunk in enumerate(_chunks(frame, chunk_rows)):
+            yield chunk.to_csv(index=False, header=(i == 0)).encode('utf-8')
+        return
+
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES) as spool:
+        write_export(frame, fmt, spool, chunk_rows)
+        spool.seek(0)
+        for piece in iter(lambda: spool.read(read_size), b''):
+            yield piece
+
+
+def export_file_name(stem, fmt):
+    """Get a download file name with the format's extension."""
+    return stem + FORMATS[fmt][1]
+
+
+def export_mime(fmt):
+    """Get the MIME type of an export format."""
+    return FORMATS[fmt][0]
+
@@ -0,0 +1,106 @@
+"""Concurrent fetch engine for loading many locations at once.
+
+Each location is resolved to coordinates and then every endpoint is called for
+it, with all of those calls sharing a single bounded thread pool. Results are
+yielded per location as soon as its last call finishes, so the total wall time
+tracks the slowest location rather than the sum of all of them. When a trace
+is being recorded, each call runs as a `resolve` or `fetch` span under it.
+"""
+import time
+import concurrent.futures as cf
+from dataclasses import dataclass, field
+
+from air_quality.tracing import bind
+
+DEFAULT_MAX_WORKERS = 8
+
+
+@dataclass
+class LocationResult:
+    """Outcome of fetching every endpoint for one location."""
+    location: str
+    coords: tuple = None
+    data: dict = field(default_factory=dict)
+    errors: dict = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    @property
+    def ok(self):
+        return self.coords is not None and not self.errors
+
+
+def fetch_locations(locations, resolve, endpoints, max_workers=None, initializer=None):
+    """
+    Fetch every endpoint for every location concurrently.
+
+    A failure in one call is recorded on that location's result and never
+    stops the other locations from completing.
+
+    Args:
+        locations (iterable): Location names to fetch
+        resolve (callable): Maps a location name to (lat, lon), or None if unknown
+        endpoints (dict or callable): Endpoint name -> callable(lat, lon) returning
+            its payload, or a callable(location) returning such a dict when the
+            calls depend on the location
+        max_workers (int): Maximum number of calls in flight at once
+        initializer (callable): Run once in each worker thread before it starts
+
+    Yields:
+        LocationResult: One per location, in completion order
+    """
+    locations = list(dict.fromkeys(locations))
+    if not locations:
+        return
+
+    pool = cf.ThreadPoolExecutor(
+        max_workers=max(1, max_workers or DEFAULT_MAX_WORKERS),
+        initializer=initializer,
+        thread_name_prefix='aq-fetch'
+    )
+    try:
+        results = {}
+        started = {}
+        remaining = {}
+        futures = {}
+
+        # Resolve coordinates first; endpoint calls are queued as each one lands
+        for location in locations:
+            results[location] = LocationResult(location)
+            started[location] = time.perf_counter()
+            futures[pool.submit(bind(resolve, 'resolve', location=location), location)] = (location, None)
+
+        while futures:
+            done, _ = cf.wait(futures, return_when=cf.FIRST_COMPLETED)
+            for future in done:
+                location, endpoint = futures.pop(future)
+                result = results[location]
+
+                try:
+                    value = future.result()
+                except Exception as e:
+                    value = None
+                    result.errors[endpoint or 'coordinates'] = str(e)
+
+                if endpoint is None:
+                    calls = endpoints(location) if callable(endpoints) else endpoints
+                    if value is not None and calls:
+                        result.coords = tuple(value)
+                        remaining[location] = len(calls)
+                        lat, lon = result.coords
+                        for name, fetch in calls.items():
+                            call = bind(fetch, 'fetch', location=location, endpoint=name)
+                            futures[pool.submit(call, lat, lon)] = (location, name)
+                        continue
+                    if value is not None:
+                        result.coords = tuple(value)
+                else:
+                    result.data[endpoint] = value
+                    remaining[location] -= 1
+                    if remaining[location]:
+                        continue
+
+                result.elapsed = time.perf_counter() - started[location]
+                yield result
+    finally:
+        # Don't wait on outstanding calls if the consumer stopped early
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,150 @@
+"""LRU cache of built Plotly figures.
+
+Figures are keyed on a fingerprint of their input data plus whatever else
+shapes them (chart options, the AQI standard), so a rerun whose inputs haven't
+changed reuses the finished figure instead of rebuilding and re-validating it.
+Each entry's size is estimated from its data arrays without serializing it,
+and the least recently used figures are evicted once the cache exceeds its
+memory cap.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from air_quality.metrics import CACHE_EVICTIONS, CACHE_REQUESTS
+from air_quality.tracing import span
+
+DEFAULT_MAX_BYTES = 64 * 2**20
+DEFAULT_MAX_ENTRIES = 256
+
+
+def fingerprint(*frames):
+    """
+    Get a cheap content hash of one or more DataFrames.
+
+    Values and index are hashed column-wise with pandas' vectorized row
+    hashing, along with column names and dtypes, so equal data gives equal
+    fingerprints regardless of object identity.
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for frame in frames:
+        digest.update(repr((list(frame.columns), [str(t) for t in frame.dtypes], frame.shape)).encode())
+        if len(frame):
+            digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def figure_size(figure):
+    """
+    Estimate the memory held by a figure's traces and layout.
+
+    Arrays count their buffer size, strings their length and other values a
+    word each. It is a fraction of the cost of serializing the figure and
+    close enough for a memory budget.
+
+    Returns:
+        int: Estimated size in bytes
+    """
+    # Plotly's raw property dicts, read without the copies to_plotly_json() makes
+    return _size(figure._data) + _size(figure._layout)
+
+
+def _size(value):
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(_size(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_size(v) for v in value)
+    return 8
+
+
+class FigureCache:
+    """Thread-safe LRU of Plotly figures with a cap on their serialized size."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (figure, size in bytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Get a cached figure (marking it recently used), or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                CACHE_REQUESTS.inc(cache='figure', result='miss')
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            CACHE_REQUESTS.inc(cache='figure', result='hit')
+            return entry[0]
+
+    def put(self, key, figure):
+        """Cache a figure, evicting the least recently used ones to stay under the caps."""
+        size = figure_size(figure)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return  # Would evict everything else and still not fit
+            self._entries[key] = (figure, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                CACHE_EVICTIONS.inc(cache='figure')
+
+    def get_or_build(self, key, build):
+        """
+        Get a cached figure, building and caching it on a miss.
+
+        Args:
+            key (tuple): Hashable key, e.g. (chart name, fingerprint, options...);
+                the chart name also names its `figure.<chart>` trace span
+            build (callable): Builds the figure; only called on a miss
+
+        Returns:
+            plotly.graph_objects.Figure: Shared between callers, so treat it as read-only
+        """
+        with span(f'figure.{key[0]}') as timing:
+            figure = self.get(key)
+            timing.set(hit=figure is not None)
+            if figure is None:
+                figure = build()
+                self.put(key, figure)
+            return figure
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes, 'hits': self.hits, 'misses': self.misses}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_figure_cache():
+    """Get the process-wide figure cache; its memory cap can be set with AQ_FIGURE_CACHE_MB."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = FigureCache(max_bytes=int(float(os.getenv('AQ_FIGURE_CACHE_MB', 64)) * 2**20))
+    return _cache
@@ -0,0 +1,179 @@
+"""Offline gazetteer for geocoding known places without network access.
+
+A CSV of places (name, country, country_code, latitude, longitude) is loaded
+into two in-memory indexes:
+
+- a normalized-name table plus a sorted key list, for exact and prefix
+  (autocomplete) lookups via binary search
+- a KD-tree over unit-sphere coordinates, for nearest-place reverse lookups
+
+A bundled list of major cities is used unless AQ_GAZETTEER_PATH points to a
+user-supplied file with the same columns.
+"""
+import bisect
+import math
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from air_quality.geocoding import normalize
+
+BUNDLED_PATH = os.path.join(os.path.dirname(__file__), 'data', 'cities.csv')
+EARTH_RADIUS_KM = 6371.0088
+
+# Common alternative country codes people type after a city name
+_COUNTRY_ALIASES = {'gb': ('uk',), 'us': ('usa',)}
+
+
+class Gazetteer:
+    """In-memory place index with forward, prefix and reverse lookups."""
+
+    def __init__(self, names, countries, country_codes, latitudes, longitudes):
+        self.names = list(names)
+        self.countries = list(countries)
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+
+        # Forward index: every spelling of a place maps to its row; earlier rows win ties
+        self._by_key = {}
+        for i, (name, country, code) in enumerate(zip(self.names, self.countries, country_codes)):
+            code = normalize(code) if isinstance(code, str) else ''
+            keys = [name, f"{name}, {country}"]
+            if code:
+                keys.append(f"{name}, {code}")
+                keys.extend(f"{name}, {alias}" for alias in _COUNTRY_ALIASES.get(code, ()))
+            for key in keys:
+                self._by_key.setdefault(normalize(key), i)
+        self._keys = sorted(self._by_key)
+
+        # Reverse index: KD-tree over 3D unit vectors, where straight-line
+        # distance orders places the same way as great-circle distance
+        self._tree_order, self._tree_axes, self._tree_points = _build_kdtree(
+            _unit_vectors(self.latitudes, self.longitudes)
+        )
+
+    @classmethod
+    def from_csv(cls, path):
+        df = pd.read_csv(path, dtype={'country_code': str}, keep_default_na=False)
+        return cls(df['name'], df['country'], df.get('country_code', [''] * len(df)),
+                   df['latitude'], df['longitude'])
+
+    def __len__(self):
+        return len(self.names)
+
+    def display_name(self, i):
+        return f"{self.names[i]}, {self.countries[i]}"
+
+    def forward(self, location_name):
+        """
+        Get coordinates for an exact place name such as "Paris" or "Paris, FR".
+
+        Returns:
+            tuple: (latitude, longitude) or None if the place isn't indexed
+        """
+        i = self._by_key.get(normalize(location_name))
+        if i is None:
+            return None
+        return (float(self.latitudes[i]), float(self.longitudes[i]))
+
+    def complete(self, prefix, limit=8):
+        """
+        Get display names of places whose name starts with `prefix`.
+
+        Args:
+            prefix (str): Text typed so far
+            limit (int): Maximum number of suggestions
+
+        Returns:
+            list: Display names, in index order
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        start = bisect.bisect_left(self._keys, prefix)
+        end = bisect.bisect_left(self._keys, prefix + '\uffff', lo=start)
+
+        rows = sorted({self._by_key[key] for key in self._keys[start:end]})
+        return [self.display_name(i) for i in rows[:limit]]
+
+    def nearest(self, lat, lon):
+        """
+        Find the indexed place closest to a point.
+
+        Returns:
+            tuple: (display name, distance in km), or None if the index is empty
+        """
+        if not len(self):
+            return None
+        query = tuple(_unit_vectors(np.array([lat]), np.array([lon]))[0])
+        points, axes = self._tree_points, self._tree_axes
+
+        best, best_node = math.inf, -1
+        stack = [(0, len(points), 0.0)]
+        while stack:
+            lo, hi, bound = stack.pop()
+            if lo >= hi or bound >= best:
+                continue
+            mid = (lo + hi) // 2
+            point = points[mid]
+            dist = ((point[0] - query[0]) ** 2 + (point[1] - query[1]) ** 2 +
+                    (point[2] - query[2]) ** 2)
+            if dist < best:
+                best, best_node = dist, mid
+
+            axis = axes[mid]
+            diff = query[axis] - point[axis]
+            near, far = ((lo, mid), (mid + 1, hi)) if diff < 0 else ((mid + 1, hi), (lo, mid))
+            stack.append((far[0], far[1], diff * diff))
+            stack.append((near[0], near[1], 0.0))
+
+        chord = math.sqrt(best)
+        distance_km = 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+        return self.display_name(self._tree_order[best_node]), distance_km
+
+
+def _unit_vectors(latitudes, longitudes):
+    lat = np.radians(latitudes)
+    lon = np.radians(longitudes)
+    return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+
+def _build_kdtree(points):
+    """
+    Build an implicit balanced KD-tree.
+
+    Rows are reordered so the node for range [lo, hi) sits at (lo + hi) // 2,
+    with its left subtree before it and its right subtree after it.
+    """
+    n = len(points)
+    order = np.arange(n)
+    axes = np.zeros(n, dtype=np.int8)
+    stack = [(0, n)]
+    while stack:
+        lo, hi = stack.pop()
+        if hi - lo <= 1:
+            continue
+        segment = order[lo:hi]
+        axis = int(np.argmax(np.ptp(points[segment], axis=0)))  # Split on the widest axis
+        mid = (lo + hi) // 2
+        order[lo:hi] = segment[np.argpartition(points[segment, axis], mid - lo)]
+        axes[mid] = axis
+        stack.append((lo, mid))
+        stack.append((mid + 1, hi))
+    return order.tolist(), axes.tolist(), [tuple(p) for p in points[order].tolist()]
+
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer():
+    """Get the process-wide gazetteer, loading it on first use."""
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer.from_csv(os.getenv('AQ_GAZETTEER_PATH', BUNDLED_PATH))
+    return _gazetteer
@@ -0,0 +1,298 @@
+"""Geocoding with a persistent, disk-backed cache.
+
+Known places are answered by the offline gazetteer. Everything else is
+answered from an in-memory table backed by SQLite, so repeat lookups cost a
+dict access and survive restarts. Places that could not be found are cached
+too, with a shorter TTL. Cache misses go to Nominatim through a single
+process-wide rate-limited client.
+
+The cache can be pre-warmed in bulk from a CSV of place names:
+
+    python -m air_quality.geocoding places.csv
+"""
+import argparse
+import csv
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+
+from air_quality.metrics import CACHE_EVICTIONS, CACHE_REQUESTS
+from air_quality.tracing import span
+
+DEFAULT_CACHE_PATH = os.path.join('data', 'geocode.sqlite')
+DEFAULT_TTL = 90 * 86400           # Coordinates of a place rarely change
+DEFAULT_NEGATIVE_TTL = 6 * 3600    # Retry unknown places a few times a day
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocodes (
+    key TEXT PRIMARY KEY,
+    latitude REAL,
+    longitude REAL,
+    expires REAL
+);
+"""
+
+
+def normalize(location_name):
+    """Normalize a place name into a lookup key (case, accents and spacing folded)."""
+    decomposed = unicodedata.normalize('NFKD', str(location_name))
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(stripped.casefold().split())
+
+
+class GeocodeCache:
+    """Place name -> coordinates cache held in memory and persisted to SQLite."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.executescript(_SCHEMA)
+            rows = self._conn.execute(
+                "SELECT key, latitude, longitude, expires FROM geocodes WHERE expires IS NULL OR expires > ?",
+                (time.time(),)
+            ).fetchall()
+
+        # key -> (coords or None, expiry timestamp or None for entries that never expire)
+        self._entries = {
+            key: ((lat, lon) if lat is not None else None, expires)
+            for key, lat, lon, expires in rows
+        }
+
+    def get(self, location_name):
+        """
+        Look up a place without touching the network.
+
+        Returns:
+            tuple: (hit, coords) where coords is (lat, lon), or None for a
+                cached "not found"
+        """
+        key = normalize(location_name)
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        if entry[1] is not None and entry[1] <= time.time():
+            # Forget it in memory so the expiry is counted once; the next put replaces the row
+            if self._entries.pop(key, None) is not None:
+                CACHE_EVICTIONS.inc(cache='geocode')
+            return False, None
+        return True, entry[0]
+
+    def put(self, location_name, coords, ttl=None):
+        """
+        Cache coordinates for a place, or None to remember that it wasn't found.
+
+        Args:
+            location_name (str): Place name as entered
+            coords (tuple): (lat, lon) or None
+            ttl (float): Overrides the default TTL; 0 means never expire
+        """
+        if ttl is None:
+            ttl = self.ttl if coords is not None else self.negative_ttl
+        self._write({normalize(location_name): (tuple(coords) if coords is not None else None,
+                                                time.time() + ttl if ttl else None)})
+
+    def seed(self, locations):
+        """Add known places that never expire, e.g. a mapping of names to coordinates."""
+        self._write({normalize(name): (tuple(coords), None) for name, coords in locations.items()})
+
+    def __contains__(self, location_name):
+        return self.get(location_name)[0]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _write(self, entries):
+        rows = [
+            (key, coords[0] if coords else None, coords[1] if coords else None, expires)
+            for key, (coords, expires) in entries.items()
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO geocodes VALUES (?, ?, ?, ?)", rows)
+            self._entries.update(entries)
+
+
+_geocoder = None
+_cache = None
+_singleton_lock = threading.Lock()
+
+
+def get_geocoder():
+    """
+    Get the process-wide rate-limited Nominatim geocode function.
+
+    Sharing one client keeps every lookup in the process behind the same
+    1-request-per-second limit that Nominatim's usage policy asks for.
+    """
+    global _geocoder
+    if _geocoder is None:
+        with _singleton_lock:
+            if _geocoder is None:
+                from geopy.geocoders import Nominatim
+                from geopy.extra.rate_limiter import RateLimiter
+
+                geolocator = Nominatim(
+                    user_agent="air_quality_dashboard_app",
+                    timeout=10  # Add timeout to prevent hanging
+                )
+                # Errors must reach the caller: swallowed, they'd look like "not found" and be cached as such
+                _geocoder = RateLimiter(geolocator.geocode, min_delay_seconds=1, swallow_exceptions=False)
+    return _geocoder
+
+
+def get_geocode_cache():
+    """Get the process-wide geocode cache; its path can be set with AQ_GEOCODE_CACHE_PATH."""
+    global _cache
+    if _cache is None:
+        with _singleton_lock:
+            if _cache is None:
+                _cache = GeocodeCache(os.getenv('AQ_GEOCODE_CACHE_PATH', DEFAULT_CACHE_PATH))
+    return _cache
+
+
+def geocode(location_name, retry=2):
+    """
+    Get latitude and longitude for a place name from Nominatim.
+
+    Args:
+        location_name (str): Name of the location to geocode
+        retry (int): Number of retry attempts if the first attempt fails
+
+    Returns:
+        tuple: (latitude, longitude) or None if not found
+
+    Raises:
+        Exception: The last geocoder error, if the place wasn't found and
+            some query variant still failed with an error after every retry,
+            so "not found" is only returned when Nominatim said so
+    """
+    geocode_fn = get_geocoder()
+
+    # Try with different location strings if first attempt fails
+    location_attempts = [
+        location_name,
+        f"{location_name}, {location_name}",  # Try with duplicated name (helps with some city names)
+        f"city of {location_name}",
+        f"{location_name}, country"
+    ]
+
+    last_error = None
+    for attempt in range(retry + 1):
+        failed = []
+        for loc_str in location_attempts:
+            try:
+                location = geocode_fn(
+                    loc_str,
+                    exactly_one=True,
+                    timeout=10,
+                    language='en',
+                    addressdetails=True
+                )
+            except Exception as e:
+                last_error = e
+                failed.append(loc_str)
+                continue
+
+            if location:
+                # Verify the result is reasonable
+                if (-90 <= location.latitude <= 90 and
+                        -180 <= location.longitude <= 180 and
+                        location.latitude != 0 and  # Skip 0,0 (null island)
+                        location.longitude != 0):
+                    return (location.latitude, location.longitude)
+
+        # Nominatim answered every variant and found nothing; retrying won't change that
+        if not failed:
+            return None
+        # Only retry the variants that failed with an error
+        location_attempts = failed
+
+    raise last_error
+
+
+def lookup(location_name, retry=2, cache=None):
+    """
+    Get coordinates for a place, offline when possible.
+
+    The offline gazetteer is consulted first, then the cache, and only then
+    Nominatim. Only genuine "not found" answers are cached; geocoder errors
+    propagate and are retried on the next lookup.
+    """
+    from air_quality.gazetteer import get_gazetteer
+
+    with span('geocode', location=location_name) as geocoding:
+        coords = get_gazetteer().forward(location_name)
+        if coords is not None:
+            geocoding.set(source='gazetteer')
+            CACHE_REQUESTS.inc(cache='geocode', result='hit')
+            return coords
+
+        if cache is None:
+            cache = get_geocode_cache()
+        hit, coords = cache.get(location_name)
+        CACHE_REQUESTS.inc(cache='geocode', result='hit' if hit else 'miss')
+        if hit:
+            geocoding.set(source='cache')
+            return coords
+
+        geocoding.set(source='nominatim')
+        coords = geocode(location_name, retry=retry)
+        cache.put(location_name, coords)
+        return coords
+
+
+def prewarm_from_csv(path, column='name', cache=None):
+    """
+    Geocode every place in a CSV file that isn't cached yet.
+
+    Args:
+        path (str): CSV file with a header row
+        column (str): Column holding place names (defaults to the first column
+            if there is no such column)
+        cache (GeocodeCache): Cache to fill (defaults to the shared one)
+
+    Returns:
+        dict: Counts of places already cached, found, not found and failed
+    """
+    if cache is None:
+        cache = get_geocode_cache()
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        key = column if column in (reader.fieldnames or []) else reader.fieldnames[0]
+        names = list(dict.fromkeys(row[key].strip() for row in reader if row.get(key, '').strip()))
+
+    counts = {'cached': 0, 'found': 0, 'not_found': 0, 'failed': 0}
+    for name in names:
+        if name in cache:
+            counts['cached'] += 1
+            continue
+        try:
+            coords = lookup(name, cache=cache)
+        except Exception:
+            counts['failed'] += 1
+            continue
+        counts['found' if coords else 'not_found'] += 1
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-warm the geocode cache from a CSV of place names.")
+    parser.add_argument('csv_path', help="CSV file with a header row")
+    parser.add_argument('--column', default='name', help="Column holding place names")
+    args = parser.parse_args(argv)
+
+    counts = prewarm_from_csv(args.csv_path, column=args.column)
+    print(', '.join(f"{k.replace('_', ' ')}: {v}" for k, v in counts.items()))
+
+
+if __name__ == '__main__':
+    main()
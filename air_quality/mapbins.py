@@ -0,0 +1,113 @@
+"""Zoom-dependent grid binning of stations for maps.
+
+Stations are snapped to a square grid in Web Mercator space whose cells are a
+fixed fraction of a map tile at the requested zoom, so a cell covers about the
+same number of screen pixels at every zoom. Each occupied cell becomes one map
+feature summarizing its stations. Everything is vectorized over the stations
+(one `np.unique` plus `np.bincount` per aggregate), and the grid is coarsened
+until the feature count fits a budget, so the browser gets a bounded number of
+markers however many stations there are.
+"""
+import numpy as np
+import pandas as pd
+
+TILE_CELLS = 4       # Grid cells across one 256 px map tile, i.e. ~64 px cells
+MAX_FEATURES = 500   # Most features sent to the browser
+MAX_ZOOM = 12
+MAX_LATITUDE = 85.05112878  # Web Mercator cut-off
+
+
+def _mercator(lat, lon):
+    """Project coordinates to Web Mercator, normalized to [0, 1) with y growing southward."""
+    lat = np.radians(np.clip(lat, -MAX_LATITUDE, MAX_LATITUDE))
+    x = (np.asarray(lon, dtype=np.float64) + 180.0) / 360.0
+    y = (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / np.pi) / 2.0
+    return x, y
+
+
+def fit_zoom(latitudes, longitudes, viewport_tiles=2):
+    """
+    Get the zoom at which points fit a viewport about `viewport_tiles` tiles across.
+
+    Returns:
+        int: Zoom level in [0, MAX_ZOOM]
+    """
+    lat = np.asarray(latitudes, dtype=np.float64)
+    lon = np.asarray(longitudes, dtype=np.float64)
+    valid = ~(np.isnan(lat) | np.isnan(lon))
+    if not valid.any():
+        return 0
+    x, y = _mercator(lat[valid], lon[valid])
+    span = max(x.max() - x.min(), y.max() - y.min())
+    if span <= 0:
+        return MAX_ZOOM
+    return int(np.clip(np.floor(np.log2(viewport_tiles / span)), 0, MAX_ZOOM))
+
+
+def bin_stations(frame, zoom, metrics=('aqi',), max_features=MAX_FEATURES):
+    """
+    Aggregate stations into grid cells sized for a map zoom level.
+
+    Args:
+        frame (pd.DataFrame): One row per station with `location`, `latitude`,
+            `longitude` and the metric columns; extra columns of the worst
+            (highest AQI) station in each cell are carried over
+        zoom (int): Map zoom level; lowered if it would give more than
+            `max_features` cells
+        metrics (iterable): Columns to average over each cell's stations
+        max_features (int): Most cells to return
+
+    Returns:
+        pd.DataFrame: One row per occupied cell with the centroid `latitude`
+            and `longitude`, `stations` (count), `label` (the station name, or
+            a count and the worst station), the metric means, `aqi_max`, the
+            worst station's other columns, and `zoom` (the zoom binned at)
+    """
+    frame = frame[frame['latitude'].notna() & frame['longitude'].notna()]
+    lat = frame['latitude'].to_numpy(dtype=np.float64)
+    lon = frame['longitude'].to_numpy(dtype=np.float64)
+    aqi = frame['aqi'].to_numpy(dtype=np.float64, na_value=np.nan)
+    x, y = _mercator(lat, lon)
+
+    # Visit stations worst-first, so each cell's first member is its worst station
+    order = np.argsort(-np.nan_to_num(aqi, nan=-np.inf), kind='stable')
+    zoom = int(np.clip(zoom, 0, MAX_ZOOM))
+    while True:
+        cells = TILE_CELLS * 2 ** zoom
+        ix = np.clip((x * cells).astype(np.int64), 0, cells - 1)
+        iy = np.clip((y * cells).astype(np.int64), 0, cells - 1)
+        _, first, inverse = np.unique((iy * cells + ix)[order], return_index=True, return_inverse=True)
+        if len(first) <= max_features or zoom == 0:
+            break
+        zoom -= 1
+
+    n = len(first)
+    counts = np.bincount(inverse, minlength=n)
+    worst = frame.iloc[order[first]].reset_index(drop=True)
+
+    out = worst.drop(columns=[c for c in ['latitude', 'longitude', *metrics] if c in worst])
+    out.insert(0, 'latitude', np.bincount(inverse, lat[order], minlength=n) / np.maximum(counts, 1))
+    out.insert(1, 'longitude', np.bincount(inverse, lon[order], minlength=n) / np.maximum(counts, 1))
+    out.insert(2, 'stations', counts)
+    names = worst['location'].astype(str)
+    out.insert(3, 'label', names.where(counts == 1, [f"{c} stations (worst: {name})" for c, name in zip(counts, names)]))
+
+    # NaN-aware means: stations missing a metric don't count towards it
+    for metric in metrics:
+        values = frame[metric].to_numpy(dtype=np.float64, na_value=np.nan)[order]
+        valid = ~np.isnan(values)
+        totals = np.bincount(inverse[valid], values[valid], minlength=n)
+        present = np.bincount(inverse[valid], minlength=n)
+        out[metric] = np.where(present > 0, totals / np.maximum(present, 1), np.nan)
+    out['aqi_max'] = aqi[order][first]
+    out['zoom'] = zoom
+    return out
+
+
+def map_center(latitudes, longitudes):
+    """Get the midpoint of the points' extent as a Plotly mapbox center."""
+    lat = pd.Series(latitudes, dtype=np.float64)
+    lon = pd.Series(longitudes, dtype=np.float64)
+    if lat.notna().sum() == 0:
+        return {'lat': 0.0, 'lon': 0.0}
+    return {'lat': float((lat.min() + lat.max()) / 2), 'lon': float((lon.min() + lon.max()) / 2)}
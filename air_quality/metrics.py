@@ -0,0 +1,264 @@
+"""Process-wide counters and histograms in the Prometheus text format.
+
+The dashboard and the API record cache, upstream and rerun statistics here:
+
+    aq_cache_requests_total{cache, result}            lookups by result (hit, stale or miss)
+    aq_cache_evictions_total{cache}                   entries that expired or were evicted
+    aq_upstream_requests_total{endpoint, status}      upstream HTTP requests (every attempt)
+    aq_upstream_request_duration_seconds{endpoint}    upstream HTTP latency
+    aq_singleflight_coalesced_total{group}            calls that shared an in-flight call
+    aq_swr_refreshes_total{cache, result}             background refreshes (ok or error)
+    aq_rerun_duration_seconds{kind}                   dashboard script runs (full or fragment)
+
+`render()` formats every metric for a scrape. The API answers it on
+/metrics, and `serve_metrics()` exposes it from any other process, e.g. the
+dashboard's with AQ_METRICS_PORT set. Recording a sample takes a lock and a
+dict update, so it's cheap enough for every cache lookup.
+"""
+import functools
+import inspect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 9600
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RERUN_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+MAX_TRACKED_KEYS = 10000  # Argument sets remembered per cache to tell evictions from first misses
+
+
+class Counter:
+    """A monotonically increasing count per label set."""
+
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[label]) for label in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(str(labels[label]) for label in self.labels), 0)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield self.name, dict(zip(self.labels, key)), value
+
+
+class Histogram:
+    """Observations counted into cumulative buckets per label set."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[label]) for label in self.labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    def samples(self):
+        with self._lock:
+            values = {key: list(entry) for key, entry in self._values.items()}
+        for key, entry in sorted(values.items()):
+            labels = dict(zip(self.labels, key))
+            for bound, count in zip(self.buckets, entry):
+                yield f'{self.name}_bucket', {**labels, 'le': _format_value(bound)}, count
+            yield f'{self.name}_bucket', {**labels, 'le': '+Inf'}, entry[-1]
+            yield f'{self.name}_sum', labels, entry[-2]
+            yield f'{self.name}_count', labels, entry[-1]
+
+
+class Registry:
+    """A set of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, help, labels=()):
+        return self._register(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Format every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                label_text = ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                lines.append(f'{name}{{{label_text}}} {_format_value(value)}' if label_text
+                             else f'{name} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REGISTRY = Registry()
+
+CACHE_REQUESTS = REGISTRY.counter(
+    'aq_cache_requests_total', "Cache lookups by cache and result (hit, stale or miss).", ('cache', 'result')
+)
+CACHE_EVICTIONS = REGISTRY.counter(
+    'aq_cache_evictions_total', "Cache entries that expired or were evicted.", ('cache',)
+)
+UPSTREAM_REQUESTS = REGISTRY.counter(
+    'aq_upstream_requests_total', "Upstream HTTP requests (including retries) by endpoint and status.",
+    ('endpoint', 'status')
+)
+UPSTREAM_LATENCY = REGISTRY.histogram(
+    'aq_upstream_request_duration_seconds', "Upstream HTTP request latency by endpoint.", ('endpoint',)
+)
+COALESCED_CALLS = REGISTRY.counter(
+    'aq_singleflight_coalesced_total', "Calls that shared another caller's in-flight result.", ('group',)
+)
+SWR_REFRESHES = REGISTRY.counter(
+    'aq_swr_refreshes_total', "Background refreshes of stale cache entries by result (ok or error).",
+    ('cache', 'result')
+)
+RERUN_DURATION = REGISTRY.histogram(
+    'aq_rerun_duration_seconds', "Dashboard script run time by kind (full or fragment).", ('kind',),
+    buckets=RERUN_BUCKETS
+)
+
+
+def render():
+    """Format the process-wide metrics for a Prometheus scrape."""
+    return REGISTRY.render()
+
+
+_seen_keys = {}  # cache name -> hashes of the argument sets it has computed
+_seen_lock = threading.Lock()
+
+
+def count_cache(name, cache):
+    """
+    Count the hits, misses and evictions of a memoizing decorator.
+
+    Works with any decorator that only calls the function on a miss, in the
+    caller's thread, such as `st.cache_data`, `st.cache_resource` or
+    `functools.lru_cache`, none of which report their own statistics. A miss
+    for arguments computed before means their entry expired or was evicted.
+    Arguments whose names start with an underscore are left out, as
+    Streamlit does when hashing them. Decorations sharing a name share their
+    counts, so re-decorating on every Streamlit rerun is fine.
+
+        @count_cache('get_weather_data', st.cache_data(ttl=3600))
+        def get_weather_data(lat, lon, _api_key): ...
+
+    Args:
+        name (str): `cache` label of the metrics
+        cache (callable): The memoizing decorator
+
+    Returns:
+        callable: A decorator
+    """
+    def decorate(func):
+        signature = inspect.signature(func)
+        local = threading.local()
+        # Shared by every decoration under this name, as Streamlit re-runs the decorator on each rerun
+        with _seen_lock:
+            seen = _seen_keys.setdefault(name, set())
+
+        @functools.wraps(func)
+        def compute(*args, **kwargs):
+            local.missed = True
+            bound = signature.bind(*args, **kwargs)
+            key = _args_key((k, v) for k, v in bound.arguments.items() if not k.startswith('_'))
+            with _seen_lock:
+                if key in seen:
+                    CACHE_EVICTIONS.inc(cache=name)
+                elif len(seen) < MAX_TRACKED_KEYS:
+                    seen.add(key)
+            return func(*args, **kwargs)
+
+        cached = cache(compute)
+
+        @functools.wraps(func)
+        def lookup(*args, **kwargs):
+            local.missed = False
+            try:
+                return cached(*args, **kwargs)
+            finally:
+                CACHE_REQUESTS.inc(cache=name, result='miss' if local.missed else 'hit')
+
+        # Keep the cache's own controls, e.g. clear()
+        for attr in ('clear', 'cache_clear'):
+            if hasattr(cached, attr):
+                setattr(lookup, attr, getattr(cached, attr))
+        return lookup
+    return decorate
+
+
+def _args_key(items):
+    items = tuple(items)
+    try:
+        return hash(items)
+    except TypeError:
+        return hash(repr(items))
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Answers GET /metrics with the process-wide metrics."""
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0].rstrip('/') != '/metrics':
+            self.send_error(404)
+            return
+        body = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """
+    Serve /metrics from a daemon thread.
+
+    Returns:
+        ThreadingHTTPServer: The running server; call `shutdown()` to stop it
+    """
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='aq-metrics', daemon=True).start()
+    return server
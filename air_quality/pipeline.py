@@ -0,0 +1,348 @@
+"""Streamlit-free fetch and processing pipeline.
+
+Everything between a list of location names and an indexed, scored frame of
+observations: the OpenWeatherMap fetchers, turning their payloads into rows,
+the incremental store-backed load, sample data and the final scoring and
+indexing stage. The dashboard, the HTTP API and scripts all run this same
+code, and identical fetches in flight at the same time, from any of them,
+share one upstream request. Callers may pass their own fetchers (the
+dashboard wraps these in its caches) and a `report(level, message)` callback
+that receives user-facing warnings and errors instead of them being printed.
+"""
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from air_quality.aqi import DEFAULT_STANDARD, calculate_aqi, get_aqi_category, rescore
+from air_quality.client import get_client
+from air_quality.fetch import fetch_locations
+from air_quality.history import DEFAULT_HISTORY_DAYS, fetch_history, parse_history, to_unix_seconds
+from air_quality.sample import generate_sample_data
+from air_quality.singleflight import coalesce
+from air_quality.schema import conform
+from air_quality.slicing import ObservationIndex
+from air_quality import tracing
+
+OWM_BASE_URL = "http://api.openweathermap.org/data/2.5"
+
+# Default locations with coordinates for initial suggestions
+DEFAULT_LOCATIONS = {
+    'New York, US': (40.7128, -74.0060),
+    'Los Angeles, US': (34.0522, -118.2437),
+    'London, UK': (51.5074, -0.1278),
+    'Tokyo, Japan': (35.6762, 139.6503),
+    'Sydney, Australia': (-33.8688, 151.2093),
+    'Cape Town, South Africa': (-33.9249, 18.4241),
+    'Rio de Janeiro, Brazil': (-22.9068, -43.1729),
+    'Mumbai, India': (19.0760, 72.8777)
+}
+
+
+def _get_json(path, params):
+    # Concurrent requests for the same endpoint and location, from any session, share one upstream call
+    return coalesce((path, *sorted(params.items())), lambda: _request_json(path, params), label=path)
+
+
+def _request_json(path, params):
+    response = get_client().get(f"{OWM_BASE_URL}/{path}", params=params)
+    response.raise_for_status()
+    return response.json()
+
+
+def fetch_air_quality(lat, lon, api_key):
+    """
+    Fetch current air pollution for a location.
+
+    Raises:
+        requests.HTTPError: If the API returns an error status
+    """
+    return _get_json('air_pollution', {'lat': lat, 'lon': lon, 'appid': api_key})
+
+
+def fetch_weather(lat, lon, api_key):
+    """
+    Fetch current weather for a location, in metric units.
+
+    Raises:
+        requests.HTTPError: If the API returns an error status
+    """
+    return _get_json('weather', {'lat': lat, 'lon': lon, 'appid': api_key, 'units': 'metric'})
+
+
+def fetch_forecast(lat, lon, api_key):
+    """
+    Fetch the 5-day forecast (8 data points per day) for a location, in metric units.
+
+    Raises:
+        requests.HTTPError: If the API returns an error status
+    """
+    return _get_json('forecast', {'lat': lat, 'lon': lon, 'appid': api_key, 'units': 'metric', 'cnt': 40})
+
+
+# Endpoint name -> fetcher(lat, lon, api_key)
+DEFAULT_FETCHERS = {
+    'air quality': fetch_air_quality,
+    'weather': fetch_weather,
+    'forecast': fetch_forecast
+}
+
+
+def process_air_quality_data(aq_data, weather_data, location_name):
+    """
+    Turn air quality and weather payloads into one observation row.
+
+    Args:
+        aq_data (dict): Air pollution payload (or a forecast item)
+        weather_data (dict): Weather payload (or the same forecast item)
+        location_name (str): Location the payloads belong to
+
+    Returns:
+        dict: The observation, or None if there is no air quality reading
+    """
+    if not aq_data or 'list' not in aq_data or not aq_data['list']:
+        return None
+
+    # Get current air quality
+    current_aq = aq_data['list'][0]
+    components = current_aq['components']
+
+    # Get weather info
+    temp = weather_data['main']['temp'] if weather_data else 20
+    humidity = weather_data['main']['humidity'] if weather_data else 50
+    wind_speed = weather_data['wind']['speed'] if weather_data else 2.5
+
+    # Map weather condition to emoji
+    weather_condition = "⛅"  # Default
+    if weather_data and 'weather' in weather_data and weather_data['weather']:
+        weather_main = weather_data['weather'][0]['main'].lower()
+        if 'rain' in weather_main:
+            weather_condition = "🌧️"
+        elif 'cloud' in weather_main:
+            weather_condition = "☁️"
+        elif 'clear' in weather_main:
+            weather_condition = "☀️"
+        elif 'snow' in weather_main:
+            weather_condition = "❄️"
+        elif 'thunder' in weather_main:
+            weather_condition = "⛈️"
+
+    # Convert units (OpenWeatherMap provides data in µg/m³)
+    pm25 = components.get('pm2_5', 0)
+    pm10 = components.get('pm10', 0)
+    no2 = components.get('no2', 0) / 1.88  # Convert to ppb
+    o3 = components.get('o3', 0) / 2.0     # Convert to ppb
+
+    # Calculate AQI from the pollutant concentrations (rather than OpenWeatherMap's coarse 1-5 index)
+    aqi_value = calculate_aqi(pm25, pm10, no2, o3)
+
+    # Get AQI category and color
+    aqi_category, aqi_color = get_aqi_category(aqi_value)
+
+    # Get coordinates
+    lat = aq_data.get('coord', {}).get('lat', 0)
+    lon = aq_data.get('coord', {}).get('lon', 0)
+
+    return {
+        # Timestamp of the measurement itself, so repeated refreshes of the same hour upsert one row
+        'date': datetime.fromtimestamp(current_aq['dt']) if 'dt' in current_aq else datetime.now(),
+        'location': location_name,
+        'latitude': lat,
+        'longitude': lon,
+        'pm25': pm25,
+        'pm10': pm10,
+        'no2': no2,
+        'o3': o3,
+        'temp_c': temp,
+        'humidity': humidity,
+        'wind_speed': wind_speed,
+        'aqi': aqi_value,
+        'aqi_category': aqi_category,
+        'aqi_color': aqi_color,
+        'weather': weather_condition
+    }
+
+
+def history_since(last_timestamp, now, days=DEFAULT_HISTORY_DAYS):
+    """Get the start of the history gap to fetch, or None if the store is already current."""
+    start = int(now - days * 86400)
+    if last_timestamp is not None:
+        start = max(start, int(last_timestamp) + 1)
+    return start if now - start >= 3600 else None
+
+
+def _report(report, level, message):
+    if report is not None:
+        report(level, message)
+
+
+def load_observations(locations, api_key, store, resolve, fetchers=None, history_days=DEFAULT_HISTORY_DAYS,
+                      max_workers=None, initializer=None, report=None):
+    """
+    Load observations from the store, fetching only what's new from OpenWeatherMap.
+
+    Every location is fetched concurrently; new history and current readings
+    are upserted into the store, and forecasts are appended to the result
+    without being stored. History is backfilled from each location's history
+    watermark, so a backfill that failed is retried in full on the next load.
+
+    Args:
+        locations (list): Location names
+        api_key (str): OpenWeatherMap API key
+        store (ObservationStore): Where observations are kept
+        resolve (callable): Maps a location name to (lat, lon), or None if unknown
+        fetchers (dict): Endpoint name -> fetcher(lat, lon, api_key) returning
+            its payload or None; defaults to DEFAULT_FETCHERS
+        history_days (int): Days of hourly history to backfill
+        max_workers (int): Maximum number of upstream calls in flight
+        initializer (callable): Run once in each fetch worker thread
+        report (callable): Receives (level, message) for user-facing
+            'warning' and 'error' messages
+
+    Returns:
+        pd.DataFrame: Observations in the compact schema, or None if nothing
+            could be loaded
+    """
+    fetchers = fetchers or DEFAULT_FETCHERS
+    all_data = []
+    now = int(time.time())
+    with tracing.span('store.last_timestamps'):
+        last_stored = store.last_timestamps(locations)
+        history_stored = store.watermarks(locations, 'history')
+
+    def location_endpoints(location):
+        endpoints = {name: (lambda lat, lon, fetch=fetch: fetch(lat, lon, api_key)) for name, fetch in fetchers.items()}
+        # Only backfill the gap since the last stored history, which current readings don't move
+        start = history_since(history_stored.get(location), now, history_days)
+        if start is not None:
+            endpoints['history'] = lambda lat, lon: fetch_history(lat, lon, api_key, start=start, end=now)
+        return endpoints
+
+    # Fetch all locations in parallel and process each one as soon as it completes
+    results = fetch_locations(
+        locations,
+        resolve,
+        location_endpoints,
+        max_workers=max_workers,
+        initializer=initializer
+    )
+    loaded_locations = []
+    for result in results:
+        location = result.location
+
+        if result.coords is None:
+            if 'coordinates' in result.errors:
+                _report(report, 'error', f"Error loading data for {location}: {result.errors['coordinates']}")
+            else:
+                _report(report, 'warning', f"Could not find coordinates for {location}. Skipping...")
+            continue
+
+        for endpoint, error in result.errors.items():
+            _report(report, 'error', f"Error loading {endpoint} data for {location}: {error}")
+
+        lat, lon = result.coords
+        observations = []
+        history_end = None
+
+        # Newly backfilled history
+        if result.data.get('history'):
+            with tracing.span('parse_history', location=location):
+                hist_df = parse_history(result.data['history'], location, lat, lon)
+                if not hist_df.empty:
+                    hist_df = rescore(hist_df)
+                    observations.append(hist_df)
+                    history_end = int(to_unix_seconds(hist_df['date'].iloc[-1:])[0])
+
+        # Current air quality and weather (last, so it wins over a history row for the same hour)
+        aq_data = result.data.get('air quality')
+        weather_data = result.data.get('weather')
+        if aq_data and weather_data:
+            with tracing.span('process_air_quality_data', location=location):
+                processed_data = process_air_quality_data(aq_data, weather_data, location)
+            if processed_data:
+                observations.append(pd.DataFrame([processed_data]))
+
+        if observations:
+            with tracing.span('store.upsert', location=location):
+                store.upsert(pd.concat(observations, ignore_index=True))
+                if history_end is not None:
+                    store.advance_watermark(location, 'history', history_end)
+
+        # Forecast data
+        forecast_data = result.data.get('forecast')
+        if forecast_data and 'list' in forecast_data:
+            with tracing.span('process_forecast', location=location):
+                for item in forecast_data['list']:
+                    processed_forecast = process_air_quality_data(
+                        item,  # Some forecast items include air quality data
+                        item,  # Use the same item for weather data
+                        location
+                    )
+                    if processed_forecast:
+                        all_data.append(processed_forecast)
+
+        if observations or location in last_stored:
+            loaded_locations.append(location)
+        else:
+            _report(report, 'warning', f"No data available for {location}. It might not be covered by the air quality monitoring network.")
+
+    # Everything observed so far comes from the store, forecasts are appended as-is
+    if loaded_locations:
+        with tracing.span('store.load', locations=len(loaded_locations)):
+            frames = [store.load(loaded_locations)]
+        if all_data:
+            frames.append(pd.DataFrame(all_data))
+        return conform(pd.concat(frames, ignore_index=True))
+
+    if all_data:
+        return conform(pd.DataFrame(all_data))
+    return None
+
+
+def load_sample(locations, span='7D', freq='D', coordinates=None):
+    """
+    Generate sample observations for some locations.
+
+    Returns:
+        pd.DataFrame: Observations in the compact schema, tagged with their
+            source in `attrs['source']`
+    """
+    with tracing.span('sample', locations=len(locations)):
+        df = generate_sample_data(
+            locations,
+            span=span,
+            freq=freq,
+            coordinates=DEFAULT_LOCATIONS if coordinates is None else coordinates
+        )
+    # Sample values depend on the set of locations, so each set gets its own rollups
+    df.attrs['source'] = 'sample:' + '|'.join(locations)
+    return df
+
+
+def prepare(df, standard=DEFAULT_STANDARD, rollups=None):
+    """
+    Score observations against a standard and index them for slicing.
+
+    Args:
+        df (pd.DataFrame): Observations
+        standard (str): AQI standard to score with
+        rollups (Rollups): Rollups to fold rows not seen before into
+
+    Returns:
+        tuple: (ObservationIndex, rollups), or (None, None) if there is no data
+    """
+    if df is None or df.empty:
+        return None, None
+
+    # Score every observation against the selected standard in one pass
+    with tracing.span('rescore', rows=len(df)):
+        df = conform(rescore(df, standard))
+
+    # Fold rows not seen before into the pre-aggregated rollups
+    if rollups is not None:
+        with tracing.span('rollups.update'):
+            rollups.update(df)
+
+    # Index rows by (location, timestamp) so filters become slices
+    with tracing.span('index'):
+        return ObservationIndex(df), rollups
@@ -0,0 +1,177 @@
+"""Materialized hourly, daily and weekly rollups of observations.
+
+For every location and period the rollups keep count, sum, min and max of
+each metric, plus the weather of the period's latest observation. They are
+maintained incrementally: each location remembers the timestamps it has
+ingested, and `update` only aggregates rows at timestamps it hasn't seen,
+folding them into whichever periods they fall in. New readings usually extend
+the last period, while a history backfill that arrives after them lands in
+earlier ones. Reads return small tables whose size depends on the number of
+periods shown, not on the number of raw rows.
+
+Ingested timestamps are treated as final, so a later correction of an
+observation that was already ingested is not picked up.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Grain name -> pandas period frequency (weeks start on Monday)
+GRAINS = {'hourly': 'h', 'daily': 'D', 'weekly': 'W'}
+METRICS = ['pm25', 'pm10', 'no2', 'o3', 'temp_c', 'humidity', 'wind_speed', 'aqi']
+STATS = ['count', 'sum', 'min', 'max']
+
+
+class Rollups:
+    """Per-location rollup tables for each grain, safe to share between threads."""
+
+    def __init__(self, metrics=METRICS, grains=GRAINS):
+        self.metrics = list(metrics)
+        self.grains = dict(grains)
+        self.columns = [f"{metric}_{stat}" for metric in self.metrics for stat in STATS] + ['weather']
+
+        self._lock = threading.Lock()
+        # grain -> location -> frame indexed by period start, with `latest` (the period's last timestamp, ns)
+        self._tables = {grain: {} for grain in self.grains}
+        self._ingested = {}     # location -> sorted unique ingested timestamps (ns since epoch)
+        self._coordinates = {}  # location -> (ns timestamp, lat, lon) of its latest observation
+
+    def update(self, frame):
+        """
+        Fold observations at timestamps not ingested before into the rollups.
+
+        Args:
+            frame (pd.DataFrame): Observations with `date`, `location`, the
+                metric columns and optionally `latitude`, `longitude`, `weather`
+
+        Returns:
+            int: Number of new rows ingested
+        """
+        if frame is None or frame.empty:
+            return 0
+
+        with self._lock:
+            # Keep only rows at timestamps their location hasn't ingested yet
+            locations = frame['location'].astype('category')
+            codes = locations.cat.codes.to_numpy()
+            dates = frame['date'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+            is_new = np.ones(len(frame), bool)
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(len(locations.cat.categories) + 1))
+            for code, location in enumerate(locations.cat.categories):
+                ingested = self._ingested.get(str(location))
+                if ingested is not None:
+                    rows = order[bounds[code]:bounds[code + 1]]
+                    is_new[rows] = ~np.isin(dates[rows], ingested)
+            if not is_new.any():
+                return 0
+
+            new = frame[is_new].sort_values(['location', 'date'], kind='stable')
+            keys = new['location'].astype(str)
+            values = new[self.metrics].astype(np.float64)
+            weather = new['weather'].astype(object) if 'weather' in new else pd.Series(None, index=new.index, dtype=object)
+            timestamps = pd.Series(new['date'].to_numpy(dtype='datetime64[ns]').view(np.int64), index=new.index)
+
+            for grain, freq in self.grains.items():
+                periods = new['date'].dt.to_period(freq).dt.start_time.rename('date')
+                stats = values.groupby([keys, periods], sort=True).agg(STATS)
+                stats.columns = [f"{metric}_{stat}" for metric, stat in stats.columns]
+                stats['weather'] = weather.groupby([keys, periods], sort=True).last()
+                stats['latest'] = timestamps.groupby([keys, periods], sort=True).max()
+                self._merge(self._tables[grain], stats)
+
+            # Record what was ingested and remember where each location is
+            for location, ts in timestamps.groupby(keys, sort=False):
+                ingested = self._ingested.get(location)
+                ts = ts.to_numpy()
+                self._ingested[location] = np.unique(ts) if ingested is None else np.union1d(ingested, ts)
+            if 'latitude' in new:
+                latest = new.assign(_ts=timestamps).groupby(keys, sort=False).tail(1)
+                for location, ts, lat, lon in zip(latest['location'].astype(str), latest['_ts'],
+                                                  latest['latitude'], latest['longitude']):
+                    if ts >= self._coordinates.get(location, (np.iinfo(np.int64).min,))[0]:
+                        self._coordinates[location] = (ts, lat, lon)
+            return len(new)
+
+    def view(self, grain, locations=None, start=None, end=None):
+        """
+        Read a rollup table for some locations and time range.
+
+        Args:
+            grain (str): One of GRAINS
+            locations (iterable): Location names (defaults to all)
+            start (datetime): Include periods overlapping this instant or later
+            end (datetime): Exclude periods starting at or after this instant
+
+        Returns:
+            pd.DataFrame: One row per (location, period) ordered by location and
+                period start (`date`), with `latitude`, `longitude`, the
+                per-metric mean named after the metric, its count/sum/min/max
+                columns and the period's latest `weather`
+        """
+        freq = self.grains[grain]
+        if start is not None:
+            start = pd.Timestamp(start).to_period(freq).start_time
+
+        with self._lock:
+            tables = self._tables[grain]
+            names = [location for location in (tables if locations is None else locations) if location in tables]
+            frames = []
+            for location in names:
+                table = tables[location]
+                lo = table.index.searchsorted(start) if start is not None else 0
+                hi = table.index.searchsorted(pd.Timestamp(end)) if end is not None else len(table)
+                frames.append(table.iloc[lo:hi])
+            coordinates = [self._coordinates.get(location, (None, np.nan, np.nan))[1:] for location in names]
+
+        if not frames:
+            out = pd.DataFrame(columns=['location', 'date'] + self.columns)
+        else:
+            out = pd.concat(frames, keys=names, names=['location', 'date']).reset_index().drop(columns='latest')
+
+        lat = dict(zip(names, (c[0] for c in coordinates)))
+        lon = dict(zip(names, (c[1] for c in coordinates)))
+        out.insert(2, 'latitude', out['location'].map(lat).astype(np.float64))
+        out.insert(3, 'longitude', out['location'].map(lon).astype(np.float64))
+        for metric in self.metrics:
+            count = out[f"{metric}_count"].astype(np.float64)
+            out[metric] = (out[f"{metric}_sum"].astype(np.float64) / count).where(count > 0)
+        out['location'] = pd.Categorical(out['location'], categories=names)
+        return out
+
+    @staticmethod
+    def _merge(tables, stats):
+        """Merge new period aggregates into each location's table, combining the periods both have."""
+        for location, part in stats.groupby(level=0, sort=False):
+            part = part.droplevel(0)
+            existing = tables.get(location)
+            if existing is not None and len(existing):
+                shared = part.index.intersection(existing.index)
+                if len(shared):
+                    part = part.copy()
+                    for period in shared:
+                        part.loc[period] = _combine(existing.loc[period], part.loc[period])
+                    existing = existing.drop(shared)
+                part = pd.concat([existing, part])
+                # Backfilled periods land before the existing ones
+                if not part.index.is_monotonic_increasing:
+                    part = part.sort_index()
+            tables[location] = part
+
+
+def _combine(old, new):
+    """Combine two aggregate rows of the same period."""
+    combined = new.copy()
+    newer = new['latest'] >= old['latest']
+    for column in new.index:
+        if column.endswith('_count') or column.endswith('_sum'):
+            combined[column] = old[column] + new[column]
+        elif column.endswith('_min'):
+            combined[column] = np.fmin(old[column], new[column])
+        elif column.endswith('_max') or column == 'latest':
+            combined[column] = np.fmax(old[column], new[column])
+        elif pd.isna(new[column]) or (not newer and not pd.isna(old[column])):
+            # The weather of the period's latest observation
+            combined[column] = old[column]
+    return combined
@@ -0,0 +1,91 @@
+"""Process-wide coalescing of identical concurrent calls.
+
+When many sessions miss their caches at once (say after an expiry, with
+everyone looking at the same cities) each would otherwise send its own
+upstream request for the same data. A `SingleFlight` group lets the first
+caller for a key run the call while every concurrent caller for that key
+waits for it and gets the same result, or the same exception. Once the call
+finishes the key is free again, so nothing is cached here; the callers'
+caches take it from there.
+
+Upstream calls then scale with the number of distinct (endpoint, location)
+keys in flight rather than with the number of concurrent users.
+"""
+import threading
+
+from air_quality.metrics import COALESCED_CALLS
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time, sharing its outcome with concurrent callers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> _Call in flight
+
+    def do(self, key, func, label='default'):
+        """
+        Run `func()`, or wait for the identical call already in flight.
+
+        Args:
+            key (hashable): Identifies calls that return the same thing
+            func (callable): Makes the call; only run by the first caller
+            label (str): `group` label of the coalesced-calls metric
+
+        Returns:
+            The call's result, shared by every caller, so treat it as read-only
+
+        Raises:
+            Exception: Whatever the call raised, re-raised in every caller
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            COALESCED_CALLS.inc(group=label)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+_group = None
+_group_lock = threading.Lock()
+
+
+def get_flight_group():
+    """Get the process-wide single-flight group shared by every upstream fetcher."""
+    global _group
+    if _group is None:
+        with _group_lock:
+            if _group is None:
+                _group = SingleFlight()
+    return _group
+
+
+def coalesce(key, func, label='default'):
+    """Run `func()` through the process-wide group (see `SingleFlight.do`)."""
+    return get_flight_group().do(key, func, label)
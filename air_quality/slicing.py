@@ -0,0 +1,113 @@
+"""Location/time slicing over observations sorted by (location, timestamp).
+
+Observations are held sorted by location and then timestamp, so each location
+occupies one contiguous block of rows whose timestamps are ascending. A
+location and date range then resolve to a row range with two binary searches,
+and selections come back as positional slices instead of boolean masks over
+the whole frame. Slices that are contiguous (one location, or neighbouring
+locations whose blocks touch) are views and copy nothing.
+"""
+import numpy as np
+import pandas as pd
+
+
+class ObservationIndex:
+    """Sorted (location, timestamp) index over an observation frame."""
+
+    def __init__(self, frame):
+        """
+        Args:
+            frame (pd.DataFrame): Observations with `location` and `date`;
+                sorted here only if it isn't already grouped by location with
+                ascending dates (the store and sample generator already are)
+        """
+        codes, uniques = pd.factorize(frame['location'], sort=True)
+        dates = frame['date'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+        if not _is_grouped(codes, dates, len(uniques)):
+            order = np.lexsort((dates, codes))
+            frame, codes, dates = frame.take(order), codes[order], dates[order]
+
+        self.frame = frame
+        self._dates = dates
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) else np.array([], int)
+        stops = np.r_[starts[1:], len(codes)]
+        self._blocks = {str(uniques[codes[start]]): (int(start), int(stop)) for start, stop in zip(starts, stops)}
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def locations(self):
+        """Location names in row order."""
+        return list(self._blocks)
+
+    @property
+    def date_range(self):
+        """(earliest, latest) timestamp, or (None, None) when empty."""
+        if not len(self._dates):
+            return None, None
+        firsts = [self._dates[start] for start, _ in self._blocks.values()]
+        lasts = [self._dates[stop - 1] for _, stop in self._blocks.values()]
+        return pd.Timestamp(min(firsts)), pd.Timestamp(max(lasts))
+
+    def bounds(self, location, start=None, end=None):
+        """
+        Get the row range of a location within [start, end).
+
+        Returns:
+            tuple: (first row, row after the last); equal when nothing matches
+        """
+        lo, hi = self._blocks.get(location, (0, 0))
+        if start is not None:
+            lo += int(np.searchsorted(self._dates[lo:hi], pd.Timestamp(start).value, side='left'))
+        if end is not None:
+            hi = lo + int(np.searchsorted(self._dates[lo:hi], pd.Timestamp(end).value, side='left'))
+        return lo, hi
+
+    def slice(self, locations=None, start=None, end=None):
+        """
+        Select observations of some locations within [start, end).
+
+        Args:
+            locations (iterable): Location names (defaults to all)
+            start (datetime): Earliest timestamp to include
+            end (datetime): Timestamp to stop before
+
+        Returns:
+            pd.DataFrame: Matching rows grouped by location in index order; a
+                view when they form one contiguous range, else a copy of just
+                those rows
+        """
+        names = self._blocks if locations is None else set(locations)
+        ranges = sorted(self.bounds(location, start, end) for location in self._blocks if location in names)
+        ranges = [(lo, hi) for lo, hi in ranges if hi > lo]
+
+        # Merge ranges that touch, so whole neighbouring blocks stay one slice
+        merged = []
+        for lo, hi in ranges:
+            if merged and merged[-1][1] == lo:
+                merged[-1] = (merged[-1][0], hi)
+            else:
+                merged.append((lo, hi))
+
+        if not merged:
+            return self.frame.iloc[0:0]
+        if len(merged) == 1:
+            return self.frame.iloc[merged[0][0]:merged[0][1]]
+        return self.frame.take(np.concatenate([np.arange(lo, hi) for lo, hi in merged]))
+
+    def first_rows(self, locations=None):
+        """Get the first row of each location, in index order."""
+        names = self._blocks if locations is None else set(locations)
+        return self.frame.take([start for location, (start, _) in self._blocks.items() if location in names])
+
+
+def _is_grouped(codes, dates, n_groups):
+    """Check that each location is one contiguous block with ascending dates."""
+    if len(codes) < 2:
+        return True
+    boundary = codes[1:] != codes[:-1]
+    if np.count_nonzero(boundary) != n_groups - 1:
+        return False
+    return bool(np.all(boundary | (dates[1:] >= dates[:-1])))
@@ -0,0 +1,190 @@
+"""Persistent on-disk store for air quality observations.
+
+Observations are kept in a local SQLite database keyed by (location, timestamp)
+and written with upserts, so re-ingesting the same hour replaces it rather than
+duplicating it. Each location's history watermark, the latest timestamp a
+history backfill has stored, tells the loader how much history still has to be
+fetched. It is kept apart from the observations so that a current reading
+stored while the backfill failed doesn't hide the gap.
+"""
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+from air_quality.history import to_local_datetime, to_unix_seconds
+from air_quality.schema import conform
+
+DEFAULT_STORE_PATH = os.path.join('data', 'observations.sqlite')
+
+NUMERIC_COLUMNS = [
+    'latitude', 'longitude', 'pm25', 'pm10', 'no2', 'o3', 'temp_c', 'humidity',
+    'wind_speed', 'aqi'
+]
+VALUE_COLUMNS = NUMERIC_COLUMNS + ['aqi_category', 'aqi_color', 'weather']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS observations (
+    location TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    latitude REAL,
+    longitude REAL,
+    pm25 REAL,
+    pm10 REAL,
+    no2 REAL,
+    o3 REAL,
+    temp_c REAL,
+    humidity REAL,
+    wind_speed REAL,
+    aqi REAL,
+    aqi_category TEXT,
+    aqi_color TEXT,
+    weather TEXT,
+    PRIMARY KEY (location, ts)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS watermarks (
+    location TEXT NOT NULL,
+    name TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    PRIMARY KEY (location, name)
+) WITHOUT ROWID;
+"""
+
+
+class ObservationStore:
+    """SQLite-backed observation store, safe to share between threads."""
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    def upsert(self, frame):
+        """
+        Insert or replace observations keyed by (location, date).
+
+        Args:
+            frame (pd.DataFrame): Observations with `date`, `location` and the
+                value columns; missing value columns are stored as NULL
+
+        Returns:
+            int: Number of rows written
+        """
+        if frame is None or frame.empty:
+            return 0
+
+        columns = [frame['location'].astype(str).tolist(), to_unix_seconds(frame['date']).tolist()]
+        for column in VALUE_COLUMNS:
+            if column in frame:
+                values = frame[column].astype(object).where(frame[column].notna(), None)
+                columns.append([v.item() if hasattr(v, 'item') else v for v in values])
+            else:
+                columns.append([None] * len(frame))
+
+        names = ['location', 'ts'] + VALUE_COLUMNS
+        updates = ', '.join(f"{c} = excluded.{c}" for c in VALUE_COLUMNS)
+        sql = (f"INSERT INTO observations ({', '.join(names)}) "
+               f"VALUES ({', '.join('?' * len(names))}) "
+               f"ON CONFLICT (location, ts) DO UPDATE SET {updates}")
+
+        rows = list(zip(*columns))
+        with self._lock, self._conn:
+            self._conn.executemany(sql, rows)
+        return len(rows)
+
+    def last_timestamps(self, locations):
+        """
+        Get the latest stored Unix timestamp for each location.
+
+        Args:
+            locations (iterable): Location names
+
+        Returns:
+            dict: Location name -> Unix timestamp, for locations with data
+        """
+        locations = list(locations)
+        if not locations:
+            return {}
+        sql = (f"SELECT location, MAX(ts) FROM observations "
+               f"WHERE location IN ({', '.join('?' * len(locations))}) GROUP BY location")
+        with self._lock:
+            return dict(self._conn.execute(sql, locations).fetchall())
+
+    def watermarks(self, locations, name):
+        """
+        Get a named watermark for each location.
+
+        Args:
+            locations (iterable): Location names
+            name (str): Watermark name, e.g. 'history'
+
+        Returns:
+            dict: Location name -> Unix timestamp, for locations with the watermark set
+        """
+        locations = list(locations)
+        if not locations:
+            return {}
+        sql = (f"SELECT location, ts FROM watermarks "
+               f"WHERE name = ? AND location IN ({', '.join('?' * len(locations))})")
+        with self._lock:
+            return dict(self._conn.execute(sql, [name] + locations).fetchall())
+
+    def advance_watermark(self, location, name, timestamp):
+        """
+        Move a location's named watermark forward to `timestamp` (never back).
+
+        Args:
+            location (str): Location name
+            name (str): Watermark name, e.g. 'history'
+            timestamp (int): Unix timestamp
+        """
+        sql = ("INSERT INTO watermarks (location, name, ts) VALUES (?, ?, ?) "
+               "ON CONFLICT (location, name) DO UPDATE SET ts = MAX(ts, excluded.ts)")
+        with self._lock, self._conn:
+            self._conn.execute(sql, (location, name, int(timestamp)))
+
+    def load(self, locations, start=None, end=None):
+        """
+        Read observations for some locations, optionally within a time range.
+
+        Args:
+            locations (iterable): Location names
+            start (int): Earliest Unix timestamp to include
+            end (int): Latest Unix timestamp to include
+
+        Returns:
+            pd.DataFrame: Observations ordered by location and date, in the compact schema
+        """
+        locations = list(locations)
+        sql = (f"SELECT location, ts, {', '.join(VALUE_COLUMNS)} FROM observations "
+               f"WHERE location IN ({', '.join('?' * len(locations))})")
+        params = list(locations)
+        if start is not None:
+            sql += " AND ts >= ?"
+            params.append(int(start))
+        if end is not None:
+            sql += " AND ts <= ?"
+            params.append(int(end))
+        sql += " ORDER BY location, ts"
+
+        with self._lock:
+            frame = pd.read_sql_query(sql, self._conn, params=params)
+
+        frame.insert(0, 'date', to_local_datetime(frame.pop('ts').to_numpy()))
+        # Columns that are entirely NULL come back as object dtype
+        frame[NUMERIC_COLUMNS] = frame[NUMERIC_COLUMNS].astype('float64')
+        return conform(frame[['date', 'location'] + VALUE_COLUMNS])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
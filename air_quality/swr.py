@@ -0,0 +1,159 @@
+"""Stale-while-revalidate cache for upstream responses.
+
+An entry is fresh for `ttl` seconds and served as-is. After that it is stale:
+the stale value is still returned immediately while a background thread
+refetches it, so no caller waits on the upstream once a key has been fetched.
+A failed refresh keeps the stale value and is retried after `retry_interval`,
+so an upstream outage degrades to slightly old data instead of errors. Only
+once an entry is older than `max_age` (the hard expiry) is it dropped and
+fetched synchronously again, raising if that fails.
+
+Entries are kept per process, shared by every session, and the least
+recently used are evicted beyond `max_entries`.
+"""
+import concurrent.futures as cf
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from air_quality.metrics import CACHE_EVICTIONS, CACHE_REQUESTS, SWR_REFRESHES
+
+DEFAULT_TTL = 3600             # Seconds an entry is served without refreshing it
+DEFAULT_MAX_AGE = 6 * 3600     # Seconds after which a stale entry is no longer served
+DEFAULT_RETRY_INTERVAL = 60    # Seconds between refresh attempts while the upstream fails
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_REFRESH_WORKERS = 4
+
+
+class _Entry:
+    __slots__ = ('value', 'fetched', 'refreshing', 'next_refresh', 'error')
+
+    def __init__(self, value, fetched):
+        self.value = value
+        self.fetched = fetched
+        self.refreshing = False
+        self.next_refresh = 0.0
+        self.error = None
+
+
+class SWRCache:
+    """Thread-safe stale-while-revalidate cache with background refreshes."""
+
+    def __init__(self, ttl=DEFAULT_TTL, max_age=DEFAULT_MAX_AGE, retry_interval=DEFAULT_RETRY_INTERVAL,
+                 max_entries=DEFAULT_MAX_ENTRIES, refresh_workers=DEFAULT_REFRESH_WORKERS):
+        self.ttl = ttl
+        self.max_age = max(max_age, ttl)
+        self.retry_interval = retry_interval
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> _Entry
+        self._lock = threading.Lock()
+        self._pool = cf.ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix='aq-swr')
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, fetch, label='swr'):
+        """
+        Get a value, fetching it on a miss and refreshing it in the background once stale.
+
+        Args:
+            key (hashable): Cache key, e.g. (endpoint, lat, lon)
+            fetch (callable): Returns a fresh value, raising on failure
+            label (str): `cache` label of the cache metrics
+
+        Returns:
+            The cached or newly fetched value, shared between callers, so
+                treat it as read-only
+
+        Raises:
+            Exception: Whatever `fetch` raised, when there is no entry young
+                enough to fall back on
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry.fetched >= self.max_age:
+                # Past the hard expiry: too old to serve, even during an outage
+                del self._entries[key]
+                CACHE_EVICTIONS.inc(cache=label)
+                entry = None
+
+            if entry is not None:
+                self._entries.move_to_end(key)
+                stale = now - entry.fetched >= self.ttl
+                if stale and not entry.refreshing and now >= entry.next_refresh:
+                    entry.refreshing = True
+                    self._pool.submit(self._refresh, key, entry, fetch, label)
+                CACHE_REQUESTS.inc(cache=label, result='stale' if stale else 'hit')
+                return entry.value
+
+        CACHE_REQUESTS.inc(cache=label, result='miss')
+        value = fetch()
+        self._store(key, _Entry(value, time.monotonic()), label)
+        return value
+
+    def _refresh(self, key, entry, fetch, label):
+        try:
+            value = fetch()
+        except Exception as e:
+            # Keep serving the stale value and try again a little later
+            with self._lock:
+                entry.refreshing = False
+                entry.error = e
+                entry.next_refresh = time.monotonic() + self.retry_interval
+            SWR_REFRESHES.inc(cache=label, result='error')
+            return
+        self._store(key, _Entry(value, time.monotonic()), label)
+        SWR_REFRESHES.inc(cache=label, result='ok')
+
+    def _store(self, key, entry, label):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                CACHE_EVICTIONS.inc(cache=label)
+
+    def status(self, key):
+        """
+        Describe an entry, e.g. to tell users they are seeing stale data.
+
+        Returns:
+            dict: `age` in seconds, whether it is `stale`, and the exception
+                of the last refresh as `error` (None if it succeeded), or None
+                if the key isn't cached
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            age = time.monotonic() - entry.fetched
+            return {'age': age, 'stale': age >= self.ttl, 'error': entry.error}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_upstream_cache():
+    """
+    Get the process-wide cache of upstream responses.
+
+    Its freshness, hard expiry and refresh retry interval can be set in
+    seconds with AQ_CACHE_TTL, AQ_CACHE_MAX_AGE and AQ_CACHE_RETRY.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SWRCache(
+                    ttl=float(os.getenv('AQ_CACHE_TTL', DEFAULT_TTL)),
+                    max_age=float(os.getenv('AQ_CACHE_MAX_AGE', DEFAULT_MAX_AGE)),
+                    retry_interval=float(os.getenv('AQ_CACHE_RETRY', DEFAULT_RETRY_INTERVAL))
+                )
+    return _cache
@@ -0,0 +1,254 @@
+"""Lightweight timing spans for the data pipeline and upstream calls.
+
+A trace collects the spans of one unit of work, e.g. one dashboard rerun or
+one API dataset load. Code marks its stages with `span()`:
+
+    with span('prepare', rows=len(df)):
+        ...
+
+Spans nest through context variables, and `bind()` carries the current trace
+and span into worker threads, so the fetch engine's calls land under the stage
+that started them. A span without a `location` inherits its parent's, which
+lets a trace be broken down by stage and by location.
+
+Outside a trace `span()` returns a shared no-op after a single context
+variable lookup, so instrumented code costs next to nothing when tracing is
+off. Finished traces can be appended to a JSONL log, one record per trace.
+"""
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+
+_trace = contextvars.ContextVar('aq_trace', default=None)
+_span = contextvars.ContextVar('aq_span', default=None)
+_log_lock = threading.Lock()
+
+
+class Span:
+    """One timed stage of a trace."""
+
+    __slots__ = ('trace', 'id', 'parent', 'name', 'attrs', 'thread', 'start', 'end', '_token')
+
+    def __init__(self, trace, name, parent, attrs):
+        self.trace = trace
+        self.id = next(trace._ids)
+        self.parent = parent.id if parent is not None else None
+        self.name = name
+        self.attrs = attrs
+        if 'location' not in attrs and parent is not None and 'location' in parent.attrs:
+            attrs['location'] = parent.attrs['location']
+        self.thread = threading.current_thread().name
+        self.start = self.end = None
+        self._token = None
+
+    def set(self, **attrs):
+        """Add attributes, e.g. a status code only known once the work is done."""
+        self.attrs.update(attrs)
+
+    @property
+    def duration(self):
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def __enter__(self):
+        self._token = _span.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end = time.perf_counter()
+        _span.reset(self._token)
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        self.trace._spans.append(self)
+        return False
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'parent': self.parent,
+            'name': self.name,
+            'start_ms': round((self.start - self.trace.start) * 1000, 3),
+            'duration_ms': round(self.duration * 1000, 3),
+            'thread': self.thread,
+            **({'attrs': self.attrs} if self.attrs else {})
+        }
+
+
+class _NoopSpan:
+    """Stands in for a span when nothing is being traced."""
+
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class Trace:
+    """The spans recorded for one unit of work."""
+
+    def __init__(self, name, **attrs):
+        self.id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attrs = attrs
+        self.timestamp = time.time()
+        self.start = time.perf_counter()
+        self.end = None
+        self._ids = itertools.count(1)
+        self._spans = []  # Appended from any thread as spans finish
+
+    @property
+    def duration(self):
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    @property
+    def spans(self):
+        """Finished spans, in start order."""
+        return sorted(self._spans, key=lambda s: s.start)
+
+    def finish(self, log_path=None):
+        """
+        Stop recording into this trace and optionally append it to a JSONL log.
+
+        Args:
+            log_path (str): JSONL file to append the trace's record to
+        """
+        if self.end is None:
+            self.end = time.perf_counter()
+            if _trace.get() is self:
+                _trace.set(None)
+                _span.set(None)
+            if log_path:
+                write_trace(self, log_path)
+        return self
+
+    def stages(self):
+        """
+        Sum span durations by stage name.
+
+        Returns:
+            list: Dicts with `stage`, `count`, `total_ms` and `max_ms`, slowest first
+        """
+        return _summarize(self.spans, lambda s: (s.name,), ('stage',))
+
+    def locations(self):
+        """
+        Sum span durations by location and stage name.
+
+        Returns:
+            list: Dicts with `location`, `stage`, `count`, `total_ms` and `max_ms`
+        """
+        spans = [s for s in self.spans if 'location' in s.attrs]
+        return _summarize(spans, lambda s: (s.attrs['location'], s.name), ('location', 'stage'))
+
+    def to_dict(self):
+        return {
+            'trace': self.id,
+            'name': self.name,
+            'timestamp': self.timestamp,
+            'duration_ms': round(self.duration * 1000, 3),
+            'attrs': self.attrs,
+            'stages': self.stages(),
+            'locations': self.locations(),
+            'spans': [s.to_dict() for s in self.spans]
+        }
+
+
+def _summarize(spans, key, fields):
+    totals = {}
+    for s in spans:
+        entry = totals.setdefault(key(s), [0, 0.0, 0.0])
+        duration = s.duration
+        entry[0] += 1
+        entry[1] += duration
+        entry[2] = max(entry[2], duration)
+    return [
+        {**dict(zip(fields, k)), 'count': count, 'total_ms': round(total * 1000, 3), 'max_ms': round(longest * 1000, 3)}
+        for k, (count, total, longest) in sorted(totals.items(), key=lambda item: -item[1][1])
+    ]
+
+
+def start_trace(name, **attrs):
+    """
+    Start recording spans in the current context, replacing any unfinished trace.
+
+    Returns:
+        Trace: Call `finish()` on it when the work is done
+    """
+    trace = Trace(name, **attrs)
+    _trace.set(trace)
+    _span.set(None)
+    return trace
+
+
+def end_trace():
+    """Finish the trace being recorded in this context, if any, without logging it."""
+    trace = _trace.get()
+    if trace is not None:
+        trace.finish()
+
+
+def span(name, **attrs):
+    """
+    Time a stage of the current trace.
+
+    Returns:
+        A context manager yielding the span (a no-op when nothing is traced)
+    """
+    trace = _trace.get()
+    if trace is None or trace.end is not None:
+        return _NOOP
+    return Span(trace, name, _span.get(), attrs)
+
+
+def bind(func, name=None, **attrs):
+    """
+    Carry the current trace into another thread.
+
+    Args:
+        func (callable): Work to run elsewhere, e.g. submitted to a thread pool
+        name (str): Also time each call as a span of this name
+        **attrs: Attributes of that span
+
+    Returns:
+        callable: `func` itself when nothing is traced, otherwise a wrapper
+            running it in a copy of the current context
+    """
+    trace = _trace.get()
+    if trace is None or trace.end is not None:
+        return func
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        # A context can only be entered by one thread at a time, so each call runs in its own copy
+        if name is None:
+            return context.copy().run(func, *args, **kwargs)
+        return context.copy().run(_call_in_span, name, attrs, func, args, kwargs)
+    return run
+
+
+def _call_in_span(name, attrs, func, args, kwargs):
+    with span(name, **attrs):
+        return func(*args, **kwargs)
+
+
+def write_trace(trace, path):
+    """Append a finished trace to a JSONL log as one line."""
+    line = json.dumps(trace.to_dict(), default=str)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with _log_lock, open(path, 'a', encoding='utf-8') as f:
+        f.write(line + '\n')
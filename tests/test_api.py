@@ -0,0 +1,124 @@
+import io
+import threading
+import time
+
+import pyarrow as pa
+import pytest
+import requests
+
+from air_quality import api, pipeline
+from air_quality.api import AirQualityService, ApiError, serve_in_background
+from air_quality.store import ObservationStore
+
+LONDON, TOKYO, SYDNEY = 'London, UK', 'Tokyo, Japan', 'Sydney, Australia'
+
+
+@pytest.fixture
+def client():
+    server = serve_in_background(AirQualityService(sample_span='3D', sample_freq='h'), port=0)
+    session = requests.Session()
+    session.trust_env = False
+    yield session, f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+    server.server_close()
+
+
+def test_datasets_are_loaded_once_and_bounded(monkeypatch):
+    loads = []
+    load_sample = pipeline.load_sample
+
+    def slow_sample(locations, **kwargs):
+        loads.append(tuple(locations))
+        time.sleep(0.05)
+        return load_sample(locations, **kwargs)
+
+    monkeypatch.setattr(api, 'load_sample', slow_sample)
+    service = AirQualityService(max_datasets=2)
+
+    threads = [threading.Thread(target=service.dataset, args=([LONDON],)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert loads == [(LONDON,)]
+    assert service._loading == {}
+
+    service.dataset([TOKYO])
+    service.dataset([LONDON])  # Now the most recently used
+    service.dataset([SYDNEY])
+
+    loaded = [tuple(dataset['locations']) for dataset in service.status()['datasets']]
+    assert loaded == [(LONDON,), (SYDNEY,)]
+    assert service._loading == {}
+    assert service._rollups == {}  # Sample rollups went with their datasets
+
+
+def test_unknown_standard():
+    with pytest.raises(ApiError) as error:
+        AirQualityService().dataset([LONDON], 'aqhi')
+    assert error.value.status == 400
+
+
+def test_shared_store_and_fetchers(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, 'fetch_history', lambda lat, lon, api_key, start=None, end=None: {'list': []})
+    now = int(time.time())
+    calls = []
+
+    def fetcher(payload):
+        def fetch(lat, lon, api_key):
+            calls.append(api_key)
+            return payload
+        return fetch
+
+    store = ObservationStore(str(tmp_path / 'observations.sqlite'))
+    service = AirQualityService(api_key='key', store=store, fetchers={
+        'air quality': fetcher({'list': [{'dt': now, 'main': {'aqi': 2}, 'components': {'pm2_5': 10.0}}]}),
+        'weather': fetcher({'main': {'temp': 18.0, 'humidity': 60}, 'wind': {'speed': 3.0}, 'weather': [{'main': 'Clear'}]})
+    })
+    service.resolve = {'Paris': (48.85, 2.35)}.get
+
+    observations, _ = service.dataset(['Paris'])
+
+    assert service.store is store
+    assert calls == ['key', 'key']
+    assert 'Paris' in store.last_timestamps(['Paris'])
+    assert observations.locations == ['Paris']
+    store.close()
+
+
+def test_json_endpoints(client):
+    session, base = client
+
+    history = session.get(f'{base}/history', params={'location': LONDON}).json()
+    assert history['standard'] == 'us_epa'
+    assert history['count'] == len(history['data']) > 0
+    assert {row['location'] for row in history['data']} == {LONDON}
+
+    assert LONDON in session.get(f'{base}/locations').json()['locations']
+    assert session.get(f'{base}/health').json()['status'] == 'ok'
+
+
+def test_streamed_arrow_export(client):
+    session, base = client
+
+    response = session.get(f'{base}/rollups', params={'grain': 'daily', 'location': LONDON, 'format': 'arrow'})
+
+    assert response.headers['Transfer-Encoding'] == 'chunked'
+    table = pa.ipc.open_file(io.BytesIO(response.content)).read_all()
+    assert table.num_rows > 0
+    assert set(table.column('location').to_pylist()) == {LONDON}
+
+
+@pytest.mark.parametrize('path, params', [
+    ('/nowhere', {}),
+    ('/history', {'format': 'xml'}),
+    ('/rollups', {'grain': 'monthly'}),
+    ('/current', {'standard': 'aqhi'}),
+])
+def test_errors(client, path, params):
+    session, base = client
+
+    response = session.get(base + path, params=params)
+
+    assert response.status_code in (400, 404)
+    assert 'error' in response.json()
@@ -0,0 +1,112 @@
+from fractions import Fraction
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from air_quality.aqi import (
+    POLLUTANTS, STANDARDS, US_EPA, calculate_aqi, categorize, compute_aqi, get_aqi_category, rescore
+)
+
+
+def legacy_calculate_aqi(pm25, pm10, no2, o3):
+    """The dashboard's original per-reading US EPA AQI, kept as the reference."""
+    def get_aqi(concentration, breakpoints):
+        for i in range(len(breakpoints) - 1):
+            if breakpoints[i][0] <= concentration <= breakpoints[i + 1][0]:
+                aqi_low, aqi_high = breakpoints[i][1], breakpoints[i + 1][1]
+                conc_low, conc_high = breakpoints[i][0], breakpoints[i + 1][0]
+                return int(((aqi_high - aqi_low) / (conc_high - conc_low)) * (concentration - conc_low) + aqi_low)
+        return 0
+
+    # AQI breakpoints (concentration, AQI) for each pollutant
+    pm25_breakpoints = [(0, 0), (12.0, 50), (35.4, 100), (55.4, 150), (150.4, 200), (250.4, 300), (350.4, 400), (500.4, 500)]
+    pm10_breakpoints = [(0, 0), (54, 50), (154, 100), (254, 150), (354, 200), (424, 300), (504, 400), (604, 500)]
+    no2_breakpoints = [(0, 0), (53, 50), (100, 100), (360, 150), (649, 200), (1249, 300), (1649, 400), (2049, 500)]
+    o3_breakpoints = [(0, 0), (54, 50), (70, 100), (85, 150), (105, 200), (200, 300), (300, 400), (500, 500)]
+
+    aqi_pm25 = get_aqi(pm25, pm25_breakpoints)
+    aqi_pm10 = get_aqi(pm10, pm10_breakpoints)
+    aqi_no2 = get_aqi(no2, no2_breakpoints)
+    aqi_o3 = get_aqi(o3, o3_breakpoints)
+
+    return max(aqi_pm25, aqi_pm10, aqi_no2, aqi_o3)
+
+
+def exact_sub_index(standard, pollutant, tenths):
+    """The legacy interpolation in exact rational arithmetic, for concentrations given in tenths."""
+    factor = Fraction(str(standard.unit_factors.get(pollutant, 1.0)))
+    table = [(Fraction(str(c)), int(i)) for c, i in standard.breakpoints[pollutant].tolist()]
+    c = min(max(Fraction(tenths, 10) * factor, table[0][0]), table[-1][0])
+    for (conc_low, aqi_low), (conc_high, aqi_high) in zip(table, table[1:]):
+        if conc_low <= c <= conc_high:
+            return int(Fraction(aqi_high - aqi_low) / (conc_high - conc_low) * (c - conc_low) + aqi_low)
+
+
+@pytest.mark.parametrize('standard', list(STANDARDS.values()), ids=list(STANDARDS))
+@pytest.mark.parametrize('pollutant', POLLUTANTS)
+def test_sub_index_matches_exact_interpolation(standard, pollutant):
+    top = standard.breakpoints[pollutant][-1, 0] / standard.unit_factors.get(pollutant, 1.0)
+    tenths = np.arange(0, int(top * 10) + 20)  # Every 0.1 step, plus a little past the top
+
+    expected = [exact_sub_index(standard, pollutant, int(t)) for t in tenths]
+
+    assert standard.sub_index(pollutant, tenths / 10).tolist() == expected
+
+
+def test_sub_index_at_whole_number_results():
+    # 200 + (368.7 - 354) * 100 / 70 is exactly 221, but 220.999... in floating point
+    assert US_EPA.sub_index('pm10', [368.7]).tolist() == [221]
+    assert US_EPA.sub_index('pm25', [12.0, 35.4, 35.5]).tolist() == [50, 100, 100]
+
+
+def test_sub_index_edges():
+    assert US_EPA.sub_index('pm25', [-5.0, 0.0, 10_000.0]).tolist() == [0, 0, 500]
+    assert np.isnan(US_EPA.sub_index('pm25', [np.nan])[0])
+
+
+def test_calculate_aqi_agrees_with_the_legacy_implementation():
+    rng = np.random.default_rng(7)
+    readings = np.column_stack([
+        np.round(rng.uniform(0, 500, 2000), 1),
+        np.round(rng.uniform(0, 604, 2000), 1),
+        np.round(rng.uniform(0, 2049, 2000), 1),
+        np.round(rng.uniform(0, 500, 2000), 1)
+    ])
+
+    for pm25, pm10, no2, o3 in readings.tolist():
+        new, old = calculate_aqi(pm25, pm10, no2, o3), legacy_calculate_aqi(pm25, pm10, no2, o3)
+        # The legacy float arithmetic sometimes truncated a whole-number index to the one below
+        assert new - old in (0, 1)
+        exact = max(exact_sub_index(US_EPA, p, round(v * 10)) for p, v in zip(POLLUTANTS, (pm25, pm10, no2, o3)))
+        assert new == exact
+
+
+def test_compute_aqi_takes_the_dominant_pollutant():
+    frame = pd.DataFrame({'pm25': [10.0, 40.0, np.nan], 'pm10': [100.0, 20.0, np.nan], 'o3': [10.0, 10.0, np.nan]})
+
+    scores = compute_aqi(frame)
+
+    assert scores['aqi'].tolist()[:2] == [73, 111]
+    assert scores['dominant_pollutant'].tolist()[:2] == ['pm10', 'pm25']
+    assert scores['aqi_category'].tolist()[:2] == ['Moderate', 'Unhealthy for Sensitive Groups']
+    # A reading without any pollutant has no AQI
+    assert np.isnan(scores['aqi'].iloc[2])
+    assert pd.isna(scores['aqi_category'].iloc[2])
+
+
+def test_categories_include_their_upper_bound():
+    assert get_aqi_category(50) == ("Good", "#00E400")
+    assert get_aqi_category(51) == ("Moderate", "#FFFF00")
+    assert get_aqi_category(301) == ("Hazardous", "#7E0023")
+    categories, colors = categorize([100, 101], 'eu_caqi')
+    assert list(categories) == ["High", "Very High"]
+    assert list(colors) == ["#F29305", "#E8416F"]
+
+
+def test_rescore_switches_standards():
+    frame = pd.DataFrame({'pm25': [20.0], 'pm10': [30.0], 'no2': [10.0], 'o3': [20.0], 'aqi': [0]})
+
+    assert rescore(frame, 'us_epa')['aqi'].iloc[0] == calculate_aqi(20.0, 30.0, 10.0, 20.0, 'us_epa')
+    assert rescore(frame, 'in_naqi')['aqi'].iloc[0] == calculate_aqi(20.0, 30.0, 10.0, 20.0, 'in_naqi')
+    assert rescore(frame, 'eu_caqi')['aqi_category'].iloc[0] == "Low"
@@ -0,0 +1,21 @@
+import pytest
+
+from air_quality.benchmark import measure_app_imports, measure_imports
+
+
+def test_measure_imports():
+    timings = measure_imports(['json', 'air_quality.aqi'], repeat=1)
+
+    assert list(timings) == ['json', 'air_quality.aqi']
+    assert all(seconds >= 0 for seconds in timings.values())
+
+
+def test_only_the_apps_imports_are_timed(tmp_path):
+    (tmp_path / 'app.py').write_text("import json\nraise SystemExit('the script itself never runs')\n")
+
+    assert measure_app_imports(repeat=1, cwd=str(tmp_path)) >= 0
+
+
+def test_failures_are_reported(tmp_path):
+    with pytest.raises(RuntimeError, match='ModuleNotFoundError'):
+        measure_imports(['no_such_module'], repeat=1, cwd=str(tmp_path))
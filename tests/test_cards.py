@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+from air_quality.cards import NO_DATA_COLOR, render_cards, theme_css, weather_emoji
+
+
+def cards(**overrides):
+    frame = pd.DataFrame({
+        'location': ['Paris', '<Lyon & Co>'],
+        'date': pd.to_datetime(['2024-06-01 14:05', '2024-06-01 15:30']),
+        'aqi': [42.0, 151.0],
+        'temp_c': [21.26, np.nan],
+        'humidity': [55.0, 60.0],
+        'wind_speed': [3.0, 1.5],
+        'weather': ['☀️ Sunny', None]
+    })
+    return frame.assign(**overrides)
+
+
+def test_renders_one_card_per_row_in_one_grid():
+    html = render_cards(cards())
+
+    assert html.count("class='aqi-card'") == 2
+    assert html.startswith("<div class='aqi-grid'")
+    assert 'repeat(2, minmax(0, 1fr))' in html
+    assert 'repeat(4,' in render_cards(pd.concat([cards()] * 3, ignore_index=True))
+
+
+def test_fields_are_formatted_and_escaped():
+    html = render_cards(cards())
+
+    assert "<div class='aqi-value'>42</div>" in html
+    assert "&lt;Lyon &amp; Co&gt;" in html and '<Lyon' not in html
+    assert '21.3°C' in html
+    assert '--°C' in html  # Missing temperature
+    assert 'Jun 01, 02:05 PM' in html
+
+
+def test_categories_follow_the_standard():
+    html = render_cards(cards())
+
+    assert 'Good' in html and '#00E400' in html
+    assert 'Unhealthy' in html and '#FF0000' in html
+    assert 'Very High' in render_cards(cards(), 'eu_caqi')
+
+
+def test_missing_aqi_has_no_category():
+    html = render_cards(cards(aqi=[np.nan, 10.0]))
+
+    assert 'No data' in html
+    assert NO_DATA_COLOR in html
+    assert "<div class='aqi-value'>--</div>" in html
+
+
+def test_empty_frame_renders_nothing():
+    assert render_cards(cards().iloc[0:0]) == ""
+
+
+def test_theme_css():
+    css = theme_css({'card_bg': '#fff', 'text': '#333'})
+
+    assert css == "<style>:root { --aq-card-bg: #fff; --aq-text: #333; }</style>"
+
+
+def test_weather_emoji():
+    assert weather_emoji(['🌧️ Rainy', 'Clear sky', 'Overcast clouds', None]).tolist() == ['🌧️', '☀️', '☁️', '🌡️']
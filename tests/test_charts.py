@@ -0,0 +1,66 @@
+import subprocess
+import sys
+
+import pytest
+
+from air_quality.aqi import get_standard
+from air_quality.charts import aqi_heatmap, aqi_map, trend_figure, weather_scatter
+from air_quality.pipeline import load_sample, prepare
+from air_quality.rollups import Rollups
+
+LOCATIONS = ['London, UK', 'Tokyo, Japan']
+
+
+@pytest.fixture(scope='module')
+def prepared():
+    return prepare(load_sample(LOCATIONS, span='30D', freq='h'), rollups=Rollups())
+
+
+def test_plotly_is_imported_on_first_use():
+    code = "import sys, air_quality.charts; print('plotly' in sys.modules)"
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == 'False'
+
+
+def test_trend_series_are_downsampled(prepared):
+    _, rollups = prepared
+    hourly = rollups.view('hourly')
+
+    fig = trend_figure(hourly, 'pm25', compare_metrics=['temp_c', 'humidity'], max_points=200)
+
+    assert [trace.name for trace in fig.data] == [
+        'London, UK - PM25', 'Tokyo, Japan - PM25', 'TEMP_C (right axis)', 'HUMIDITY'
+    ]
+    assert all(len(trace.x) == 200 for trace in fig.data)
+    assert {trace.yaxis for trace in fig.data[2:]} == {'y2'}
+    assert fig.data[0].type == 'scatter'
+
+
+def test_heavy_trends_use_webgl(prepared):
+    _, rollups = prepared
+
+    fig = trend_figure(rollups.view('hourly'), 'aqi', max_points=10_000, webgl_threshold=1000)
+
+    assert {trace.type for trace in fig.data} == {'scattergl'}
+    assert len(fig.data[0].x) == 30 * 24
+
+
+def test_heatmap_annotates_the_standard(prepared):
+    _, rollups = prepared
+
+    fig = aqi_heatmap(rollups.view('weekly'), 'eu_caqi')
+
+    assert len(fig.layout.annotations) == len(get_standard('eu_caqi').colors)
+    assert list(fig.data[0].y) == LOCATIONS
+
+
+def test_scatter_and_map(prepared):
+    observations, rollups = prepared
+
+    scatter = weather_scatter(rollups.view('daily'))
+    stations = observations.first_rows(LOCATIONS)
+    station_map = aqi_map(stations, zoom=2)
+
+    assert {trace.name for trace in scatter.data} == set(LOCATIONS)
+    assert sum(len(trace.lat) for trace in station_map.data) == 2
@@ -0,0 +1,107 @@
+import json
+import time
+
+import pandas as pd
+import pytest
+import requests
+
+from air_quality import cli
+from air_quality.cli import RateLimiter, build_report, main, read_locations, write_report
+
+NOW = int(time.time())
+
+
+def test_read_text_locations(tmp_path):
+    path = tmp_path / 'cities.txt'
+    path.write_text("# Cities\nParis, FR\n\n48.85, 2.35\n-33.87;151.21\n", encoding='utf-8')
+
+    assert read_locations(str(path)) == {
+        'Paris, FR': None,
+        '48.85, 2.35': (48.85, 2.35),
+        '-33.87;151.21': (-33.87, 151.21)
+    }
+
+
+def test_read_csv_locations(tmp_path):
+    path = tmp_path / 'cities.csv'
+    path.write_text("name,lat,lng\nParis,,\nLyon,45.76,4.84\n,51.5,-0.12\n,,\n", encoding='utf-8')
+
+    assert read_locations(str(path)) == {'Paris': None, 'Lyon': (45.76, 4.84), '51.5000, -0.1200': (51.5, -0.12)}
+
+
+def test_sample_report_has_a_row_per_location():
+    report = build_report({'London, UK': None, 'Somewhere': (10.0, 20.0)})
+
+    assert report['location'].tolist() == ['London, UK', 'Somewhere']
+    assert (report['status'] == 'ok').all()
+    assert report['aqi'].notna().all()
+
+
+def test_coordinate_only_locations_are_labelled_with_the_nearest_place():
+    report = build_report({'Paris, FR': None, '48.85, 2.35': (48.85, 2.35), 'Louvre': (48.86, 2.34)})
+
+    assert report['nearest_place'].tolist() == [None, 'Paris, France', None]
+    assert report['nearest_km'].iloc[1] < 5
+    assert report['nearest_km'].isna().tolist() == [True, False, True]
+
+
+def test_failed_locations_are_reported_in_order(monkeypatch):
+    def fetch_air_quality(lat, lon, api_key):
+        if lat < 0:
+            raise requests.HTTPError('502 Server Error')
+        return {'list': [{'dt': NOW, 'main': {'aqi': 2}, 'components': {'pm2_5': 12.0, 'pm10': 20.0}}]}
+
+    def fetch_weather(lat, lon, api_key):
+        return {'main': {'temp': 18.0, 'humidity': 60}, 'wind': {'speed': 3.0}, 'weather': [{'main': 'Clear'}]}
+
+    monkeypatch.setattr(cli, 'fetch_air_quality', fetch_air_quality)
+    monkeypatch.setattr(cli, 'fetch_weather', fetch_weather)
+    progress = []
+
+    report = build_report({'South': (-10.0, 5.0), 'North': (45.123, 5.0)}, api_key='key', progress=lambda *p: progress.append(p))
+
+    assert report['location'].tolist() == ['South', 'North']
+    assert report['status'].tolist() == ['error', 'ok']
+    assert '502 Server Error' in report['error'].iloc[0]
+    # The requested point, not the payload's
+    assert report['latitude'].iloc[1] == 45.123
+    assert progress[-1] == (2, 2)
+
+
+def test_write_report_formats(tmp_path):
+    report = build_report({'London, UK': None})
+
+    write_report(report, str(tmp_path / 'report.csv'))
+    write_report(report, str(tmp_path / 'report.parquet'))
+    write_report(report, str(tmp_path / 'report.json'))
+
+    assert pd.read_csv(tmp_path / 'report.csv')['location'].tolist() == ['London, UK']
+    assert pd.read_parquet(tmp_path / 'report.parquet')['status'].tolist() == ['ok']
+    assert json.loads((tmp_path / 'report.json').read_text())[0]['location'] == 'London, UK'
+    with pytest.raises(ValueError, match='Unknown report format'):
+        write_report(report, str(tmp_path / 'report.xlsx'))
+    with pytest.raises(ValueError, match='stdout'):
+        write_report(report, '-', 'parquet')
+
+
+def test_rate_limiter_spaces_calls():
+    limiter = RateLimiter(50)
+    calls = []
+    limited = limiter.wrap(lambda: calls.append(time.monotonic()))
+
+    for _ in range(6):
+        limited()
+
+    assert calls[-1] - calls[0] >= 5 / 50 * 0.9
+    RateLimiter(None).wait()  # Unlimited never sleeps
+
+
+def test_report_command(tmp_path, capsys):
+    source = tmp_path / 'cities.txt'
+    source.write_text("London, UK\nTokyo, Japan\n", encoding='utf-8')
+    output = tmp_path / 'report.csv'
+
+    assert main(['report', str(source), '-o', str(output), '--sample', '--quiet']) == 0
+
+    assert len(pd.read_csv(output)) == 2
+    assert 'Reported 2 locations (0 failed)' in capsys.readouterr().err
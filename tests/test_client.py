@@ -0,0 +1,147 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from air_quality.client import HttpClient
+from air_quality.metrics import UPSTREAM_LATENCY, UPSTREAM_REQUESTS
+from air_quality.tracing import start_trace
+
+
+class Upstream(ThreadingHTTPServer):
+    """Answers each GET with the next scripted status, then 200, after `delay` seconds."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), UpstreamHandler)
+        self.statuses = []
+        self.paths = []
+        self.delay = 0
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def handle_error(self, request, client_address):
+        pass  # Clients that timed out hang up before the answer
+
+
+class UpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.paths.append(self.path)
+        time.sleep(self.server.delay)
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        body = b'{"ok": true}'
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if status == 429:
+            self.send_header('Retry-After', '0')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def upstream():
+    server = Upstream()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client():
+    client = HttpClient(max_retries=2, backoff_factor=0)
+    client.session.trust_env = False  # Talk to the local server directly, whatever the proxy settings
+    yield client
+    client.session.close()
+
+
+def test_retries_retryable_statuses(upstream, client):
+    upstream.statuses = [503, 429]
+
+    response = client.get(upstream.url + '/data', params={'appid': 'secret'})
+
+    assert response.status_code == 200
+    assert response.json() == {'ok': True}
+    assert len(upstream.paths) == 3
+    assert client.stats()['retries'] == 2
+
+
+def test_returns_last_response_once_retries_run_out(upstream, client):
+    upstream.statuses = [503, 503, 503, 503]
+
+    response = client.get(upstream.url + '/data')
+
+    assert response.status_code == 503
+    assert len(upstream.paths) == 3
+
+
+def test_other_errors_are_not_retried(upstream, client):
+    upstream.statuses = [404]
+
+    assert client.get(upstream.url + '/data').status_code == 404
+    assert len(upstream.paths) == 1
+
+
+def test_connections_are_kept_alive(upstream, client):
+    for _ in range(5):
+        client.get(upstream.url + '/data')
+
+    stats = client.stats()
+    assert stats['requests'] == 5
+    assert stats['connections'] == 1
+    assert stats['reused'] == 4
+
+
+def test_attempts_are_counted_by_path_without_the_query(upstream, client):
+    before = UPSTREAM_REQUESTS.value(endpoint='/counted', status=503)
+    upstream.statuses = [503]
+
+    client.get(upstream.url + '/counted', params={'appid': 'secret'})
+
+    assert UPSTREAM_REQUESTS.value(endpoint='/counted', status=503) == before + 1
+    assert UPSTREAM_REQUESTS.value(endpoint='/counted', status=200) >= 1
+
+
+def test_connection_errors_are_retried_then_raised(client):
+    server = Upstream()
+    url = server.url
+    server.server_close()  # Nothing listens on the port any more
+
+    with pytest.raises(requests.ConnectionError):
+        client.get(url + '/data')
+    assert client.stats()['retries'] == 2
+
+
+def test_read_timeouts_are_counted_and_not_retried(upstream, client):
+    upstream.delay = 0.5
+    before = UPSTREAM_REQUESTS.value(endpoint='/slow', status='timeout')
+    trace = start_trace('timeout')
+
+    with pytest.raises(requests.Timeout):
+        client.get(upstream.url + '/slow', timeout=(1, 0.05))
+    trace.finish()
+
+    assert UPSTREAM_REQUESTS.value(endpoint='/slow', status='timeout') == before + 1
+    assert ('aq_upstream_request_duration_seconds_count', {'endpoint': '/slow'}, 1) in UPSTREAM_LATENCY.samples()
+    assert len(upstream.paths) == 1
+    assert trace.spans[0].attrs == {'path': '/slow', 'status': 'timeout', 'attempts': 1, 'error': 'ReadTimeout'}
+
+
+def test_other_request_errors_are_counted(client):
+    before = UPSTREAM_REQUESTS.value(endpoint='/bad', status='error')
+
+    with pytest.raises(requests.RequestException):
+        client.get('ftp://example.com/bad')
+
+    assert UPSTREAM_REQUESTS.value(endpoint='/bad', status='error') == before + 1
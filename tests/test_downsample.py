@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from air_quality.downsample import downsample, lttb_indices
+
+
+def reference_lttb(x, y, n_out):
+    """Straightforward per-point LTTB, as in Steinarsson's reference implementation."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return list(range(n))
+
+    def edge(i):
+        # floor(i * every) + 1, with every = (n - 2) / (n_out - 2), computed exactly
+        return i * (n - 2) // (n_out - 2) + 1
+
+    kept, a = [0], 0
+    for i in range(n_out - 2):
+        next_lo, next_hi = edge(i + 1), min(edge(i + 2), n)
+        avg_x = sum(x[next_lo:next_hi]) / (next_hi - next_lo)
+        avg_y = sum(y[next_lo:next_hi]) / (next_hi - next_lo)
+
+        best, best_area = None, -1.0
+        for j in range(edge(i), edge(i + 1)):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        kept.append(best)
+        a = best
+    kept.append(n - 1)
+    return kept
+
+
+@pytest.mark.parametrize('n, n_out', [(1000, 100), (1001, 37), (50, 3), (500, 499)])
+def test_matches_the_reference_implementation(n, n_out):
+    rng = np.random.default_rng(n)
+    x = np.sort(rng.uniform(0, 1000, n))
+    y = np.cumsum(rng.normal(0, 1, n))
+
+    assert lttb_indices(x, y, n_out).tolist() == reference_lttb(x.tolist(), y.tolist(), n_out)
+
+
+def test_keeps_endpoints_and_extremes():
+    x = np.arange(10_000)
+    y = np.sin(x / 500)
+    y[4321] = 50  # A lone spike
+
+    kept = lttb_indices(x, y, 200)
+
+    assert len(kept) == 200
+    assert kept[0] == 0 and kept[-1] == len(x) - 1
+    assert np.all(np.diff(kept) > 0)
+    assert 4321 in kept
+
+
+def test_short_series_are_kept_whole():
+    assert lttb_indices(np.arange(5), np.arange(5), 10).tolist() == [0, 1, 2, 3, 4]
+    assert lttb_indices(np.arange(5), np.arange(5), 2).tolist() == [0, 1, 2, 3, 4]
+
+
+def test_downsample_datetimes_and_nans():
+    dates = pd.date_range('2024-01-01', periods=5000, freq='h')
+    values = pd.Series(np.random.default_rng(0).normal(size=5000))
+    values[::10] = np.nan
+
+    x, y = downsample(dates, values, 500)
+
+    assert len(x) == len(y) == 500
+    assert x.dtype.kind == 'M'
+    assert not np.isnan(y).any()
+    assert x[0] == dates[1] and x[-1] == dates[-1]
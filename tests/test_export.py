@@ -0,0 +1,82 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from air_quality.export import FORMATS, export_bytes, export_file_name, export_mime, iter_export, write_export
+
+
+def observations(n=25):
+    rng = np.random.default_rng(0)
+    aqi = pd.array(rng.integers(0, 300, n), dtype='UInt16')
+    aqi[3] = pd.NA
+    return pd.DataFrame({
+        'location': pd.Categorical(rng.choice(['Paris', 'Lyon'], n)),
+        'date': pd.date_range('2024-06-01', periods=n, freq='h'),
+        'pm25': rng.uniform(0, 100, n),
+        'aqi': aqi,
+        'weather': ['☀️ Sunny'] * (n - 1) + [None],
+        # Text that only shows up after the first chunk
+        'note': [None] * (n - 1) + ['late']
+    })
+
+
+def read_back(data, fmt):
+    if fmt == 'csv':
+        return pd.read_csv(io.BytesIO(data))
+    if fmt == 'parquet':
+        return pq.read_table(io.BytesIO(data)).to_pandas()
+    return pa.ipc.open_file(io.BytesIO(data)).read_all().to_pandas()
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'arrow'])
+def test_binary_formats_round_trip(fmt):
+    frame = observations()
+
+    data = export_bytes(frame, fmt, chunk_rows=10)
+
+    pd.testing.assert_frame_equal(read_back(data, fmt), frame)
+
+
+def test_csv_round_trips_with_one_header():
+    frame = observations()
+
+    data = export_bytes(frame, 'csv', chunk_rows=10)
+
+    assert data.count(b'location,') == 1
+    back = read_back(data, 'csv')
+    assert back['location'].tolist() == frame['location'].tolist()
+    assert back['note'].iloc[-1] == 'late'
+    np.testing.assert_allclose(back['pm25'], frame['pm25'])
+    assert back['aqi'].isna().sum() == 1
+
+
+@pytest.mark.parametrize('fmt', list(FORMATS))
+def test_stream_matches_the_file(fmt):
+    frame = observations()
+
+    pieces = list(iter_export(frame, fmt, chunk_rows=10, read_size=64))
+
+    assert len(pieces) > 1
+    assert b''.join(pieces) == export_bytes(frame, fmt, chunk_rows=10)
+
+
+@pytest.mark.parametrize('fmt', list(FORMATS))
+def test_empty_frames_export(fmt):
+    frame = observations().iloc[0:0]
+
+    assert write_export(frame, fmt, io.BytesIO()) == 0
+    assert list(read_back(export_bytes(frame, fmt), fmt).columns) == list(frame.columns)
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError, match='Unknown export format'):
+        write_export(observations(), 'xlsx', io.BytesIO())
+
+
+def test_names_and_mime_types():
+    assert export_file_name('air_quality', 'parquet') == 'air_quality.parquet'
+    assert export_mime('arrow') == 'application/vnd.apache.arrow.file'
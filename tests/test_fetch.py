@@ -0,0 +1,78 @@
+import threading
+import time
+
+from air_quality.fetch import fetch_locations
+
+COORDS = {'Paris': (48.85, 2.35), 'Lyon': (45.76, 4.84), 'Nice': (43.70, 7.27)}
+
+
+def test_fetches_every_endpoint_for_every_location():
+    endpoints = {
+        'air': lambda lat, lon: ('air', lat, lon),
+        'weather': lambda lat, lon: ('weather', lat, lon)
+    }
+    results = {r.location: r for r in fetch_locations(COORDS, COORDS.get, endpoints)}
+
+    assert set(results) == set(COORDS)
+    for location, result in results.items():
+        assert result.ok
+        assert result.coords == COORDS[location]
+        assert result.data == {
+            'air': ('air', *COORDS[location]),
+            'weather': ('weather', *COORDS[location])
+        }
+
+
+def test_duplicate_locations_are_fetched_once():
+    calls = []
+    endpoints = {'air': lambda lat, lon: calls.append((lat, lon))}
+
+    results = list(fetch_locations(['Paris', 'Paris', 'Lyon'], COORDS.get, endpoints))
+
+    assert [r.location for r in results].count('Paris') == 1
+    assert len(calls) == 2
+
+
+def test_failures_are_recorded_per_location():
+    def air(lat, lon):
+        if (lat, lon) == COORDS['Lyon']:
+            raise RuntimeError('upstream down')
+        return 'ok'
+
+    results = {r.location: r for r in fetch_locations(['Paris', 'Lyon', 'Atlantis'], COORDS.get, {'air': air})}
+
+    assert results['Paris'].ok and results['Paris'].data == {'air': 'ok'}
+    assert not results['Lyon'].ok
+    assert results['Lyon'].errors == {'air': 'upstream down'}
+    assert results['Lyon'].data == {'air': None}
+    # Unknown locations yield a result without coordinates or endpoint calls
+    assert results['Atlantis'].coords is None
+    assert results['Atlantis'].data == {}
+
+
+def test_endpoints_can_depend_on_the_location():
+    def endpoints(location):
+        return {'name': lambda lat, lon: location}
+
+    results = {r.location: r for r in fetch_locations(COORDS, COORDS.get, endpoints)}
+
+    assert {location: r.data['name'] for location, r in results.items()} == {c: c for c in COORDS}
+
+
+def test_calls_run_concurrently():
+    barrier = threading.Barrier(len(COORDS), timeout=5)
+
+    def air(lat, lon):
+        # Only passes once every location's call is in flight at the same time
+        barrier.wait()
+        return 'ok'
+
+    started = time.perf_counter()
+    results = list(fetch_locations(COORDS, COORDS.get, {'air': air}, max_workers=len(COORDS)))
+
+    assert all(r.ok for r in results)
+    assert time.perf_counter() - started < 5
+
+
+def test_no_locations_yields_nothing():
+    assert list(fetch_locations([], COORDS.get, {})) == []
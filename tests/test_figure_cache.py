@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from air_quality.figure_cache import FigureCache, figure_size, fingerprint
+
+
+def figure(n):
+    return go.Figure(go.Scatter(x=np.arange(n, dtype=np.float64), y=np.arange(n, dtype=np.float64)))
+
+
+def test_fingerprint_depends_on_content_only():
+    frame = pd.DataFrame({'a': [1.0, 2.0], 'b': ['x', 'y']})
+
+    assert fingerprint(frame) == fingerprint(frame.copy())
+    assert fingerprint(frame) != fingerprint(frame.assign(a=[1.0, 3.0]))
+    assert fingerprint(frame) != fingerprint(frame.rename(columns={'b': 'c'}))
+    assert fingerprint(frame) != fingerprint(frame, frame)
+
+
+def test_figure_size_tracks_the_data():
+    small, large = figure_size(figure(100)), figure_size(figure(10_000))
+
+    assert large >= 10_000 * 8 * 2  # Both float64 arrays
+    assert small < large / 20
+    # Within a small factor of the serialized size, without serializing
+    assert large / 4 < len(figure(10_000).to_json(validate=False)) < large * 4
+
+
+def test_get_or_build_builds_once():
+    cache = FigureCache()
+    builds = []
+
+    def build():
+        builds.append(1)
+        return figure(10)
+
+    first = cache.get_or_build(('chart', 'abc'), build)
+    second = cache.get_or_build(('chart', 'abc'), build)
+
+    assert first is second
+    assert len(builds) == 1
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_least_recently_used_are_evicted_under_the_memory_cap():
+    size = figure_size(figure(1000))
+    cache = FigureCache(max_bytes=int(size * 2.5))
+
+    cache.put('a', figure(1000))
+    cache.put('b', figure(1000))
+    cache.get('a')
+    cache.put('c', figure(1000))
+
+    assert cache.get('a') is not None
+    assert cache.get('b') is None
+    assert cache.get('c') is not None
+    assert cache.stats()['bytes'] <= cache.max_bytes
+
+
+def test_entry_cap_and_oversized_figures():
+    cache = FigureCache(max_bytes=figure_size(figure(100)) * 10, max_entries=2)
+
+    for key in 'abc':
+        cache.put(key, figure(10))
+    cache.put('huge', figure(10_000))
+
+    assert len(cache) == 2
+    assert cache.get('huge') is None
@@ -0,0 +1,65 @@
+import math
+
+import numpy as np
+import pytest
+
+from air_quality.gazetteer import EARTH_RADIUS_KM, Gazetteer, get_gazetteer
+
+
+@pytest.fixture
+def gazetteer():
+    return Gazetteer(
+        names=['Paris', 'Paris', 'Parma', 'London', 'São Paulo'],
+        countries=['France', 'United States', 'Italy', 'United Kingdom', 'Brazil'],
+        country_codes=['FR', 'US', 'IT', 'GB', 'BR'],
+        latitudes=[48.8566, 33.6609, 44.8015, 51.5072, -23.5505],
+        longitudes=[2.3522, -95.5555, 10.3279, -0.1276, -46.6333]
+    )
+
+
+def test_forward_lookup(gazetteer):
+    assert gazetteer.forward('Paris') == (48.8566, 2.3522)  # The first listed place wins
+    assert gazetteer.forward('paris, united states') == (33.6609, -95.5555)
+    assert gazetteer.forward('Paris, US') == (33.6609, -95.5555)
+    assert gazetteer.forward('London, UK') == (51.5072, -0.1276)
+    assert gazetteer.forward('sao paulo') == (-23.5505, -46.6333)
+    assert gazetteer.forward('Atlantis') is None
+
+
+def test_complete(gazetteer):
+    assert gazetteer.complete('par') == ['Paris, France', 'Paris, United States', 'Parma, Italy']
+    assert gazetteer.complete('PAR', limit=1) == ['Paris, France']
+    assert gazetteer.complete('  ') == []
+    assert gazetteer.complete('zz') == []
+
+
+def test_bundled_cities_load():
+    gazetteer = get_gazetteer()
+
+    assert len(gazetteer) > 100
+    assert gazetteer.forward('Tokyo') is not None
+
+
+def test_nearest(gazetteer):
+    place, distance = gazetteer.nearest(48.86, 2.35)
+    assert place == 'Paris, France' and distance < 1
+    assert gazetteer.nearest(44.0, 10.0)[0] == 'Parma, Italy'
+    assert gazetteer.nearest(-20.0, -40.0)[0] == 'São Paulo, Brazil'
+    assert Gazetteer([], [], [], [], []).nearest(0.0, 0.0) is None
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def test_nearest_matches_a_linear_scan():
+    gazetteer = get_gazetteer()
+    rng = np.random.default_rng(0)
+
+    for lat, lon in zip(rng.uniform(-90, 90, 200), rng.uniform(-180, 180, 200)):
+        distances = haversine_km(lat, lon, gazetteer.latitudes, gazetteer.longitudes)
+        place, distance = gazetteer.nearest(lat, lon)
+        assert math.isclose(distance, distances.min(), abs_tol=1e-6)
+        assert place == gazetteer.display_name(int(distances.argmin()))
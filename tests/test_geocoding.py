@@ -0,0 +1,110 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from air_quality import geocoding
+from air_quality.geocoding import GeocodeCache, geocode, lookup, normalize, prewarm_from_csv
+
+UNKNOWN = 'Zzyzx Springs Outpost'  # Not in the offline gazetteer
+
+
+class Geocoder:
+    """Stands in for the rate-limited Nominatim client."""
+
+    def __init__(self, answers):
+        self.answers = answers  # query -> coordinates, None, or an exception to raise
+        self.queries = []
+
+    def __call__(self, query, **kwargs):
+        self.queries.append(query)
+        answer = self.answers.get(query)
+        if isinstance(answer, Exception):
+            raise answer
+        return SimpleNamespace(latitude=answer[0], longitude=answer[1]) if answer else None
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return GeocodeCache(str(tmp_path / 'geocode.sqlite'))
+
+
+@pytest.fixture
+def nominatim(monkeypatch):
+    geocoder = Geocoder({})
+    monkeypatch.setattr(geocoding, 'get_geocoder', lambda: geocoder)
+    # Lookups must use the cache they are given, even an empty one
+    monkeypatch.setattr(geocoding, 'get_geocode_cache', lambda: pytest.fail("used the shared cache"))
+    return geocoder
+
+
+def test_normalize():
+    assert normalize('  São   PAULO ') == 'sao paulo'
+
+
+def test_cache_persists_and_expires(cache, tmp_path):
+    cache.put('Paris', (48.85, 2.35))
+    cache.put('Nowhere', None, ttl=0.01)
+    time.sleep(0.02)
+
+    reopened = GeocodeCache(str(tmp_path / 'geocode.sqlite'))
+    assert reopened.get('paris') == (True, (48.85, 2.35))
+    assert reopened.get('Nowhere') == (False, None)
+
+
+def test_known_places_are_answered_offline(cache, nominatim):
+    assert lookup('Paris', cache=cache) is not None
+    assert nominatim.queries == []
+
+
+def test_lookup_caches_results_in_an_empty_cache(cache, nominatim):
+    nominatim.answers[UNKNOWN] = (10.0, 20.0)
+
+    assert lookup(UNKNOWN, cache=cache) == (10.0, 20.0)
+    assert lookup(UNKNOWN, cache=cache) == (10.0, 20.0)
+    assert nominatim.queries == [UNKNOWN]
+    assert cache.get(UNKNOWN) == (True, (10.0, 20.0))
+
+
+def test_not_found_is_cached(cache, nominatim):
+    assert lookup(UNKNOWN, cache=cache) is None
+    assert cache.get(UNKNOWN) == (True, None)
+
+
+def test_errors_are_raised_and_not_cached(cache, nominatim):
+    nominatim.answers = {query: TimeoutError('timed out') for query in (UNKNOWN, f"{UNKNOWN}, {UNKNOWN}",
+                                                                         f"city of {UNKNOWN}", f"{UNKNOWN}, country")}
+
+    with pytest.raises(TimeoutError):
+        lookup(UNKNOWN, retry=1, cache=cache)
+    assert cache.get(UNKNOWN) == (False, None)
+    assert len(cache) == 0
+
+
+def test_a_variant_that_errored_is_retried_before_giving_up(nominatim):
+    nominatim.answers = {'Atlantis': ConnectionError('reset')}
+
+    with pytest.raises(ConnectionError):
+        geocode('Atlantis', retry=2)
+    # The variants Nominatim answered aren't asked again; the failing one is
+    assert nominatim.queries.count('Atlantis') == 3
+    assert nominatim.queries.count('city of Atlantis') == 1
+
+
+def test_rate_limiter_raises_errors():
+    from geopy.extra.rate_limiter import RateLimiter
+
+    geocoder = geocoding.get_geocoder()
+    assert isinstance(geocoder, RateLimiter)
+    assert geocoder.swallow_exceptions is False
+
+
+def test_prewarm_from_csv(cache, nominatim, tmp_path):
+    nominatim.answers[UNKNOWN] = (10.0, 20.0)
+    path = tmp_path / 'places.csv'
+    path.write_text(f"name\nParis\n{UNKNOWN}\n{UNKNOWN}\nAtlantis\n", encoding='utf-8')
+    cache.put('Paris', (48.85, 2.35))
+
+    counts = prewarm_from_csv(str(path), cache=cache)
+
+    assert counts == {'cached': 1, 'found': 1, 'not_found': 1, 'failed': 0}
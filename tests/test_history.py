@@ -0,0 +1,101 @@
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from air_quality import history
+from air_quality.history import fetch_history, parse_history, to_local_datetime, to_unix_seconds
+from air_quality.metrics import COALESCED_CALLS
+
+
+def item(dt, aqi=2, **components):
+    return {'dt': dt, 'main': {'aqi': aqi}, 'components': components}
+
+
+def test_parse_history_converts_units_and_sorts():
+    payload = {'list': [
+        item(1700003600, aqi=3, pm2_5=12.0, pm10=20.0, no2=18.8, o3=60.0),
+        item(1700000000, aqi=1, pm2_5=4.0)
+    ]}
+
+    frame = parse_history(payload, 'Paris', 48.85, 2.35)
+
+    assert list(to_unix_seconds(frame['date'])) == [1700000000, 1700003600]
+    assert (frame['location'] == 'Paris').all()
+    assert frame['latitude'].iloc[0] == 48.85
+    assert list(frame['pm25']) == [4.0, 12.0]
+    assert frame['no2'].iloc[1] == np.float32(10.0)  # µg/m³ to ppb
+    assert frame['o3'].iloc[1] == np.float32(30.0)
+    # Components missing from a reading count as zero
+    assert frame['pm10'].iloc[0] == 0
+    assert frame['temp_c'].isna().all()
+    assert list(frame['aqi']) == [1, 3]
+    assert frame.index.name == 'timestamp'
+
+
+def test_parse_history_of_an_empty_payload():
+    for payload in (None, {}, {'list': []}):
+        frame = parse_history(payload, 'Paris', 48.85, 2.35)
+        assert frame.empty
+        assert 'aqi' in frame
+
+
+def test_local_datetimes_round_trip():
+    stamps = np.array([0, 1700000000, 1800000000], dtype=np.int64)
+
+    assert list(to_unix_seconds(to_local_datetime(stamps))) == list(stamps)
+    assert to_local_datetime(stamps)[1] == pd.Timestamp.fromtimestamp(1700000000)
+
+
+@pytest.mark.parametrize('zone', ['Europe/London', 'America/Sao_Paulo', 'Australia/Sydney'])
+def test_local_datetimes_follow_daylight_saving(zone, monkeypatch):
+    monkeypatch.setenv('TZ', zone)
+    time.tzset()
+    try:
+        # Hourly across a year, so both clock changes are crossed
+        stamps = np.arange(1700000000, 1700000000 + 366 * 86400, 3600, dtype=np.int64)
+        dates = to_local_datetime(stamps)
+
+        assert list(dates) == [datetime.fromtimestamp(stamp) for stamp in stamps]
+        assert list(to_unix_seconds(dates)) == [int(date.timestamp()) for date in dates.to_pydatetime()]
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+
+def test_fetch_history_requests_one_range(monkeypatch):
+    requests = []
+    monkeypatch.setattr(history, '_request_json', lambda params: requests.append(params) or {'list': []})
+
+    fetch_history(1.0, 2.0, 'key', days=3, end=1700000000)
+
+    assert requests == [{'lat': 1.0, 'lon': 2.0, 'start': 1700000000 - 3 * 86400, 'end': 1700000000, 'appid': 'key'}]
+
+
+def test_concurrent_identical_fetches_share_one_request(monkeypatch):
+    release = threading.Event()
+    requests = []
+
+    def request(params):
+        requests.append(params)
+        release.wait(5)
+        return {'list': []}
+
+    monkeypatch.setattr(history, '_request_json', request)
+    coalesced = COALESCED_CALLS.value(group='history')
+    threads = [threading.Thread(target=fetch_history, args=(1.0, 2.0, 'key'), kwargs={'start': 0, 'end': 3600})
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    # Let the first call finish only once the other three are waiting on it
+    deadline = time.monotonic() + 5
+    while COALESCED_CALLS.value(group='history') < coalesced + 3 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(requests) == 1
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+from air_quality.mapbins import MAX_ZOOM, bin_stations, fit_zoom, map_center
+
+
+def stations(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'location': [f"Station {i}" for i in range(n)],
+        'latitude': rng.uniform(40, 55, n),
+        'longitude': rng.uniform(-5, 20, n),
+        'aqi': rng.uniform(0, 300, n),
+        'pm25': rng.uniform(0, 100, n),
+        'weather': '☀️'
+    })
+
+
+def test_every_station_lands_in_one_cell():
+    frame = stations(2000)
+
+    bins = bin_stations(frame, zoom=4, metrics=['aqi', 'pm25'])
+
+    assert bins['stations'].sum() == len(frame)
+    assert bins['aqi_max'].max() == frame['aqi'].max()
+    # Cell means weighted by station count add back up to the overall mean
+    np.testing.assert_allclose((bins['pm25'] * bins['stations']).sum() / len(frame), frame['pm25'].mean())
+
+
+def test_grid_is_coarsened_to_the_feature_budget():
+    frame = stations(5000)
+
+    bins = bin_stations(frame, zoom=MAX_ZOOM, max_features=50)
+
+    assert len(bins) <= 50
+    assert bins['zoom'].iloc[0] < MAX_ZOOM
+
+
+def test_cells_carry_their_worst_station():
+    frame = pd.DataFrame({
+        'location': ['Calm', 'Smoggy', 'Elsewhere'],
+        'latitude': [48.8566, 48.8570, -33.87],
+        'longitude': [2.3522, 2.3530, 151.21],
+        'aqi': [20.0, 180.0, np.nan],
+        'weather': ['☀️', '🌧️', '☁️']
+    })
+
+    bins = bin_stations(frame, zoom=3).set_index('label')
+
+    paris = bins.loc['2 stations (worst: Smoggy)']
+    assert paris['stations'] == 2
+    assert paris['aqi'] == 100.0
+    assert paris['aqi_max'] == 180.0
+    assert paris['weather'] == '🌧️'
+    # A station without an AQI still gets its own cell
+    assert bins.loc['Elsewhere', 'stations'] == 1
+    assert np.isnan(bins.loc['Elsewhere', 'aqi'])
+
+
+def test_stations_without_coordinates_are_skipped():
+    frame = stations(3)
+    frame.loc[1, 'latitude'] = np.nan
+
+    assert bin_stations(frame, zoom=MAX_ZOOM)['stations'].sum() == 2
+
+
+def test_fit_zoom():
+    assert fit_zoom([48.85, 48.86], [2.35, 2.36]) > fit_zoom([40.0, 55.0], [-5.0, 20.0])
+    assert fit_zoom([48.85], [2.35]) == MAX_ZOOM
+    assert fit_zoom([np.nan], [np.nan]) == 0
+
+
+def test_map_center():
+    assert map_center([40.0, 50.0], [0.0, 10.0]) == {'lat': 45.0, 'lon': 5.0}
+    assert map_center([], []) == {'lat': 0.0, 'lon': 0.0}
@@ -0,0 +1,63 @@
+import functools
+
+import requests
+
+from air_quality.metrics import CACHE_EVICTIONS, CACHE_REQUESTS, Registry, count_cache, serve_metrics
+
+
+def test_render_counters_and_histograms():
+    registry = Registry()
+    calls = registry.counter('calls_total', "Calls by path.", ('path',))
+    latency = registry.histogram('latency_seconds', "Latency.", buckets=(0.1, 1.0))
+
+    calls.inc(path='/a')
+    calls.inc(2, path='/b "quoted"')
+    latency.observe(0.05)
+    latency.observe(0.5)
+
+    assert calls.value(path='/b "quoted"') == 2
+    assert registry.render().splitlines() == [
+        '# HELP calls_total Calls by path.',
+        '# TYPE calls_total counter',
+        'calls_total{path="/a"} 1',
+        'calls_total{path="/b \\"quoted\\""} 2',
+        '# HELP latency_seconds Latency.',
+        '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{le="0.1"} 1',
+        'latency_seconds_bucket{le="1.0"} 2',
+        'latency_seconds_bucket{le="+Inf"} 2',
+        'latency_seconds_sum 0.55',
+        'latency_seconds_count 2',
+    ]
+
+
+def test_count_cache_tells_hits_misses_and_evictions():
+    name = 'test_count_cache'
+    lookup = count_cache(name, functools.lru_cache(maxsize=1))(lambda city, _key: city.upper())
+    before = {result: CACHE_REQUESTS.value(cache=name, result=result) for result in ('hit', 'miss')}
+
+    lookup('paris', 'k1')
+    lookup('paris', 'k2')  # Underscored arguments aren't part of the key, but lru_cache's key differs
+    lookup('paris', 'k2')
+    lookup('lyon', 'k1')   # Evicts paris
+    lookup('paris', 'k2')
+
+    assert CACHE_REQUESTS.value(cache=name, result='hit') == before['hit'] + 1
+    assert CACHE_REQUESTS.value(cache=name, result='miss') == before['miss'] + 4
+    assert CACHE_EVICTIONS.value(cache=name) == 2
+    assert hasattr(lookup, 'cache_clear')
+
+
+def test_serve_metrics():
+    server = serve_metrics(port=0)
+    session = requests.Session()
+    session.trust_env = False
+    try:
+        url = f'http://127.0.0.1:{server.server_port}'
+        response = session.get(url + '/metrics')
+        assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+        assert '# TYPE aq_upstream_requests_total counter' in response.text
+        assert session.get(url + '/other').status_code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
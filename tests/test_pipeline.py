@@ -0,0 +1,99 @@
+import time
+
+import pytest
+import requests
+
+from air_quality import pipeline
+from air_quality.pipeline import history_since, load_observations
+from air_quality.store import ObservationStore
+
+HOUR = 3600
+DAY = 24 * HOUR
+COORDS = {'Paris': (48.85, 2.35)}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ObservationStore(str(tmp_path / 'observations.sqlite'))
+    yield store
+    store.close()
+
+
+def current_fetchers(now):
+    return {
+        'air quality': lambda lat, lon, api_key: {
+            'coord': {'lat': lat, 'lon': lon},
+            'list': [{'dt': now, 'main': {'aqi': 2}, 'components': {'pm2_5': 10.0, 'pm10': 20.0}}]
+        },
+        'weather': lambda lat, lon, api_key: {
+            'main': {'temp': 18.0, 'humidity': 60},
+            'wind': {'speed': 3.0},
+            'weather': [{'main': 'Clear'}]
+        }
+    }
+
+
+def history_payload(start, end):
+    return {'list': [
+        {'dt': ts, 'main': {'aqi': 1}, 'components': {'pm2_5': 5.0}}
+        for ts in range(start - start % HOUR + HOUR, end, HOUR)
+    ]}
+
+
+class History:
+    """Stands in for fetch_history, recording the ranges asked for."""
+
+    def __init__(self):
+        self.ranges = []
+        self.fail = False
+
+    def __call__(self, lat, lon, api_key, start=None, end=None):
+        self.ranges.append((start, end))
+        if self.fail:
+            raise requests.HTTPError('503 Server Error')
+        return history_payload(start, end)
+
+
+def test_history_since():
+    now = 100 * DAY
+    assert history_since(None, now, days=7) == now - 7 * DAY
+    assert history_since(now - 2 * DAY, now, days=7) == now - 2 * DAY + 1
+    assert history_since(now - 30 * DAY, now, days=7) == now - 7 * DAY
+    # Less than an hour behind: nothing to fetch
+    assert history_since(now - 600, now, days=7) is None
+
+
+def test_only_the_gap_is_backfilled(store, monkeypatch):
+    history = History()
+    monkeypatch.setattr(pipeline, 'fetch_history', history)
+    now = int(time.time())
+
+    frame = load_observations(['Paris'], 'key', store, COORDS.get, fetchers=current_fetchers(now), history_days=2)
+    assert history.ranges[0][0] == now - 2 * DAY
+    assert len(frame) >= 2 * 24
+
+    # Right after a complete backfill there's no gap left
+    load_observations(['Paris'], 'key', store, COORDS.get, fetchers=current_fetchers(now), history_days=2)
+    assert len(history.ranges) == 1
+
+
+def test_failed_backfill_is_retried_in_full(store, monkeypatch):
+    history = History()
+    history.fail = True
+    monkeypatch.setattr(pipeline, 'fetch_history', history)
+    reports = []
+    now = int(time.time())
+
+    frame = load_observations(['Paris'], 'key', store, COORDS.get, fetchers=current_fetchers(now),
+                              history_days=2, report=lambda level, message: reports.append(level))
+
+    # The current reading is kept, but doesn't count as history
+    assert len(frame) == 1
+    assert 'error' in reports
+    assert store.watermarks(['Paris'], 'history') == {}
+
+    history.fail = False
+    frame = load_observations(['Paris'], 'key', store, COORDS.get, fetchers=current_fetchers(now), history_days=2)
+
+    assert history.ranges[-1][0] == now - 2 * DAY
+    assert len(frame) >= 2 * 24
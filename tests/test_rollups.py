@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from air_quality.rollups import METRICS, Rollups
+from air_quality.sample import generate_sample_data
+
+
+@pytest.fixture
+def observations():
+    return generate_sample_data(['Paris', 'Lyon'], span='10D', freq='h', end=pd.Timestamp('2024-06-12 17:00'),
+                                coordinates={'Paris': (48.85, 2.35), 'Lyon': (45.76, 4.84)})
+
+
+def expected_means(observations, freq):
+    periods = observations['date'].dt.to_period(freq).dt.start_time.rename('period')
+    return observations.groupby([observations['location'].astype(str), periods])[METRICS].mean()
+
+
+@pytest.mark.parametrize('grain, freq', [('hourly', 'h'), ('daily', 'D'), ('weekly', 'W')])
+def test_view_matches_a_full_aggregation(observations, grain, freq):
+    rollups = Rollups()
+    rollups.update(observations)
+
+    view = rollups.view(grain).set_index(['location', 'date'])
+    expected = expected_means(observations, freq)
+
+    assert len(view) == len(expected)
+    np.testing.assert_allclose(view[METRICS].to_numpy(dtype=np.float64), expected.to_numpy(dtype=np.float64), rtol=1e-6)
+
+
+def test_incremental_updates_match_one_update(observations):
+    # Split mid-day, so the daily and weekly boundary periods have to be combined
+    cut = pd.Timestamp('2024-06-08 13:00')
+    incremental = Rollups()
+    assert incremental.update(observations[observations['date'] < cut]) > 0
+    incremental.update(observations[observations['date'] >= cut])
+    at_once = Rollups()
+    at_once.update(observations)
+
+    for grain in ('hourly', 'daily', 'weekly'):
+        pd.testing.assert_frame_equal(incremental.view(grain), at_once.view(grain))
+
+
+def test_rows_already_ingested_are_skipped(observations):
+    rollups = Rollups()
+    rollups.update(observations)
+
+    assert rollups.update(observations) == 0
+    assert rollups.view('daily')['pm25_count'].sum() == len(observations)
+
+
+def test_view_filters_locations_and_time(observations):
+    rollups = Rollups()
+    rollups.update(observations)
+
+    view = rollups.view('daily', ['Lyon', 'Nowhere'], start=pd.Timestamp('2024-06-10 08:00'),
+                        end=pd.Timestamp('2024-06-12'))
+
+    assert view['location'].astype(str).unique().tolist() == ['Lyon']
+    # The period containing `start` is included, the one starting at `end` isn't
+    assert view['date'].tolist() == [pd.Timestamp('2024-06-10'), pd.Timestamp('2024-06-11')]
+    assert view['latitude'].unique().tolist() == [45.76]
+    assert (view['pm25_min'] <= view['pm25']).all() and (view['pm25'] <= view['pm25_max']).all()
+    assert view['weather'].notna().all()
+
+
+def test_empty_view():
+    view = Rollups().view('daily', ['Paris'])
+
+    assert view.empty
+    assert {'location', 'date', 'latitude', 'aqi', 'aqi_count'} <= set(view.columns)
+
+
+def test_history_backfilled_after_the_current_reading_is_folded_in(observations):
+    # The history fetch failed on the first load, so only the latest reading was ingested
+    latest = observations.groupby('location', observed=True).tail(1)
+    rollups = Rollups()
+    rollups.update(latest)
+
+    assert rollups.update(observations) == len(observations) - len(latest)
+    at_once = Rollups()
+    at_once.update(observations)
+    for grain in ('hourly', 'daily', 'weekly'):
+        pd.testing.assert_frame_equal(rollups.view(grain), at_once.view(grain))
+    assert rollups.update(observations) == 0
+
+
+def test_out_of_order_updates_keep_the_latest_weather_and_coordinates(observations):
+    paris = observations[observations['location'] == 'Paris'].copy()
+    paris['weather'] = [f'reading {i}' for i in range(len(paris))]
+    later, earlier = paris.iloc[-5:], paris.iloc[:-5].assign(latitude=0.0)
+    rollups = Rollups()
+    rollups.update(later)
+    rollups.update(earlier)
+
+    daily = rollups.view('daily')
+    assert daily['weather'].iloc[-1] == f'reading {len(paris) - 1}'
+    assert daily['latitude'].unique().tolist() == [48.85]
+    assert daily['pm25_count'].sum() == len(paris)
@@ -0,0 +1,61 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from air_quality.aqi import compute_aqi
+from air_quality.sample import generate_sample_data, main
+from air_quality.schema import COLUMNS
+
+END = datetime(2024, 6, 1, 12)
+
+
+def test_grid_covers_every_location_and_timestamp():
+    df = generate_sample_data(['Paris', 'Lyon'], span='2D', freq='h', end=END,
+                              coordinates={'Paris': (48.85, 2.35)})
+
+    assert list(df.columns) == COLUMNS
+    assert len(df) == 2 * 48
+    assert df['location'].tolist() == ['Paris'] * 48 + ['Lyon'] * 48
+    assert df['date'].iloc[47] == pd.Timestamp(END)
+    assert df.groupby('location', observed=True)['date'].is_monotonic_increasing.all()
+    # Unknown names sit at (0, 0)
+    assert df.loc[df['location'] == 'Paris', 'latitude'].eq(48.85).all()
+    assert df.loc[df['location'] == 'Lyon', 'latitude'].eq(0).all()
+
+
+def test_values_are_plausible_and_scored():
+    df = generate_sample_data(n_locations=5, span='7D', freq='h', end=END)
+
+    assert df['location'].nunique() == 5
+    for column in ('pm25', 'pm10', 'no2', 'o3', 'humidity', 'wind_speed'):
+        assert (df[column] > 0).all()
+    expected = compute_aqi(df)['aqi'].to_numpy()
+    assert np.array_equal(df['aqi'].to_numpy(dtype=np.float64), expected)
+    assert df['aqi_category'].notna().all()
+    assert set(df['weather'].unique()) <= {"❄️ Snowy", "🌧️ Rainy", "⛅ Cloudy", "☀️ Sunny"}
+
+
+def test_same_seed_gives_same_data():
+    first = generate_sample_data(['Paris'], span='1D', freq='h', end=END, seed=1)
+    second = generate_sample_data(['Paris'], span='1D', freq='h', end=END, seed=1)
+    other = generate_sample_data(['Paris'], span='1D', freq='h', end=END, seed=2)
+
+    pd.testing.assert_frame_equal(first, second)
+    assert not first['pm25'].equals(other['pm25'])
+
+
+def test_no_locations_gives_an_empty_frame():
+    df = generate_sample_data([], end=END)
+
+    assert df.empty
+    assert list(df.columns) == COLUMNS
+
+
+def test_main_writes_a_dataset(tmp_path, capsys):
+    path = tmp_path / 'sample.parquet'
+
+    main(['--locations', '3', '--span', '1D', '--freq', 'h', '-o', str(path)])
+
+    assert len(pd.read_parquet(path)) == 3 * 24
+    assert 'Generated 72 rows' in capsys.readouterr().out
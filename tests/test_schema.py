@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+from air_quality.cards import render_cards
+from air_quality.rollups import Rollups
+from air_quality.schema import COLUMNS, INDEX_NAME, conform, empty_frame
+from air_quality.store import ObservationStore
+
+
+def observations(aqi):
+    n = len(aqi)
+    return pd.DataFrame({
+        'date': pd.date_range('2024-06-01', periods=n, freq='h'),
+        'location': 'Paris',
+        'latitude': 48.85,
+        'longitude': 2.35,
+        'pm25': np.arange(n, dtype=np.float64),
+        'pm10': 20.0,
+        'no2': 10.0,
+        'o3': 30.0,
+        'temp_c': 20.0,
+        'humidity': 50.0,
+        'wind_speed': 2.0,
+        'aqi': aqi,
+        'weather': '☀️'
+    })
+
+
+def test_conform_casts_to_the_compact_schema():
+    frame = conform(observations([10.4, 20.6]))
+
+    assert isinstance(frame['location'].dtype, pd.CategoricalDtype)
+    assert frame['pm25'].dtype == np.float32
+    assert frame['latitude'].dtype == np.float64
+    assert frame['aqi'].tolist() == [10, 21]
+    assert isinstance(frame.index, pd.DatetimeIndex)
+    assert frame.index.name == INDEX_NAME
+
+
+def test_conform_is_idempotent():
+    frame = conform(observations([10.0, 20.0]))
+
+    assert conform(frame) is frame
+
+
+def test_missing_aqi_stays_missing():
+    frame = conform(observations([np.nan, None, 42.0, 1e9]))
+
+    assert frame['aqi'].dtype == 'UInt16'
+    assert frame['aqi'].isna().tolist() == [True, True, False, False]
+    assert frame['aqi'].iloc[2:].tolist() == [42, np.iinfo(np.uint16).max]
+
+
+def test_missing_aqi_is_left_out_of_rollups():
+    rollups = Rollups()
+    rollups.update(conform(observations([np.nan, 40.0, 60.0])))
+
+    daily = rollups.view('daily')
+
+    assert daily['aqi_count'].tolist() == [2]
+    assert daily['aqi'].tolist() == [50.0]
+    assert daily['aqi_min'].tolist() == [40.0]
+
+
+def test_missing_aqi_is_shown_as_missing():
+    html = render_cards(conform(observations([np.nan])))
+
+    assert 'No data' in html
+    assert '>0<' not in html
+
+
+def test_missing_aqi_round_trips_through_the_store(tmp_path):
+    store = ObservationStore(str(tmp_path / 'observations.sqlite'))
+    store.upsert(conform(observations([np.nan, 42.0])))
+
+    frame = store.load(['Paris'])
+    store.close()
+
+    assert frame['aqi'].isna().tolist() == [True, False]
+
+
+def test_empty_frame():
+    frame = empty_frame()
+
+    assert frame.empty
+    assert list(frame.columns) == COLUMNS
+    assert frame['aqi'].dtype == 'UInt16'
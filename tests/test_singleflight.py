@@ -0,0 +1,84 @@
+import threading
+import time
+
+import pytest
+
+from air_quality.metrics import COALESCED_CALLS
+from air_quality.singleflight import SingleFlight, coalesce, get_flight_group
+
+
+def run_concurrently(group, key, func, callers, label):
+    """Call `group.do` from several threads once the first call is running."""
+    outcomes = [None] * callers
+
+    def call(i):
+        try:
+            outcomes[i] = group.do(key, func, label)
+        except Exception as e:
+            outcomes[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, outcomes
+
+
+def wait_for_waiters(label, count):
+    deadline = time.monotonic() + 5
+    while COALESCED_CALLS.value(group=label) < count and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+def test_concurrent_callers_share_one_call():
+    group, label = SingleFlight(), 'test_share'
+    before = COALESCED_CALLS.value(group=label)
+    release, calls = threading.Event(), []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return {'aqi': 42}
+
+    threads, outcomes = run_concurrently(group, 'paris', fetch, 6, label)
+    wait_for_waiters(label, before + 5)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert all(outcome is outcomes[0] for outcome in outcomes)
+    assert COALESCED_CALLS.value(group=label) == before + 5
+
+
+def test_errors_reach_every_caller_and_free_the_key():
+    group, label = SingleFlight(), 'test_errors'
+    before = COALESCED_CALLS.value(group=label)
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise ValueError('upstream down')
+
+    threads, outcomes = run_concurrently(group, 'paris', fail, 3, label)
+    wait_for_waiters(label, before + 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+    # Nothing is cached: the next call runs again
+    assert group.do('paris', lambda: 'ok', label) == 'ok'
+
+
+def test_different_keys_run_independently():
+    group = SingleFlight()
+
+    assert group.do('a', lambda: group.do('b', lambda: 2)) == 2
+
+
+def test_process_wide_group():
+    assert get_flight_group() is get_flight_group()
+    assert coalesce(('weather', 1.0, 2.0), lambda: 'sunny') == 'sunny'
+    with pytest.raises(KeyError):
+        coalesce('missing', lambda: {}['x'])
+
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from air_quality.sample import generate_sample_data
+from air_quality.slicing import ObservationIndex
+
+LOCATIONS = ['Berlin', 'Lyon', 'Paris']
+END = pd.Timestamp('2024-06-10 23:00')
+
+
+@pytest.fixture
+def frame():
+    return generate_sample_data(LOCATIONS, span='5D', freq='h', end=END)
+
+
+def mask_slice(frame, locations, start, end):
+    mask = frame['location'].isin(locations) & (frame['date'] >= start) & (frame['date'] < end)
+    return frame[mask].sort_values(['location', 'date'])
+
+
+@pytest.mark.parametrize('locations', [['Paris'], ['Berlin', 'Lyon'], ['Berlin', 'Paris'], LOCATIONS])
+def test_slice_matches_a_boolean_mask(frame, locations):
+    index = ObservationIndex(frame)
+    start, end = pd.Timestamp('2024-06-07 06:00'), pd.Timestamp('2024-06-09')
+
+    pd.testing.assert_frame_equal(index.slice(locations, start, end), mask_slice(frame, locations, start, end))
+
+
+def test_unsorted_input_is_sorted(frame):
+    shuffled = frame.sample(frac=1, random_state=0)
+
+    index = ObservationIndex(shuffled)
+
+    assert index.locations == LOCATIONS
+    assert index.slice(['Lyon'])['date'].is_monotonic_increasing
+    pd.testing.assert_frame_equal(index.slice(['Lyon']), frame[frame['location'] == 'Lyon'])
+
+
+def test_contiguous_slices_are_views(frame):
+    index = ObservationIndex(frame)
+
+    one = index.slice(['Lyon'], start=pd.Timestamp('2024-06-08'))
+    neighbours = index.slice(['Berlin', 'Lyon'])
+
+    assert np.shares_memory(one['pm25'].to_numpy(), index.frame['pm25'].to_numpy())
+    assert np.shares_memory(neighbours['pm25'].to_numpy(), index.frame['pm25'].to_numpy())
+
+
+def test_bounds_and_date_range(frame):
+    index = ObservationIndex(frame)
+
+    assert index.date_range == (END - pd.Timedelta(hours=119), END)
+    lo, hi = index.bounds('Lyon', start=END - pd.Timedelta(hours=2))
+    assert hi - lo == 3
+    assert index.bounds('Nowhere') == (0, 0)
+
+
+def test_empty_selections(frame):
+    index = ObservationIndex(frame)
+
+    assert index.slice(['Nowhere']).empty
+    assert index.slice(LOCATIONS, start=END + pd.Timedelta(days=1)).empty
+    assert ObservationIndex(frame.iloc[0:0]).date_range == (None, None)
+
+
+def test_first_rows(frame):
+    rows = ObservationIndex(frame).first_rows(['Paris', 'Berlin'])
+
+    assert rows['location'].tolist() == ['Berlin', 'Paris']
+    assert (rows['date'] == END - pd.Timedelta(hours=119)).all()
@@ -0,0 +1,76 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from air_quality.store import ObservationStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ObservationStore(str(tmp_path / 'observations.sqlite'))
+    yield store
+    store.close()
+
+
+def observations(location, timestamps, pm25):
+    return pd.DataFrame({
+        'date': [datetime.fromtimestamp(ts) for ts in timestamps],
+        'location': location,
+        'latitude': 48.85,
+        'longitude': 2.35,
+        'pm25': pm25,
+        'aqi': 50,
+        'weather': '☀️'
+    })
+
+
+def test_upsert_replaces_rows_for_the_same_hour(store):
+    store.upsert(observations('Paris', [3600, 7200], [1.0, 2.0]))
+    store.upsert(observations('Paris', [7200, 10800], [5.0, 6.0]))
+
+    frame = store.load(['Paris'])
+
+    assert list(frame['pm25']) == [1.0, 5.0, 6.0]
+    assert frame['temp_c'].isna().all()  # Columns missing from the upsert are stored as NULL
+
+
+def test_load_filters_locations_and_time_range(store):
+    store.upsert(observations('Paris', [3600, 7200, 10800], [1.0, 2.0, 3.0]))
+    store.upsert(observations('Lyon', [3600], [9.0]))
+
+    frame = store.load(['Paris'], start=7200, end=10800)
+
+    assert set(frame['location']) == {'Paris'}
+    assert list(frame['pm25']) == [2.0, 3.0]
+    assert frame.index.name == 'timestamp'
+
+
+def test_last_timestamps(store):
+    store.upsert(observations('Paris', [3600, 7200], [1.0, 2.0]))
+
+    assert store.last_timestamps(['Paris', 'Lyon']) == {'Paris': 7200}
+    assert store.last_timestamps([]) == {}
+
+
+def test_watermarks_only_move_forward(store):
+    assert store.watermarks(['Paris'], 'history') == {}
+
+    store.advance_watermark('Paris', 'history', 7200)
+    store.advance_watermark('Paris', 'history', 3600)
+    store.advance_watermark('Lyon', 'other', 100)
+
+    assert store.watermarks(['Paris', 'Lyon'], 'history') == {'Paris': 7200}
+
+
+def test_persists_across_connections(tmp_path):
+    path = str(tmp_path / 'observations.sqlite')
+    store = ObservationStore(path)
+    store.upsert(observations('Paris', [3600], [1.0]))
+    store.advance_watermark('Paris', 'history', 3600)
+    store.close()
+
+    store = ObservationStore(path)
+    assert len(store.load(['Paris'])) == 1
+    assert store.watermarks(['Paris'], 'history') == {'Paris': 3600}
+    store.close()
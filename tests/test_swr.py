@@ -0,0 +1,128 @@
+import threading
+import time
+
+import pytest
+
+from air_quality import swr
+from air_quality.swr import SWRCache
+
+
+class Clock:
+    """Stands in for the `time` module, advanced by hand."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(swr, 'time', clock)
+    return clock
+
+
+class Upstream:
+    """Numbered responses, or an error while `fail` is set."""
+
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+        self.fetched = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        try:
+            if self.fail:
+                raise ConnectionError('upstream down')
+            return self.calls
+        finally:
+            self.fetched.set()
+
+    def wait(self):
+        assert self.fetched.wait(5)
+        self.fetched.clear()
+
+
+def settle(cache, key):
+    # Wait for a background refresh of `key` to be stored or given up
+    deadline = time.monotonic() + 5
+    while cache._entries[key].refreshing and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+def test_fresh_entries_are_served_from_the_cache(clock):
+    cache, upstream = SWRCache(ttl=60), Upstream()
+
+    assert cache.get('paris', upstream) == 1
+    clock.now += 59
+    assert cache.get('paris', upstream) == 1
+    assert upstream.calls == 1
+    assert cache.status('paris') == {'age': 59, 'stale': False, 'error': None}
+
+
+def test_stale_entries_are_served_while_refreshed(clock):
+    cache, upstream = SWRCache(ttl=60), Upstream()
+    cache.get('paris', upstream)
+    upstream.wait()
+
+    clock.now += 61
+    assert cache.get('paris', upstream) == 1  # Immediately, without waiting on the upstream
+    upstream.wait()
+    settle(cache, 'paris')
+
+    assert cache.get('paris', upstream) == 2
+    assert upstream.calls == 2
+
+
+def test_failed_refreshes_keep_the_stale_value_and_retry_later(clock):
+    cache, upstream = SWRCache(ttl=60, retry_interval=30), Upstream()
+    cache.get('paris', upstream)
+    upstream.wait()
+    upstream.fail = True
+
+    clock.now += 61
+    assert cache.get('paris', upstream) == 1
+    upstream.wait()
+    settle(cache, 'paris')
+
+    assert isinstance(cache.status('paris')['error'], ConnectionError)
+    assert cache.get('paris', upstream) == 1
+    assert upstream.calls == 2  # Not retried before retry_interval
+
+    upstream.fail = False
+    clock.now += 30
+    cache.get('paris', upstream)
+    upstream.wait()
+    settle(cache, 'paris')
+    assert cache.get('paris', upstream) == 3
+    assert cache.status('paris')['error'] is None
+
+
+def test_entries_past_the_hard_expiry_are_fetched_again(clock):
+    cache, upstream = SWRCache(ttl=60, max_age=120), Upstream()
+    cache.get('paris', upstream)
+
+    clock.now += 120
+    assert cache.get('paris', upstream) == 2
+
+    clock.now += 120
+    upstream.fail = True
+    with pytest.raises(ConnectionError):
+        cache.get('paris', upstream)
+    assert cache.status('paris') is None
+
+
+def test_least_recently_used_are_evicted(clock):
+    cache = SWRCache(max_entries=2)
+
+    cache.get('a', lambda: 'a')
+    cache.get('b', lambda: 'b')
+    cache.get('a', lambda: 'new a')
+    cache.get('c', lambda: 'c')
+
+    assert len(cache) == 2
+    assert cache.status('b') is None
+    assert cache.get('a', lambda: 'new a') == 'a'
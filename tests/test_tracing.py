@@ -0,0 +1,77 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from air_quality import tracing
+from air_quality.tracing import bind, end_trace, span, start_trace
+
+
+@pytest.fixture(autouse=True)
+def no_trace():
+    yield
+    end_trace()
+
+
+def test_spans_nest_and_inherit_their_location():
+    trace = start_trace('rerun')
+    with span('load', location='Paris'):
+        with span('parse') as inner:
+            inner.set(rows=3)
+    with span('render'):
+        pass
+    trace.finish()
+
+    load, parse, render = trace.spans
+    assert parse.parent == load.id and render.parent is None
+    assert parse.attrs == {'location': 'Paris', 'rows': 3}
+    assert [stage['stage'] for stage in trace.locations()] == ['load', 'parse']
+    assert {stage['stage'] for stage in trace.stages()} == {'load', 'parse', 'render'}
+
+
+def test_errors_are_recorded_and_raised():
+    trace = start_trace('rerun')
+    with pytest.raises(KeyError):
+        with span('lookup'):
+            raise KeyError('x')
+    trace.finish()
+
+    assert trace.spans[0].attrs == {'error': 'KeyError'}
+
+
+def test_nothing_is_recorded_outside_a_trace():
+    assert span('idle') is tracing._NOOP
+    trace = start_trace('rerun').finish()
+    assert span('late') is tracing._NOOP
+    assert trace.spans == []
+
+    assert bind(print) is print
+
+
+def test_bound_work_lands_under_its_span():
+    trace = start_trace('load')
+    with span('fetch_locations') as parent:
+        with ThreadPoolExecutor(4) as pool:
+            list(pool.map(bind(lambda i: threading.current_thread().name, 'fetch', location='Paris'), range(4)))
+    trace.finish()
+
+    fetches = [s for s in trace.spans if s.name == 'fetch']
+    assert len(fetches) == 4
+    assert {s.parent for s in fetches} == {parent.id}
+    assert any(s.thread != threading.current_thread().name for s in fetches)
+
+
+def test_finished_traces_are_logged(tmp_path):
+    path = tmp_path / 'logs' / 'traces.jsonl'
+
+    for name in ('first', 'second'):
+        trace = start_trace(name, session='abc')
+        with span('stage'):
+            pass
+        trace.finish(log_path=str(path))
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [record['name'] for record in records] == ['first', 'second']
+    assert records[0]['attrs'] == {'session': 'abc'}
+    assert records[0]['spans'][0]['name'] == 'stage'